@@ -1,9 +1,11 @@
 import psycopg2
-import json
-import re
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 import os
 
+from src.services.bulk_loader import ExerciseBulkLoader
+from src.utils.options import OptionsError, is_canonical, normalize_options, serialize_options
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -19,74 +21,51 @@ def get_db_connection():
     )
 
 
-def normalize_options(options):
-    """Normaliza el campo opciones para convertirlo en una lista válida."""
-    if isinstance(options, list):
-        return options
-
-    # Si ya es un string JSON válido, parsearlo
-    if isinstance(options, str):
-        # Intentar parsear como JSON primero
+def repair_rows(rows, as_array: bool):
+    """
+    Devuelve (actualizaciones, errores) para las filas (id, opciones) cuyas opciones no
+    están en forma canónica. Las que ya lo están no se tocan.
+    """
+    updates, errors = [], []
+    for ejercicio_id, opciones in rows:
+        if as_array and is_canonical(opciones):
+            continue
         try:
-            parsed = json.loads(options)
-            if isinstance(parsed, list):
-                return parsed
-            elif isinstance(parsed, dict):
-                return list(parsed.values())
-        except json.JSONDecodeError:
-            pass
-
-        # Manejar el formato con {op1,op2,op3}
-        if options.startswith('{') and options.endswith('}'):
-            # Eliminar las llaves y dividir por comas
-            cleaned = options[1:-1].split(',')
-            # Limpiar cada opción y eliminar espacios
-            return [opt.strip().replace('"', '') for opt in cleaned if opt.strip()]
+            normalizadas = normalize_options(opciones)
+        except OptionsError as e:
+            errors.append((ejercicio_id, str(e)))
+            continue
 
-        # Si es un string simple, tratar de dividirlo por comas
-        if ',' in options:
-            return [opt.strip() for opt in options.split(',') if opt.strip()]
-
-        # Si no hay comas, devolver como lista de un elemento
-        return [options.strip()]
-
-    # Si es otro tipo, convertirlo a string y luego a lista
-    return [str(options)]
+        valor = normalizadas if as_array else serialize_options(normalizadas)
+        if valor != opciones:
+            updates.append((ejercicio_id, valor))
+    return updates, errors
 
 
 def fix_exercise_options():
-    """Corregir las opciones de los ejercicios en la base de datos"""
+    """Recorre una vez la tabla de ejercicios y deja todas las opciones en forma canónica"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
     try:
-        # Obtener solo los ejercicios problemáticos (ID 60-120)
-        cursor.execute("SELECT id, opciones FROM ejercicios" )
-        ejercicios = cursor.fetchall()
-
-        updated_count = 0
-        for ejercicio_id, opciones in ejercicios:
-            try:
-                # Normalizar las opciones
-                opciones_normalizadas = normalize_options(opciones)
-
-                # Convertir a JSON string
-                opciones_json = json.dumps(opciones_normalizadas, ensure_ascii=False)
-
-                # Actualizar la base de datos con las opciones corregidas
-                cursor.execute(
-                    "UPDATE ejercicios SET opciones = %s WHERE id = %s",
-                    (opciones_json, ejercicio_id)
-                )
-                print(f"Ejercicio {ejercicio_id} corregido: {opciones} -> {opciones_json}")
-                updated_count += 1
-
-            except Exception as e:
-                print(f"Error procesando ejercicio {ejercicio_id}: {e}")
-
-        # Confirmar los cambios
+        as_array = ExerciseBulkLoader.options_column_is_array(cursor)
+        cursor.execute("SELECT id, opciones FROM ejercicios")
+        updates, errors = repair_rows(cursor.fetchall(), as_array)
+
+        # Una sola sentencia UPDATE ... FROM (VALUES ...) por página, en lugar de una por fila
+        cast = "text[]" if as_array else "text"
+        execute_values(
+            cursor,
+            f"UPDATE ejercicios SET opciones = v.opciones::{cast} FROM (VALUES %s) AS v(id, opciones) "
+            "WHERE ejercicios.id = v.id",
+            updates
+        )
+
+        for ejercicio_id, error in errors:
+            print(f"Ejercicio {ejercicio_id} sin opciones válidas, revísalo a mano: {error}")
+
         conn.commit()
-        print(f"Corrección completada. {updated_count} ejercicios actualizados.")
+        print(f"Corrección completada. {len(updates)} ejercicios actualizados, {len(errors)} con errores.")
 
     except Exception as e:
         print(f"Error durante la corrección: {e}")
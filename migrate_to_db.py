@@ -1,21 +1,115 @@
+import argparse
 import json
 import os
 
 import psycopg2
 from dotenv import load_dotenv
 
+from src.services.stats_service import REBUILD_USER_STATS_SQL
+from src.utils.exercise_utils import iter_exercises
+from src.utils.options import normalize_options
+
 load_dotenv()
 
+# Tablas e índices auxiliares del bot; todas las sentencias son idempotentes
+SCHEMA_STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS user_stats (
+        user_id BIGINT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        correct INTEGER NOT NULL DEFAULT 0,
+        level_counts JSONB NOT NULL DEFAULT '{}',
+        category_counts JSONB NOT NULL DEFAULT '{}',
+        last_practice TIMESTAMP,
+        recent_days DATE[] NOT NULL DEFAULT '{}',
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    # Antes de crear el índice único, conservar solo la fila más reciente de cada (usuario, ejercicio)
+    """
+    DELETE FROM user_ejercicios a
+    USING user_ejercicios b
+    WHERE a.user_id = b.user_id AND a.exercise_id = b.exercise_id AND a.id < b.id
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS user_ejercicios_user_exercise_key
+    ON user_ejercicios (user_id, exercise_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS daily_challenges (
+        challenge_date DATE NOT NULL,
+        nivel VARCHAR(50) NOT NULL,
+        exercise_id INTEGER NOT NULL REFERENCES ejercicios(id),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (challenge_date, nivel)
+    )
+    """,
+    # Huella de contenido para recargar el catálogo conservando los ids de los ejercicios
+    "ALTER TABLE ejercicios ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "CREATE INDEX IF NOT EXISTS idx_ejercicios_content_hash ON ejercicios (content_hash)",
+    "ALTER TABLE curiosidades ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    """
+    CREATE TABLE IF NOT EXISTS catalog_versions (
+        version SERIAL PRIMARY KEY,
+        exercises INTEGER NOT NULL,
+        inserted INTEGER NOT NULL,
+        updated INTEGER NOT NULL,
+        deactivated INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+)
 
-def migrate_data():
-    # Conexión a la base de datos
-    conn = psycopg2.connect(
+
+def get_db_connection():
+    """Obtener conexión directa a la base de datos"""
+    return psycopg2.connect(
         dbname=os.getenv("DB_NAME"),
         user=os.getenv("DB_USER"),
         password=os.getenv("DB_PASSWORD"),
         host=os.getenv("DB_HOST"),
         port=os.getenv("DB_PORT")
     )
+
+
+def apply_schema(cursor) -> bool:
+    """
+    Crea las tablas e índices auxiliares que necesita el bot. Si user_stats está vacía y ya
+    hay respuestas en user_ejercicios (tabla recién creada), la rellena: de lo contrario los
+    usuarios existentes acumularían sus respuestas sobre un resumen a cero.
+    Devuelve True si se ha reconstruido el resumen.
+    """
+    for statement in SCHEMA_STATEMENTS:
+        cursor.execute(statement)
+
+    cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM user_stats) AND EXISTS (SELECT 1 FROM user_ejercicios)")
+    if not cursor.fetchone()[0]:
+        return False
+    for statement in REBUILD_USER_STATS_SQL:
+        cursor.execute(statement)
+    print("Resumen de estadísticas user_stats rellenado desde user_ejercicios")
+    return True
+
+
+def rebuild_user_stats():
+    """Reconstruye la tabla resumen user_stats a partir de user_ejercicios"""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            if not apply_schema(cursor):
+                for statement in REBUILD_USER_STATS_SQL:
+                    cursor.execute(statement)
+            cursor.execute("SELECT COUNT(*) FROM user_stats")
+            total = cursor.fetchone()[0]
+        conn.commit()
+        print(f"Resumen de estadísticas reconstruido para {total} usuarios")
+    finally:
+        conn.close()
+
+
+def migrate_data():
+    # Conexión a la base de datos
+    conn = get_db_connection()
     cursor = conn.cursor()
 
     # Crear tablas si no existen
@@ -43,17 +137,15 @@ def migrate_data():
         )
     """)
 
-    # Migrar ejercicios
-    with open('data/ejercicios.json', 'r', encoding='utf-8') as f:
-        ejercicios_data = json.load(f)
+    apply_schema(cursor)
 
-        for nivel, categorias in ejercicios_data.items():
-            for categoria, ejercicios in categorias.items():
-                for ejercicio in ejercicios:
-                    cursor.execute(
-                        "INSERT INTO ejercicios (categoria, nivel, pregunta, opciones, respuesta_correcta) VALUES (%s, %s, %s, %s, %s)",
-                        (categoria, nivel, ejercicio['pregunta'], ejercicio['opciones'], ejercicio['respuesta'])
-                    )
+    # Migrar ejercicios: el JSON se valida y se lee en una sola pasada, sin cargarlo entero
+    for nivel, categoria, _, ejercicio in iter_exercises('data/ejercicios.json'):
+        cursor.execute(
+            "INSERT INTO ejercicios (categoria, nivel, pregunta, opciones, respuesta_correcta) VALUES (%s, %s, %s, %s, %s)",
+            (categoria, nivel, ejercicio['pregunta'], normalize_options(ejercicio['opciones']),
+             ejercicio['respuesta'])
+        )
 
     # Migrar curiosidades
     with open('data/curiosidades.json', 'r', encoding='utf-8') as f:
@@ -72,4 +164,22 @@ def migrate_data():
 
 
 if __name__ == "__main__":
-    migrate_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Migración de datos y esquema del bot")
+    parser.add_argument("--schema-only", action="store_true",
+                        help="Solo crea las tablas e índices auxiliares (y rellena user_stats si está vacía), "
+                             "sin importar datos")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                        help="Reconstruye la tabla user_stats desde user_ejercicios")
+    args = parser.parse_args()
+
+    if args.schema_only:
+        connection = get_db_connection()
+        with connection.cursor() as schema_cursor:
+            apply_schema(schema_cursor)
+        connection.commit()
+        connection.close()
+        print("Esquema actualizado")
+    elif args.rebuild_stats:
+        rebuild_user_stats()
+    else:
+        migrate_data()
\ No newline at end of file
@@ -1,11 +1,20 @@
+import asyncio
+import functools
 import os
-import json
 import logging
+import time
 from aiogram import Router
 from aiogram.types import Message
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
+from src.services.bulk_loader import ExerciseBulkLoader
 from src.services.database import DatabaseService
-from src.utils.exercise_utils import validate_exercises_json, load_exercises_from_json
+from src.services.exercise_catalog import ExerciseCatalog
+from src.services.send_queue import SendQueue, PRIORITY_BROADCAST
+from src.services.stats_service import StatsService
+from src.utils.metrics import (
+    DB_POOL_WAIT, DB_QUERY_DURATION, DB_QUERY_ERRORS, HANDLER_DURATION, HANDLER_ERRORS, UPDATES_IN_FLIGHT
+)
+from src.utils.exercise_utils import ExerciseJSONError, iter_exercises
 
 # Configuración del logger para registrar mensajes de depuración e información
 logger = logging.getLogger(__name__)
@@ -13,6 +22,11 @@ logger = logging.getLogger(__name__)
 # Creación de un router para manejar comandos específicos
 router = Router(name="admin")
 
+# Número de handlers y consultas que muestra /metrics
+METRICS_TOP = 10
+# Segundos mínimos entre actualizaciones del progreso de /load_exercises
+LOAD_PROGRESS_INTERVAL = 2
+
 def is_admin(user_id: int) -> bool:
     """
     Verifica si un usuario tiene permisos de administrador.
@@ -65,15 +79,15 @@ async def cmd_stats(message: Message):
         await message.answer("❌ No tienes permisos de administrador.")
         return
 
-    with DatabaseService.get_cursor() as cursor:
-        cursor.execute("SELECT COUNT(*) FROM users")
-        total_users = cursor.fetchone()[0]
+    async with DatabaseService.get_async_cursor() as cursor:
+        await cursor.execute("SELECT COUNT(*) FROM users")
+        total_users = (await cursor.fetchone())[0]
 
-        cursor.execute("SELECT SUM(exercises) FROM users")
-        total_exercises = cursor.fetchone()[0] or 0
+        await cursor.execute("SELECT SUM(exercises) FROM users")
+        total_exercises = (await cursor.fetchone())[0] or 0
 
-        cursor.execute("SELECT level, COUNT(*) FROM users GROUP BY level")
-        levels = cursor.fetchall()
+        await cursor.execute("SELECT level, COUNT(*) FROM users GROUP BY level")
+        levels = await cursor.fetchall()
 
     stats_text = (
         f"📊 **Estadísticas del Bot**\n\n"
@@ -92,8 +106,9 @@ async def cmd_load_exercises(message: Message):
     Args:
         message (Message): Mensaje recibido del usuario.
 
-    - Valida el archivo JSON antes de cargar los datos.
-    - Inserta los ejercicios en la base de datos, eliminando los existentes previamente.
+    - Valida el archivo JSON a la vez que lo carga, sin leerlo entero en memoria.
+    - Publica los ejercicios como una nueva versión del catálogo: los que no cambian conservan
+      su id y los que desaparecen se desactivan, sin borrar nada.
     - Responde con un mensaje indicando el resultado de la operación.
     """
     if not is_admin(message.from_user.id):
@@ -102,34 +117,138 @@ async def cmd_load_exercises(message: Message):
 
     try:
         json_path = "ejercicios.json"
-        errors = validate_exercises_json(json_path)
-        if errors:
-            error_msg = "❌ Errores en el JSON:\n" + "\n".join(errors[:5])
-            if len(errors) > 5:
-                error_msg += f"\n... y {len(errors) - 5} errores más"
-            await message.answer(error_msg)
+        status = await message.answer("⏳ Cargando ejercicios...")
+        loop = asyncio.get_running_loop()
+
+        last_update = [0.0]
+
+        def progress(inserted: int, processed: int):
+            # Se llama desde el hilo de la carga; el mensaje se edita en el event loop, como mucho
+            # cada LOAD_PROGRESS_INTERVAL segundos para no chocar con los límites de Telegram
+            now = time.monotonic()
+            if now - last_update[0] < LOAD_PROGRESS_INTERVAL:
+                return
+            last_update[0] = now
+            asyncio.run_coroutine_threadsafe(
+                status.edit_text(f"⏳ Cargando ejercicios... {inserted} insertados de {processed} procesados"),
+                loop
+            )
+
+        # El archivo se valida mientras se carga, en una sola pasada: si tiene errores, la
+        # transacción se revierte y el catálogo actual no cambia
+        try:
+            report = await loop.run_in_executor(
+                None, functools.partial(ExerciseBulkLoader.swap, iter_exercises(json_path), progress=progress)
+            )
+        except ExerciseJSONError as e:
+            error_msg = "❌ Errores en el JSON:\n" + "\n".join(e.errors[:5])
+            if len(e.errors) > 5:
+                error_msg += f"\n... y {len(e.errors) - 5} errores más"
+            await status.edit_text(error_msg)
             return
 
-        exercises_data = load_exercises_from_json(json_path)
-
-        with DatabaseService.get_cursor() as cursor:
-            cursor.execute("DELETE FROM ejercicios")
-            cursor.execute("ALTER SEQUENCE ejercicios_id_seq RESTART WITH 1")
-
-            inserted_count = 0
-            for nivel, categorias in exercises_data.items():
-                for categoria, ejercicios in categorias.items():
-                    for ejercicio in ejercicios:
-                        cursor.execute("""
-                            INSERT INTO ejercicios (categoria, nivel, pregunta, opciones, respuesta_correcta, activo)
-                            VALUES (%s, %s, %s, %s, %s, TRUE)
-                        """, (
-                            categoria, nivel, ejercicio["pregunta"],
-                            json.dumps(ejercicio["opciones"]),
-                            ejercicio["respuesta"]
-                        ))
-                        inserted_count += 1
-
-        await message.answer(f"✅ Ejercicios cargados exitosamente. Se insertaron {inserted_count} ejercicios.")
+        # Este proceso cambia de versión ya; el resto lo detecta en su siguiente refresco
+        await ExerciseCatalog.refresh_if_changed()
+        await message.answer(
+            f"✅ Catálogo actualizado a la versión {report.version}: {report.inserted} nuevos, "
+            f"{report.updated} actualizados, {report.deactivated} desactivados y {report.unchanged} sin cambios."
+        )
+        if report.errors:
+            error_lines = [f"{position}: {error}" for position, error in report.errors[:5]]
+            error_msg = f"⚠️ {len(report.errors)} ejercicios omitidos:\n" + "\n".join(error_lines)
+            if len(report.errors) > 5:
+                error_msg += f"\n... y {len(report.errors) - 5} más"
+            await message.answer(error_msg)
     except Exception as e:
         await message.answer(f"❌ Error al cargar ejercicios: {str(e)}")
+
+@router.message(Command("rebuild_stats"))
+async def cmd_rebuild_stats(message: Message):
+    """
+    Reconstruye la tabla resumen user_stats a partir del historial de user_ejercicios.
+
+    Args:
+        message (Message): Mensaje recibido del usuario.
+    """
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ No tienes permisos de administrador.")
+        return
+
+    try:
+        rebuilt = await StatsService.rebuild_summaries()
+        await message.answer(f"✅ Estadísticas reconstruidas para {rebuilt} usuarios.")
+    except Exception as e:
+        await message.answer(f"❌ Error al reconstruir estadísticas: {str(e)}")
+
+@router.message(Command("broadcast"))
+async def cmd_broadcast(message: Message, command: CommandObject):
+    """
+    Envía un mensaje a todos los usuarios registrados.
+
+    Args:
+        message (Message): Mensaje recibido del usuario.
+        command (CommandObject): Comando con el texto a enviar como argumento.
+
+    Los envíos se encolan con prioridad de difusión, de modo que las respuestas a los
+    usuarios activos salen antes y no se superan los límites de Telegram.
+    """
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ No tienes permisos de administrador.")
+        return
+
+    if not command.args:
+        await message.answer("Uso: /broadcast <mensaje>")
+        return
+
+    async with DatabaseService.get_async_cursor() as cursor:
+        await cursor.execute("SELECT user_id FROM users")
+        user_ids = [row[0] for row in await cursor.fetchall()]
+
+    queued = 0
+    for user_id in user_ids:
+        try:
+            await SendQueue.send_message(message.bot, user_id, command.args, priority=PRIORITY_BROADCAST)
+            queued += 1
+        except Exception as e:
+            logger.error(f"Error al enviar difusión a {user_id}: {e}")
+
+    await message.answer(f"📣 Mensaje encolado para {queued} usuarios.")
+
+@router.message(Command("metrics"))
+async def cmd_metrics(message: Message):
+    """
+    Muestra un resumen de las métricas de rendimiento: latencia y errores por handler,
+    tiempo por consulta SQL y espera del pool de conexiones.
+
+    Args:
+        message (Message): Mensaje recibido del usuario.
+    """
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ No tienes permisos de administrador.")
+        return
+
+    lines = [f"📈 Métricas (updates en curso: {int(UPDATES_IN_FLIGHT.value())})", "", "Handlers:"]
+    handlers = sorted(HANDLER_DURATION.snapshot().items(), key=lambda item: item[1][0], reverse=True)
+    for (name,), (count, total) in handlers[:METRICS_TOP]:
+        p95 = HANDLER_DURATION.quantile(0.95, handler=name)
+        errors = int(HANDLER_ERRORS.value(handler=name))
+        lines.append(
+            f"• {name.rsplit('.', 1)[-1]}: {count} llamadas, media {total / count * 1000:.1f} ms, "
+            f"p95 ≤ {p95 * 1000:.0f} ms, {errors} errores"
+        )
+    if not handlers:
+        lines.append("• Sin datos")
+
+    lines += ["", "Consultas SQL (por tiempo total):"]
+    queries = sorted(DB_QUERY_DURATION.snapshot().items(), key=lambda item: item[1][1], reverse=True)
+    for (label,), (count, total) in queries[:METRICS_TOP]:
+        errors = int(DB_QUERY_ERRORS.value(query=label))
+        lines.append(f"• {label}: {count} veces, media {total / count * 1000:.1f} ms, {errors} errores")
+    if not queries:
+        lines.append("• Sin datos")
+
+    lines += ["", "Espera del pool:"]
+    for (mode,), (count, total) in sorted(DB_POOL_WAIT.snapshot().items()):
+        lines.append(f"• {mode}: media {total / count * 1000:.2f} ms en {count} conexiones")
+
+    await message.answer("\n".join(lines))
@@ -35,57 +35,6 @@ async def back_to_main_menu(callback: CallbackQuery, state: FSMContext):
 #        logger.error(f"Error en show_curiosity callback: {e}")
 #        await callback.answer("❌ Error al cargar curiosidad")
 
-@router.callback_query(F.data == "next_exercise")
-async def next_exercise_callback(callback: CallbackQuery, state: FSMContext):
-    """Handler para siguiente ejercicio"""
-    try:
-        await callback.answer()
-        # Importar aquí para evitar circular imports
-        from src.handlers.exercises import cmd_exercise
-        await state.clear()
-        await cmd_exercise(callback.message, state)
-    except Exception as e:
-        logger.error(f"Error en next_exercise callback: {e}")
-        await callback.answer("❌ Error al cargar ejercicio")
-
-@router.callback_query(F.data == "retry_exercise")
-async def retry_exercise_callback(callback: CallbackQuery, state: FSMContext):
-    """Handler para reintentar ejercicio"""
-    try:
-        await callback.answer()
-        # Importar aquí para evitar circular imports
-        from src.handlers.exercises import cmd_exercise
-        await state.clear()
-        await cmd_exercise(callback.message, state)
-    except Exception as e:
-        logger.error(f"Error en retry_exercise callback: {e}")
-        await callback.answer("❌ Error al reintentar ejercicio")
-
-@router.callback_query(F.data == "show_progress")
-async def show_progress_callback(callback: CallbackQuery):
-    """Handler para mostrar progreso"""
-    try:
-        await callback.answer()
-        # Importar aquí para evitar circular imports
-        from src.handlers.exercises import show_progress_callback as show_progress
-        await show_progress(callback)
-    except Exception as e:
-        logger.error(f"Error en show_progress callback: {e}")
-        await callback.answer("❌ Error al cargar progreso")
-
-@router.callback_query(F.data == "daily_challenge")
-async def daily_challenge_callback(callback: CallbackQuery, state: FSMContext):
-    """Handler para reto diario"""
-    try:
-        await callback.answer()
-        # Importar aquí para evitar circular imports
-        from src.handlers.reto import daily_challenge
-        await state.clear()
-        await daily_challenge(callback, state)
-    except Exception as e:
-        logger.error(f"Error en daily_challenge callback: {e}")
-        await callback.answer("❌ Error al cargar reto")
-
 @router.callback_query(F.data == "my_stats")
 async def my_stats_callback(callback: CallbackQuery):
     """Handler básico para estadísticas"""
@@ -96,8 +45,8 @@ async def daily_exercise_callback(callback: CallbackQuery, state: FSMContext):
     """Handler básico para ejercicio diario"""
     await callback.answer()
     await state.clear()
-    from src.handlers.exercises import cmd_exercise
-    await cmd_exercise(callback.message, state)
+    from src.handlers.exercises import cmd_exercise, message_from_callback
+    await cmd_exercise(message_from_callback(callback), state)
 
 @router.callback_query(F.data == "settings")
 async def settings_callback(callback: CallbackQuery):
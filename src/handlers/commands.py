@@ -14,7 +14,7 @@ async def cmd_start(message: Message):
     username = message.from_user.username
 
     # Registrar usuario
-    UserService.register_user(user_id, username)
+    await UserService.register_user(user_id, username)
 
     # Mensaje de bienvenida
     welcome_text = (
@@ -20,7 +20,7 @@ async def handle_curiosidad_message(message: Message, state: FSMContext):
         logger.info(f"📚 Curiosidad solicitada via mensaje por {message.from_user.id}")
         await state.clear()
 
-        curiosity = CuriosityService.get_random_curiosity()
+        curiosity = await CuriosityService.get_random_curiosity(message.from_user.id)
         if curiosity:
             categoria = getattr(curiosity, 'categoria', 'General')
             texto_curiosidad = getattr(curiosity, 'texto', 'Texto no disponible')
@@ -51,7 +51,7 @@ async def show_curiosity_callback(callback: CallbackQuery, state: FSMContext):
         await callback.answer()
         await state.clear()
 
-        curiosity = CuriosityService.get_random_curiosity()
+        curiosity = await CuriosityService.get_random_curiosity(callback.from_user.id)
         if curiosity:
             categoria = getattr(curiosity, 'categoria', 'General')
             texto_curiosidad = getattr(curiosity, 'texto', 'Texto no disponible')
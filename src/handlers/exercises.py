@@ -1,5 +1,4 @@
 # handlers/exercises.py - VERSIÓN COMPLETA CON RETOS DIARIOS INTEGRADOS
-import json
 import logging
 import re
 from typing import Dict, Any, Optional
@@ -7,11 +6,19 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
 from aiogram.utils.keyboard import ReplyKeyboardBuilder
 from src.keyboards.main_menu import MainMenuKeyboard
 from src.services.user_service import UserService
 from src.services.exercise_service import ExerciseService
+from src.services.exercise_catalog import ExerciseCatalog
+from src.services.send_queue import SendQueue
+from src.services.daily_challenge_service import DailyChallengeService
+from src.services.render_cache import RenderCache
+from src.models.daily_challenge import DailyChallenge
+from src.models.exercise import Exercise
 from src.keyboards.inline import result_keyboard, challenge_result_keyboard, retry_keyboard
+from src.utils.options import OptionsError, normalize_options
 
 logger = logging.getLogger(__name__)
 router = Router(name="exercises")
@@ -19,9 +26,13 @@ router = Router(name="exercises")
 MAX_ATTEMPTS = 3
 VALID_LEVELS = ["principiante", "intermedio", "avanzado"]
 
+LOAD_ERROR_TEXT = "❌ Error al cargar el ejercicio. Intenta nuevamente."
+ANSWER_ERROR_TEXT = "❌ Error al procesar tu respuesta. Intenta nuevamente."
 
-class ExerciseStates:
-    WAITING_ANSWER = "waiting_answer"
+
+class ExerciseStates(StatesGroup):
+    # Estado FSM real: el filtro solo lee el estado, no el diccionario de datos
+    waiting_answer = State()
 
 
 def escape_markdown_v2(text: str) -> str:
@@ -54,6 +65,17 @@ def create_answer_keyboard(options: list) -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=False)
 
 
+def get_answer_keyboard(exercise_data: Dict) -> ReplyKeyboardMarkup:
+    """Teclado de respuestas del ejercicio, renderizado una vez por ejercicio del catálogo"""
+    def render() -> ReplyKeyboardMarkup:
+        return create_answer_keyboard(parse_exercise_options(exercise_data))
+
+    exercise_id = exercise_data.get("id")
+    if ExerciseCatalog.get(exercise_id) is None:
+        return render()
+    return RenderCache.get_or_render(exercise_id, "keyboard", render)
+
+
 def get_superior_level(current_level: str) -> str:
     """Devuelve el nivel superior al actual"""
     levels = ["principiante", "intermedio", "avanzado"]
@@ -65,51 +87,72 @@ def get_superior_level(current_level: str) -> str:
         return "intermedio"
 
 
+def message_from_callback(callback: CallbackQuery) -> Message:
+    """
+    El mensaje de un callback lo envió el bot, así que su from_user es el bot.
+    Devuelve una copia cuyo remitente es el usuario que pulsó el botón.
+    """
+    return callback.message.model_copy(update={"from_user": callback.from_user})
+
+
 async def get_appropriate_exercise(user_id: int, user_level: str) -> tuple:
     """Obtiene un ejercicio apropiado excluyendo los completados"""
-    # 1. Intentar con el nivel del usuario
-    exercise = ExerciseService.get_random_exercise(user_id, user_level)
-    if exercise:
+    # Preferencia: el nivel del usuario y después los demás, resuelto en una sola consulta
+    levels = [user_level] + [lvl for lvl in VALID_LEVELS if lvl != user_level]
+    exercise, level = await ExerciseService.get_best_exercise(user_id, levels)
+
+    if exercise is None:
+        return None, None, "no_exercises"
+    if level == user_level:
         return exercise, user_level, None
+    return exercise, level, "alternative_level"
 
-    # 2. Buscar en otros niveles
-    other_levels = [lvl for lvl in VALID_LEVELS if lvl != user_level]
 
-    for level in other_levels:
-        exercise = ExerciseService.get_random_exercise(user_id, level)
-        if exercise:
-            return exercise, level, "alternative_level"
+def parse_exercise_options(exercise_data: Dict) -> list:
+    """
+    Opciones del ejercicio como lista. Los ejercicios del catálogo ya las traen normalizadas;
+    solo los datos que llegan de fuera pasan por normalize_options.
+    """
+    options = exercise_data.get("opciones", [])
+    if isinstance(options, list):
+        return options
 
-    return None, None, "no_exercises"
+    try:
+        return normalize_options(options)
+    except OptionsError:
+        return []
 
 
-def parse_exercise_options(exercise_data: Dict) -> list:
-    """Parsea las opciones del ejercicio"""
-    options = exercise_data.get("opciones", [])
+def normalize_correct_index(exercise_data: Dict, options: list) -> None:
+    """Valida el índice de respuesta correcta y lo corrige a 0 si está fuera de rango"""
+    correct_index = exercise_data.get("respuesta_correcta", 0)
+    if not isinstance(correct_index, int) or correct_index < 0 or correct_index >= len(options):
+        correct_index = 0
+        logger.warning(f"Índice de respuesta correcta inválido")
 
-    if isinstance(options, str):
-        try:
-            return json.loads(options)
-        except json.JSONDecodeError:
-            if ',' in options:
-                return [opt.strip() for opt in options.split(',')]
-            return [options]
+    exercise_data['respuesta_correcta'] = correct_index
 
-    return options
 
+def get_exercise_data(exercise_id: int) -> Optional[Dict]:
+    """Rehidrata el ejercicio guardado en el estado a partir del catálogo en memoria"""
+    exercise = ExerciseCatalog.get(exercise_id)
+    if exercise is None:
+        return None
 
-async def send_exercise_message(
-        message: Message,
+    exercise_data = exercise.to_dict()
+    normalize_correct_index(exercise_data, parse_exercise_options(exercise_data))
+    return exercise_data
+
+
+def render_exercise_text(
         exercise_data: Dict,
         level_used: str,
         user_level: str,
         message_type: str = None,
         is_challenge: bool = False,
         challenge_level: str = None
-) -> None:
-    """Envía el mensaje del ejercicio con formato seguro"""
-    options = parse_exercise_options(exercise_data)
-
+) -> str:
+    """Construye el texto del ejercicio en MarkdownV2 con todos los campos escapados"""
     # Escapar todos los textos para MarkdownV2
     categoria = escape_markdown_v2(exercise_data.get('categoria', 'General'))
     pregunta = escape_markdown_v2(exercise_data.get('pregunta', ''))
@@ -145,9 +188,97 @@ async def send_exercise_message(
                     f"\\(tu nivel actual es {user_level_escaped}\\)*\n\n" + message_text
             )
 
-    answer_kb = create_answer_keyboard(options)
+    return message_text
 
-    await message.answer(message_text, parse_mode="MarkdownV2", reply_markup=answer_kb)
+
+def reset_on_failure(
+        future,
+        message: Message,
+        fallback_text: str,
+        state: Optional[FSMContext] = None,
+        exercise_id: Optional[int] = None
+) -> None:
+    """
+    Si el envío encolado falla, saca al usuario del ejercicio y le avisa; sin esto se quedaría
+    en ExerciseStates.waiting_answer sin haber visto el mensaje. El estado solo se borra si
+    sigue siendo el de ese ejercicio (el usuario puede haber empezado otro entretanto).
+    """
+    async def reset(error: BaseException):
+        if state is not None and (await state.get_data()).get("exercise_id") == exercise_id:
+            await state.clear()
+        await SendQueue.answer(
+            message,
+            fallback_text,
+            reply_markup=MainMenuKeyboard.main_menu(),
+            parse_mode=None
+        )
+
+    SendQueue.on_failure(future, reset)
+
+
+async def send_exercise_message(
+        message: Message,
+        exercise_data: Dict,
+        level_used: str,
+        user_level: str,
+        message_type: str = None,
+        is_challenge: bool = False,
+        challenge_level: str = None,
+        state: Optional[FSMContext] = None
+) -> None:
+    """Envía el mensaje del ejercicio con formato seguro"""
+    def render() -> tuple:
+        message_text = render_exercise_text(
+            exercise_data, level_used, user_level, message_type, is_challenge, challenge_level
+        )
+        return message_text, get_answer_keyboard(exercise_data)
+
+    exercise_id = exercise_data.get("id")
+    if ExerciseCatalog.get(exercise_id) is None:
+        # Ejercicio fuera del catálogo: no hay forma de invalidarlo, se renderiza sin caché
+        message_text, answer_kb = render()
+    else:
+        variant = ("message", level_used, user_level, message_type, is_challenge, challenge_level)
+        message_text, answer_kb = RenderCache.get_or_render(exercise_id, variant, render)
+
+    future = await SendQueue.answer(message, message_text, parse_mode="MarkdownV2", reply_markup=answer_kb)
+    reset_on_failure(future, message, LOAD_ERROR_TEXT, state, exercise_id)
+
+
+def render_daily_challenge(challenge: DailyChallenge, exercise: Exercise) -> tuple:
+    """Texto y teclado del reto diario; DailyChallengeService los guarda en memoria todo el día"""
+    exercise_data = exercise.to_dict()
+    message_text = render_exercise_text(
+        exercise_data, challenge.nivel, challenge.nivel, is_challenge=True, challenge_level=challenge.nivel
+    )
+    return message_text, get_answer_keyboard(exercise_data)
+
+
+async def send_daily_challenge(message: Message, state: FSMContext) -> None:
+    """Envía el reto del día del nivel superior al del usuario (o de su nivel si aquel no tiene)"""
+    user_level = await UserService.get_user_level(message.from_user.id)
+    challenge_level = get_superior_level(user_level)
+
+    result = await DailyChallengeService.get_rendered(challenge_level, render_daily_challenge)
+    if result is None and challenge_level != user_level:
+        result = await DailyChallengeService.get_rendered(user_level, render_daily_challenge)
+    if result is None:
+        await message.answer(
+            "😕 Hoy no hay reto disponible para tu nivel. ¡Vuelve mañana!",
+            reply_markup=MainMenuKeyboard.main_menu(),
+            parse_mode=None
+        )
+        return
+
+    challenge, (message_text, answer_kb) = result
+    await setup_exercise_state(
+        state,
+        ExerciseCatalog.get(challenge.exercise_id).to_dict(),
+        is_challenge=True,
+        challenge_level=challenge.nivel
+    )
+    future = await SendQueue.answer(message, message_text, parse_mode="MarkdownV2", reply_markup=answer_kb)
+    reset_on_failure(future, message, "❌ Error al cargar el reto diario.", state, challenge.exercise_id)
 
 
 async def handle_correct_answer(
@@ -159,17 +290,17 @@ async def handle_correct_answer(
     """Maneja una respuesta correcta"""
     user_id = message.from_user.id
 
-    success = ExerciseService.mark_exercise_completed(
+    success = await ExerciseService.mark_exercise_completed(
         user_id=user_id,
-        exercise_id=user_data["exercise_id"],
-        nivel=user_data["exercise_nivel"],
-        categoria=user_data["exercise_categoria"],
+        exercise_id=exercise_data["id"],
+        nivel=exercise_data["nivel"],
+        categoria=exercise_data["categoria"],
         is_correct=True,
         attempts=attempts
     )
 
     if not success:
-        logger.warning(f"No se pudo marcar el ejercicio {user_data['exercise_id']} como completado")
+        logger.warning(f"No se pudo marcar el ejercicio {exercise_data['id']} como completado")
 
     explanation = escape_markdown_v2(
         exercise_data.get('explicacion', '¡Excelente trabajo! Has acertado la respuesta.')
@@ -180,7 +311,8 @@ async def handle_correct_answer(
 
     if is_challenge:
         challenge_level = user_data.get("challenge_level", "desconocido").upper()
-        await message.answer(
+        future = await SendQueue.answer(
+            message,
             f"✅ *¡Correcto\\!* \\+1 punto\n\n"
             f"💡 *Explicación\\:* {explanation}\n\n"
             f"🏅 ¡Has superado un reto de nivel {escape_markdown_v2(challenge_level)}\\!",
@@ -188,12 +320,15 @@ async def handle_correct_answer(
             parse_mode="MarkdownV2"
         )
     else:
-        await message.answer(
+        future = await SendQueue.answer(
+            message,
             f"✅ *¡Correcto\\!* \\+1 punto\n\n"
             f"💡 *Explicación\\:* {explanation}",
             reply_markup=result_keyboard(is_correct=True),
             parse_mode="MarkdownV2"
         )
+    # El estado ya lo borra quien llama; solo falta avisar al usuario
+    reset_on_failure(future, message, ANSWER_ERROR_TEXT)
 
 
 async def handle_incorrect_answer(
@@ -213,11 +348,11 @@ async def handle_incorrect_answer(
         )
 
         # Marcar como completado
-        ExerciseService.mark_exercise_completed(
+        await ExerciseService.mark_exercise_completed(
             user_id=message.from_user.id,
-            exercise_id=user_data["exercise_id"],
-            nivel=user_data["exercise_nivel"],
-            categoria=user_data["exercise_categoria"],
+            exercise_id=exercise_data["id"],
+            nivel=exercise_data["nivel"],
+            categoria=exercise_data["categoria"],
             is_correct=False,
             attempts=attempts
         )
@@ -226,28 +361,33 @@ async def handle_incorrect_answer(
         is_challenge = user_data.get("is_challenge", False)
 
         if is_challenge:
-            await message.answer(
+            future = await SendQueue.answer(
+                message,
                 f"❌ *La respuesta correcta era\\:* {correct_answer}\n\n"
                 f"💡 *Explicación\\:* {explanation}",
                 reply_markup=challenge_result_keyboard(),
                 parse_mode="MarkdownV2"
             )
         else:
-            await message.answer(
+            future = await SendQueue.answer(
+                message,
                 f"❌ *La respuesta correcta era\\:* {correct_answer}\n\n"
                 f"💡 *Explicación\\:* {explanation}",
                 reply_markup=result_keyboard(is_correct=False),
                 parse_mode="MarkdownV2"
             )
+        reset_on_failure(future, message, ANSWER_ERROR_TEXT)
         await state.clear()
     else:
         # Intentar nuevamente
         await state.update_data({"attempts": attempts})
-        await message.answer(
+        future = await SendQueue.answer(
+            message,
             f"❌ Incorrecto\\. Intenta nuevamente \\(intento {attempts}/{MAX_ATTEMPTS}\\)\\:",
-            reply_markup=create_answer_keyboard(answer_options),
+            reply_markup=get_answer_keyboard(exercise_data),
             parse_mode="MarkdownV2"
         )
+        reset_on_failure(future, message, ANSWER_ERROR_TEXT, state, exercise_data["id"])
 
 
 async def setup_exercise_state(
@@ -256,26 +396,16 @@ async def setup_exercise_state(
         is_challenge: bool = False,
         challenge_level: str = None
 ) -> None:
-    """Configura el estado para un ejercicio (normal o reto)"""
-    options = parse_exercise_options(exercise_data)
-
-    # Validar índice de respuesta correcta
-    correct_index = exercise_data.get("respuesta_correcta", 0)
-    if not isinstance(correct_index, int) or correct_index < 0 or correct_index >= len(options):
-        correct_index = 0
-        logger.warning(f"Índice de respuesta correcta inválido")
-
-    exercise_data['respuesta_correcta'] = correct_index
+    """
+    Configura el estado para un ejercicio (normal o reto).
+    Solo se guarda el id, los intentos y los indicadores; el ejercicio se rehidrata del catálogo.
+    """
+    normalize_correct_index(exercise_data, parse_exercise_options(exercise_data))
 
     # Configurar estado base
     state_data = {
-        "current_exercise": exercise_data,
-        "attempts": 0,
         "exercise_id": exercise_data["id"],
-        "exercise_nivel": exercise_data["nivel"],
-        "exercise_categoria": exercise_data["categoria"],
-        "answer_options": options,
-        "state": ExerciseStates.WAITING_ANSWER
+        "attempts": 0
     }
 
     # Agregar datos específicos de reto si es necesario
@@ -283,6 +413,7 @@ async def setup_exercise_state(
         state_data["is_challenge"] = True
         state_data["challenge_level"] = challenge_level
 
+    await state.set_state(ExerciseStates.waiting_answer)
     await state.update_data(state_data)
 
 
@@ -293,7 +424,7 @@ async def cmd_exercise(message: Message, state: FSMContext):
     try:
         await state.clear()
         user_id = message.from_user.id
-        user_level = UserService.get_user_level(user_id)
+        user_level = await UserService.get_user_level(user_id)
 
         exercise, level_used, message_type = await get_appropriate_exercise(user_id, user_level)
 
@@ -322,13 +453,16 @@ async def cmd_exercise(message: Message, state: FSMContext):
             level_used,
             user_level,
             message_type,
-            is_challenge=False
+            is_challenge=False,
+            state=state
         )
 
     except Exception as e:
         logger.error(f"Error en cmd_exercise para usuario {message.from_user.id}: {e}", exc_info=True)
+        # El estado puede estar ya configurado para un ejercicio que el usuario no ha visto
+        await state.clear()
         await message.answer(
-            "❌ Error al cargar el ejercicio. Intenta nuevamente.",
+            LOAD_ERROR_TEXT,
             reply_markup=MainMenuKeyboard.main_menu(),
             parse_mode=None
         )
@@ -343,7 +477,8 @@ async def handle_reto_diario_button(message: Message, state: FSMContext):
         logger.info(f"🎯 Botón 'Reto Diario' presionado por usuario {message.from_user.id}")
 
         # Usar la misma función que usa el comando /reto
-        await cmd_challenge(message, state)
+        from src.handlers.reto import daily_challenge
+        await daily_challenge(message, state)
 
     except Exception as e:
         logger.error(f"❌ Error en handle_reto_diario_button: {e}", exc_info=True)
@@ -352,73 +487,6 @@ async def handle_reto_diario_button(message: Message, state: FSMContext):
             reply_markup=MainMenuKeyboard.main_menu()
         )
 
-@router.message(Command("reto"))
-@router.callback_query(F.data == "daily_challenge")
-async def cmd_challenge(message: Message | CallbackQuery, state: FSMContext):
-    """Maneja el comando para empezar un reto diario"""
-    try:
-        await state.clear()
-
-        if isinstance(message, CallbackQuery):
-            await message.answer()
-            message = message.message
-            if message.reply_markup:
-                await message.edit_reply_markup(reply_markup=None)
-
-        user_id = message.from_user.id
-        user_level = UserService.get_user_level(user_id)
-
-        # Obtener nivel superior para el reto
-        challenge_level = get_superior_level(user_level)
-
-        # Obtener ejercicio del nivel superior
-        exercise = ExerciseService.get_random_exercise(user_id, challenge_level)
-
-        if not exercise:
-            # Si no hay ejercicios del nivel superior, usar el nivel actual
-            exercise = ExerciseService.get_random_exercise(user_id, user_level)
-            if not exercise:
-                await message.answer(
-                    "🎉 ¡Has completado todos los ejercicios disponibles!",
-                    reply_markup=MainMenuKeyboard.main_menu(),
-                    parse_mode=None
-                )
-                return
-            else:
-                challenge_level = user_level
-
-        # Convertir a dict si es un objeto
-        if hasattr(exercise, 'to_dict'):
-            exercise_data = exercise.to_dict()
-        else:
-            exercise_data = dict(exercise) if hasattr(exercise, '__dict__') else exercise
-
-        # Configurar estado para reto
-        await setup_exercise_state(
-            state,
-            exercise_data,
-            is_challenge=True,
-            challenge_level=challenge_level
-        )
-
-        await send_exercise_message(
-            message,
-            exercise_data,
-            challenge_level,
-            user_level,
-            is_challenge=True,
-            challenge_level=challenge_level
-        )
-
-    except Exception as e:
-        logger.error(f"Error en cmd_challenge para usuario {message.from_user.id}: {e}", exc_info=True)
-        await message.answer(
-            "❌ Error al cargar el reto diario. Intenta nuevamente.",
-            reply_markup=MainMenuKeyboard.main_menu(),
-            parse_mode=None
-        )
-
-
 @router.message(F.text == "❌ Cancelar ejercicio")
 async def cancel_exercise(message: Message, state: FSMContext):
     """Cancelar el ejercicio actual"""
@@ -430,16 +498,14 @@ async def cancel_exercise(message: Message, state: FSMContext):
     )
 
 
-@router.message(F.text)
+@router.message(ExerciseStates.waiting_answer, F.text)
 async def handle_exercise_answer(message: Message, state: FSMContext):
-    """Maneja las respuestas a los ejercicios (normales y retos)"""
+    """
+    Maneja las respuestas a los ejercicios (normales y retos).
+    El filtro de estado descarta el resto de mensajes antes de cargar los datos del usuario.
+    """
     try:
         user_data = await state.get_data()
-        # Validar que el ejercicio en espera no captura otros mensajes
-        if user_data.get("state") != ExerciseStates.WAITING_ANSWER:
-            return
-
-        answer_options = user_data.get("answer_options", [])
         selected_text = message.text
 
         # Manejar cancelación
@@ -447,17 +513,29 @@ async def handle_exercise_answer(message: Message, state: FSMContext):
             await cancel_exercise(message, state)
             return
 
+        exercise_data = get_exercise_data(user_data["exercise_id"])
+        if exercise_data is None:
+            await SendQueue.answer(
+                message,
+                "❌ Este ejercicio ya no está disponible. Prueba con otro.",
+                reply_markup=MainMenuKeyboard.main_menu(),
+                parse_mode=None
+            )
+            await state.clear()
+            return
+
+        answer_options = parse_exercise_options(exercise_data)
+
         # Validar opción seleccionada
         if selected_text not in answer_options:
             options_text = "\n".join([f"• {opt}" for opt in answer_options])
-            await message.answer(
+            await SendQueue.answer(
+                message,
                 f"❌ Opción no válida. Selecciona una de:\n\n{options_text}",
                 parse_mode=None
             )
             return
 
-        user_id = message.from_user.id
-        exercise_data = user_data["current_exercise"]
         selected_option = answer_options.index(selected_text)
         attempts = user_data.get("attempts", 0) + 1
 
@@ -474,7 +552,7 @@ async def handle_exercise_answer(message: Message, state: FSMContext):
     except Exception as e:
         logger.error(f"Error en handle_exercise_answer para usuario {message.from_user.id}: {e}", exc_info=True)
         await message.answer(
-            "❌ Error al procesar tu respuesta. Intenta nuevamente.",
+            ANSWER_ERROR_TEXT,
             reply_markup=MainMenuKeyboard.main_menu(),
             parse_mode=None
         )
@@ -497,7 +575,7 @@ async def next_exercise(callback: CallbackQuery, state: FSMContext):
                 pass
 
         await state.clear()
-        await cmd_exercise(callback.message, state)
+        await cmd_exercise(message_from_callback(callback), state)
 
     except Exception as e:
         logger.error(f"Error en next_exercise: {e}", exc_info=True)
@@ -508,55 +586,6 @@ async def next_exercise(callback: CallbackQuery, state: FSMContext):
         )
 
 
-@router.callback_query(F.data == "new_challenge")
-async def new_challenge_callback(callback: CallbackQuery, state: FSMContext):
-    """Maneja el callback para nuevo reto"""
-    try:
-        await callback.answer()
-
-        try:
-            await callback.message.delete()
-        except Exception as e:
-            logger.warning(f"No se pudo eliminar el mensaje: {e}")
-            try:
-                await callback.message.edit_reply_markup(reply_markup=None)
-            except:
-                pass
-
-        await state.clear()
-        await cmd_challenge(callback.message, state)
-
-    except Exception as e:
-        logger.error(f"Error en new_challenge_callback: {e}", exc_info=True)
-        await callback.message.answer(
-            "❌ Error al cargar el nuevo reto.",
-            reply_markup=MainMenuKeyboard.main_menu(),
-            parse_mode=None
-        )
-
-
-@router.callback_query(F.data == "challenge_main_menu")
-async def challenge_main_menu_callback(callback: CallbackQuery, state: FSMContext):
-    """Maneja el callback para menú principal desde reto"""
-    try:
-        await callback.answer()
-        await state.clear()
-
-        await callback.message.answer(
-            "🏠 Volviendo al menú principal...",
-            reply_markup=MainMenuKeyboard.main_menu(),
-            parse_mode=None
-        )
-
-    except Exception as e:
-        logger.error(f"Error en challenge_main_menu_callback: {e}", exc_info=True)
-        await callback.message.answer(
-            "❌ Error al volver al menú principal.",
-            reply_markup=MainMenuKeyboard.main_menu(),
-            parse_mode=None
-        )
-
-
 @router.callback_query(F.data == "retry_exercise")
 async def retry_exercise(callback: CallbackQuery, state: FSMContext):
     """Maneja el callback para reintentar ejercicio"""
@@ -571,7 +600,7 @@ async def retry_exercise(callback: CallbackQuery, state: FSMContext):
             except:
                 pass
 
-        await cmd_exercise(callback.message, state)
+        await cmd_exercise(message_from_callback(callback), state)
 
     except Exception as e:
         logger.error(f"Error en retry_exercise: {e}", exc_info=True)
@@ -589,7 +618,7 @@ async def show_progress_callback(callback: CallbackQuery):
         await callback.answer()
         user_id = callback.from_user.id
 
-        stats = ExerciseService.get_user_stats(user_id)
+        stats = await ExerciseService.get_user_stats(user_id)
 
         if not stats:
             await callback.message.answer(
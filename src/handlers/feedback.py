@@ -29,8 +29,8 @@ async def receive_opinion(message: Message, state: FSMContext):
     user_id = message.from_user.id
     feedback_text = message.text
     try:
-        with DatabaseService.get_cursor() as cursor:
-            cursor.execute("""
+        async with DatabaseService.get_async_cursor() as cursor:
+            await cursor.execute("""
                 INSERT INTO feedback (user_id, message)
                 VALUES (%s, %s)
             """, (user_id, feedback_text))
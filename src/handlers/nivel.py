@@ -58,7 +58,7 @@ async def set_level(message: Message, state: FSMContext):
             )
         else:
             # Actualizar nivel del usuario
-            UserService.set_user_level(user_id, level)
+            await UserService.set_user_level(user_id, level)
             await message.answer(
                 f"✅ *Nivel actualizado a: {level.capitalize()}*",
                 parse_mode="Markdown",
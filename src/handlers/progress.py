@@ -15,7 +15,7 @@ async def cmd_progress(message: Message, state: FSMContext):  # ✅ AÑADE state
     await state.clear()  # ✅ AHORA SÍ FUNCIONA
 
     user_id = message.from_user.id
-    stats = UserService.get_user_stats(user_id)
+    stats = await UserService.get_user_stats(user_id)
 
     if not stats:
         await message.answer("❌ No se encontraron datos de progreso.")
@@ -1,8 +1,9 @@
 import asyncio
 import logging
 import os
+from typing import Optional
 from aiogram import Bot, Dispatcher, F
-from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.types import Message
 from dotenv import load_dotenv
 
@@ -10,19 +11,16 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    load_dotenv()
-    token = os.getenv('TOKEN')
-
-    if not token:
-        logger.error("❌ Token no encontrado")
-        return
-
-    bot = Bot(token=token)
-    dp = Dispatcher(storage=MemoryStorage())
-
-    from src.services.database import DatabaseService
-    DatabaseService.initialize()
+def build_dispatcher(storage: Optional[BaseStorage] = None, throttling: bool = True) -> Dispatcher:
+    """
+    Crea el Dispatcher con todos los routers y middlewares del bot.
+    Si no se indica storage se usa el configurado en el entorno (ver create_fsm_storage).
+    throttling=False omite el límite por usuario (pruebas de carga que envían a ritmo de máquina).
+    """
+    if storage is None:
+        from src.services.fsm_storage import create_fsm_storage
+        storage = create_fsm_storage()
+    dp = Dispatcher(storage=storage)
 
     # Registrar routers normales
     from src.handlers.commands import router as commands_router
@@ -51,9 +49,84 @@ async def main():
         logger.info(f"Respuesta numérica recibida: {message.text}")
         # Este handler actuará como fallback si los routers no capturan la respuesta
 
-    await bot.delete_webhook(drop_pending_updates=True)
-    logger.info("🚀 Bot híbrido iniciado")
-    await dp.start_polling(bot, allowed_updates=["message", "callback_query"])
+    from src.middlewares.metrics import setup_metrics_middlewares
+    setup_metrics_middlewares(dp)
+
+    if throttling:
+        from src.middlewares.throttling import setup_throttling_middleware
+        setup_throttling_middleware(dp)
+
+    # Al final: la tabla de rutas necesita todos los routers y middlewares ya registrados
+    from src.middlewares.routing import setup_routing_middleware
+    setup_routing_middleware(dp)
+
+    return dp
+
+
+async def main():
+    load_dotenv()
+    token = os.getenv('TOKEN')
+
+    if not token:
+        logger.error("❌ Token no encontrado")
+        return
+
+    bot = Bot(token=token)
+    dp = build_dispatcher()
+
+    from src.services.database import DatabaseService
+    DatabaseService.initialize()
+    await DatabaseService.initialize_async()
+
+    from src.services.exercise_catalog import ExerciseCatalog
+    await ExerciseCatalog.load()
+    catalog_refresh_task = asyncio.create_task(ExerciseCatalog.run_refresh_loop())
+
+    from src.services.curiosity_service import CuriosityService
+    await CuriosityService.load()
+    curiosity_refresh_task = asyncio.create_task(CuriosityService.run_refresh_loop())
+
+    from src.services.profile_cache import UserProfileCache
+    profile_listener_task = asyncio.create_task(UserProfileCache.run_invalidation_listener())
+
+    from src.services.daily_challenge_service import DailyChallengeService
+    await DailyChallengeService.prepare_day()
+    DailyChallengeService.start_scheduler()
+
+    from src.services.send_queue import SendQueue
+    SendQueue.start()
+
+    from src.services.answer_log import AnswerLog
+    AnswerLog.start()
+
+    # METRICS_PORT expone /metrics en formato Prometheus en un puerto aparte
+    metrics_runner = None
+    metrics_port = os.getenv("METRICS_PORT")
+    if metrics_port:
+        from src.web_handlers.metrics import start_metrics_server
+        metrics_runner = await start_metrics_server(int(metrics_port))
+
+    # BOT_MODE=webhook sirve los updates por HTTP; por defecto se usa long polling
+    mode = os.getenv("BOT_MODE", "polling").lower()
+    try:
+        if mode == "webhook":
+            from src.web_handlers.webhook import run_webhook
+            logger.info("🚀 Bot híbrido iniciado en modo webhook")
+            await run_webhook(dp, bot)
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            logger.info("🚀 Bot híbrido iniciado")
+            await dp.start_polling(bot, allowed_updates=["message", "callback_query"])
+    finally:
+        catalog_refresh_task.cancel()
+        curiosity_refresh_task.cancel()
+        profile_listener_task.cancel()
+        DailyChallengeService.stop_scheduler()
+        await SendQueue.stop()
+        await AnswerLog.stop()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await DatabaseService.close_async()
 
     @dp.message()
     async def unhandled_message(message: Message):
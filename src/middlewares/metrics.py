@@ -0,0 +1,57 @@
+# middlewares/metrics.py
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+from src.utils.metrics import (
+    HANDLER_DURATION, HANDLER_ERRORS, HANDLER_IN_FLIGHT, UPDATE_DURATION, UPDATES_IN_FLIGHT
+)
+
+Handler = Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]]
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Middleware externo sobre dp.update: mide cada update completo (filtros, middlewares
+    y handler) y cuántos se están procesando a la vez.
+    """
+
+    async def __call__(self, handler: Handler, event: Update, data: Dict[str, Any]) -> Any:
+        event_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        UPDATES_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            UPDATES_IN_FLIGHT.dec()
+            UPDATE_DURATION.observe(time.perf_counter() - started, event_type=event_type)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Middleware interno: se ejecuta cuando los filtros ya han elegido handler, de modo que
+    la latencia, las llamadas en curso y los errores se etiquetan con su nombre.
+    """
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        handler_object = data.get("handler")
+        callback = getattr(handler_object, "callback", None)
+        name = f"{callback.__module__}.{callback.__name__}" if callback is not None else "unknown"
+
+        HANDLER_IN_FLIGHT.inc(handler=name)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_IN_FLIGHT.dec(handler=name)
+            HANDLER_DURATION.observe(time.perf_counter() - started, handler=name)
+
+
+def setup_metrics_middlewares(dp: Dispatcher) -> None:
+    """Registra los middlewares de métricas; los internos se heredan en todos los routers incluidos"""
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.callback_query.middleware(HandlerMetricsMiddleware())
@@ -0,0 +1,187 @@
+# middlewares/routing.py
+import logging
+import operator
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+from aiogram import BaseMiddleware, Dispatcher, Router
+from aiogram.dispatcher.event.handler import FilterObject, HandlerObject
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]]
+
+# Tipo de evento → atributo del update que se compara con igualdad exacta
+KEY_ATTRIBUTES = {"message": "text", "callback_query": "data"}
+
+
+class DuplicateRouteError(ValueError):
+    """Dos handlers se registran para el mismo texto, comando o callback_data"""
+
+
+@dataclass
+class Route:
+    """Handler indexado por clave y lo que hay que comprobar antes de llamarlo directamente"""
+    handler: HandlerObject
+    router: Router
+    middlewares: List[Any]
+    # Handlers genéricos (estados, regexp...) que van antes en el orden de aiogram
+    preceding: List[HandlerObject] = field(default_factory=list)
+
+
+def _filter_keys(event_name: str, filter_object: FilterObject) -> Optional[List[Hashable]]:
+    """Claves exactas de un filtro (F.text == "...", F.data == "..." o Command) o None si no es indexable"""
+    magic = filter_object.magic
+    if magic is not None:
+        operations = magic._operations
+        if len(operations) != 2:
+            return None
+        attribute, comparison = operations
+        if getattr(attribute, "name", None) != KEY_ATTRIBUTES[event_name]:
+            return None
+        if getattr(comparison, "comparator", None) is not operator.eq or not isinstance(comparison.right, str):
+            return None
+        return [("text" if event_name == "message" else "data", comparison.right)]
+
+    command = filter_object.callback
+    if event_name == "message" and type(command) is Command:
+        if command.prefix != "/" or command.ignore_case or command.magic is not None:
+            return None
+        if not all(isinstance(name, str) for name in command.commands):
+            return None
+        return [("command", name) for name in command.commands]
+
+    return None
+
+
+def _handler_keys(event_name: str, handler: HandlerObject) -> Optional[List[Hashable]]:
+    filters = handler.filters or []
+    if len(filters) != 1:
+        return None
+    return _filter_keys(event_name, filters[0])
+
+
+def _iter_handlers(router: Router, event_name: str) -> Iterator[Tuple[Router, HandlerObject]]:
+    """Handlers en el mismo orden en que aiogram los prueba: los del router y luego sus sub-routers"""
+    observer = router.observers.get(event_name)
+    if observer is not None:
+        for handler in observer.handlers:
+            yield router, handler
+    for sub_router in router.sub_routers:
+        yield from _iter_handlers(sub_router, event_name)
+
+
+def _resolve_middlewares(router: Router, event_name: str) -> List[Any]:
+    """Middlewares internos que aiogram aplicaría al handler (del Dispatcher hacia el router)"""
+    middlewares = []
+    for parent in reversed(tuple(router.chain_head)):
+        observer = parent.observers.get(event_name)
+        if observer is not None:
+            middlewares.extend(observer.middleware)
+    return middlewares
+
+
+class RoutingTable:
+    """
+    Mapa clave → handler construido una vez a partir de todos los routers del Dispatcher.
+
+    Solo se indexan los handlers cuyo único filtro es una igualdad exacta sobre el texto o
+    el callback_data, o un Command. Si dos de ellos comparten clave se lanza
+    DuplicateRouteError al arrancar, en lugar de que el segundo quede oculto sin avisar.
+    """
+
+    def __init__(self, dp: Dispatcher):
+        self.routes: Dict[str, Dict[Hashable, Route]] = {}
+        for event_name in KEY_ATTRIBUTES:
+            self.routes[event_name] = self._build(dp, event_name)
+
+    @staticmethod
+    def _build(dp: Dispatcher, event_name: str) -> Dict[Hashable, Route]:
+        routes: Dict[Hashable, Route] = {}
+        owners: Dict[Hashable, str] = {}
+        generic: List[HandlerObject] = []
+
+        for router, handler in _iter_handlers(dp, event_name):
+            keys = _handler_keys(event_name, handler)
+            if keys is None:
+                generic.append(handler)
+                continue
+
+            name = f"{handler.callback.__module__}.{handler.callback.__name__}"
+            for key in keys:
+                if key in owners:
+                    raise DuplicateRouteError(
+                        f"{event_name} {key[0]}={key[1]!r} registrado en {owners[key]} y en {name}"
+                    )
+                owners[key] = name
+                routes[key] = Route(handler, router, _resolve_middlewares(router, event_name), list(generic))
+
+        logger.info(f"Tabla de rutas {event_name}: {len(routes)} claves, {len(generic)} handlers genéricos")
+        return routes
+
+    @staticmethod
+    def event_key(event: TelegramObject) -> Optional[Hashable]:
+        """Clave de búsqueda de un update; None si no puede resolverse por tabla"""
+        if isinstance(event, CallbackQuery):
+            return ("data", event.data) if event.data is not None else None
+        if isinstance(event, Message) and event.text:
+            if not event.text.startswith("/"):
+                return "text", event.text
+            name = event.text.split(maxsplit=1)[0][1:]
+            # "/cmd@bot" necesita comprobar el nombre del bot: se deja al filtro Command
+            if name and "@" not in name:
+                return "command", name
+        return None
+
+    def lookup(self, event_name: str, event: TelegramObject) -> Optional[Route]:
+        key = self.event_key(event)
+        if key is None:
+            return None
+        return self.routes.get(event_name, {}).get(key)
+
+
+class RoutingMiddleware(BaseMiddleware):
+    """
+    Middleware externo que resuelve con la tabla los mensajes y callbacks de clave exacta.
+
+    Antes de llamar al handler comprueba solo los handlers genéricos que aiogram probaría
+    antes que él (estados como LevelStates.waiting_level, el fallback numérico...); si
+    alguno coincide, o la clave no está en la tabla, el update sigue el camino normal.
+    """
+
+    def __init__(self, table: RoutingTable, event_name: str):
+        self.table = table
+        self.event_name = event_name
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        route = self.table.lookup(self.event_name, event)
+        if route is None:
+            return await handler(event, data)
+
+        for preceding in route.preceding:
+            matched, _ = await preceding.check(event, **data)
+            if matched:
+                return await handler(event, data)
+
+        # El filtro propio es uno solo y barato; además aporta datos como command (CommandObject)
+        matched, kwargs = await route.handler.check(event, **data)
+        if not matched:
+            return await handler(event, data)
+
+        kwargs.update(handler=route.handler, event_router=route.router)
+        wrapped = route.router.observers[self.event_name].outer_middleware.wrap_middlewares(
+            route.middlewares, route.handler.call
+        )
+        return await wrapped(event, kwargs)
+
+
+def setup_routing_middleware(dp: Dispatcher) -> RoutingTable:
+    """
+    Construye la tabla con los routers ya incluidos; debe llamarse al final de
+    build_dispatcher, cuando ya están registrados todos los routers y middlewares.
+    """
+    table = RoutingTable(dp)
+    dp.message.outer_middleware(RoutingMiddleware(table, "message"))
+    dp.callback_query.outer_middleware(RoutingMiddleware(table, "callback_query"))
+    return table
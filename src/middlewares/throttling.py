@@ -0,0 +1,128 @@
+# middlewares/throttling.py
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import CallbackQuery, Message, TelegramObject, User
+from src.utils.cache import LRUCache
+from src.utils.metrics import THROTTLED_UPDATES
+from src.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]]
+
+# Valores por defecto; se pueden cambiar con THROTTLE_RATE, THROTTLE_BURST y THROTTLE_DUPLICATE_WINDOW
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 5
+DEFAULT_DUPLICATE_WINDOW = 1.0
+MAX_TRACKED_USERS = 10000
+
+RATE_LIMITED_TEXT = "⏳ Vas muy rápido, espera un momento."
+
+
+class _UserSlot:
+    """Cerrojo que serializa los updates de un usuario y cuántos lo están usando"""
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Middleware externo para mensajes y callbacks de cada usuario.
+
+    - Serializa los updates de un mismo usuario: el siguiente espera a que acabe el anterior.
+    - Descarta la repetición de un mismo callback_data o texto dentro de duplicate_window
+      segundos (dobles toques), también si el primero todavía se está procesando.
+    - Limita cada usuario a `rate` updates por segundo con ráfagas de `burst`.
+
+    Los callbacks descartados se responden con callback.answer() para quitar el reloj del
+    botón; nada de esto llega a los handlers ni a la base de datos.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: float = DEFAULT_BURST,
+                 duplicate_window: float = DEFAULT_DUPLICATE_WINDOW,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.duplicate_window = duplicate_window
+        self._clock = clock
+        self._buckets = LRUCache(maxsize=MAX_TRACKED_USERS)
+        self._last_seen = LRUCache(maxsize=MAX_TRACKED_USERS)
+        self._slots: Dict[int, _UserSlot] = {}
+
+    @staticmethod
+    def _event_key(event: TelegramObject) -> Optional[Hashable]:
+        if isinstance(event, CallbackQuery):
+            return "callback", event.data
+        if isinstance(event, Message):
+            return "message", event.text
+        return None
+
+    def _is_duplicate(self, user_id: int, key: Hashable, now: float) -> bool:
+        last = self._last_seen.get(user_id)
+        if last is not None and last[0] == key and now - last[1] < self.duplicate_window:
+            return True
+        self._last_seen.set(user_id, (key, now))
+        return False
+
+    def _rate_wait(self, user_id: int) -> float:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, self._clock)
+            self._buckets.set(user_id, bucket)
+        return bucket.try_acquire()
+
+    @staticmethod
+    async def _reject(event: TelegramObject, text: Optional[str] = None) -> None:
+        if isinstance(event, CallbackQuery):
+            try:
+                await event.answer(text)
+            except Exception as e:
+                logger.debug(f"No se pudo responder al callback descartado: {e}")
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: Dict[str, Any]) -> Any:
+        user: Optional[User] = data.get("event_from_user")
+        key = self._event_key(event)
+        if user is None or key is None:
+            return await handler(event, data)
+
+        if self._is_duplicate(user.id, key, self._clock()):
+            THROTTLED_UPDATES.inc(reason="duplicate")
+            await self._reject(event)
+            return None
+
+        if self._rate_wait(user.id) > 0:
+            THROTTLED_UPDATES.inc(reason="rate")
+            logger.info(f"Usuario {user.id} limitado por exceso de updates")
+            await self._reject(event, RATE_LIMITED_TEXT)
+            return None
+
+        slot = self._slots.get(user.id)
+        if slot is None:
+            slot = self._slots[user.id] = _UserSlot()
+        slot.users += 1
+        try:
+            async with slot.lock:
+                return await handler(event, data)
+        finally:
+            slot.users -= 1
+            if slot.users == 0:
+                del self._slots[user.id]
+
+
+def setup_throttling_middleware(dp: Dispatcher) -> ThrottlingMiddleware:
+    """Registra una única instancia para mensajes y callbacks, de modo que compartan el estado"""
+    middleware = ThrottlingMiddleware(
+        rate=float(os.getenv("THROTTLE_RATE", DEFAULT_RATE)),
+        burst=float(os.getenv("THROTTLE_BURST", DEFAULT_BURST)),
+        duplicate_window=float(os.getenv("THROTTLE_DUPLICATE_WINDOW", DEFAULT_DUPLICATE_WINDOW))
+    )
+    dp.message.outer_middleware(middleware)
+    dp.callback_query.outer_middleware(middleware)
+    return middleware
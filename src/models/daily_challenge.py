@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+from datetime import date
+
+
+@dataclass
+class DailyChallenge:
+    challenge_date: date
+    nivel: str
+    exercise_id: int
+
+    def to_dict(self):
+        return {
+            "challenge_date": self.challenge_date,
+            "nivel": self.nivel,
+            "exercise_id": self.exercise_id
+        }
@@ -8,4 +8,6 @@ class UserExercise:
     exercise_id: int
     completed_at: datetime
     nivel: str
-    categoria: str
\ No newline at end of file
+    categoria: str
+    is_correct: bool = False
+    attempts: int = 0
\ No newline at end of file
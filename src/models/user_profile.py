@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class UserProfile:
+    user_id: int
+    level: str = "principiante"
+    username: Optional[str] = None
+    registered: bool = False
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "level": self.level,
+            "username": self.username,
+            "registered": self.registered
+        }
@@ -0,0 +1,61 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+# La racha cuenta los días con algún acierto desde CURRENT_DATE - 7 días: bastan 8 días distintos
+RECENT_DAYS_KEPT = 8
+STREAK_WINDOW_DAYS = 7
+
+
+@dataclass
+class UserStats:
+    user_id: int
+    total: int = 0
+    correct: int = 0
+    level_counts: Dict[str, List[int]] = field(default_factory=dict)  # nivel -> [total, correctos]
+    category_counts: Dict[str, List[int]] = field(default_factory=dict)  # categoria -> [total, correctos]
+    last_practice: Optional[datetime] = None
+    recent_days: List[date] = field(default_factory=list)  # días con aciertos, del más reciente al más antiguo
+
+    def apply_completion(self, nivel: str, categoria: str, is_correct: bool,
+                         completed_at: datetime, previous_is_correct: Optional[bool] = None):
+        """
+        Actualiza los contadores con una fila de user_ejercicios recién escrita.
+        previous_is_correct es None si la fila es nueva, o el valor anterior si se ha actualizado.
+        """
+        if previous_is_correct is None:
+            delta_total = 1
+            delta_correct = int(is_correct)
+        else:
+            delta_total = 0
+            delta_correct = int(is_correct) - int(previous_is_correct)
+
+        self.total += delta_total
+        self.correct += delta_correct
+        for counts, key in ((self.level_counts, nivel), (self.category_counts, categoria)):
+            key_total, key_correct = counts.get(key, [0, 0])
+            counts[key] = [key_total + delta_total, key_correct + delta_correct]
+
+        if self.last_practice is None or completed_at > self.last_practice:
+            self.last_practice = completed_at
+
+        if is_correct:
+            day = completed_at.date()
+            if day not in self.recent_days:
+                self.recent_days = sorted(self.recent_days + [day], reverse=True)[:RECENT_DAYS_KEPT]
+
+    def streak_days(self, today: date) -> int:
+        """Días distintos con al menos un acierto en la última semana"""
+        since = today - timedelta(days=STREAK_WINDOW_DAYS)
+        return sum(1 for day in self.recent_days if day >= since)
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "total": self.total,
+            "correct": self.correct,
+            "level_counts": self.level_counts,
+            "category_counts": self.category_counts,
+            "last_practice": self.last_practice,
+            "recent_days": self.recent_days
+        }
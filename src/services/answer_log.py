@@ -0,0 +1,259 @@
+# services/answer_log.py
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from src.models.user_exercise import UserExercise
+from src.services.completion_cache import CompletionCache
+from src.services.database import DatabaseService
+from src.services.stats_service import StatsService
+from src.utils.metrics import ANSWER_LOG_BATCH_SIZE, ANSWER_LOG_PENDING
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 0.2
+MAX_BATCH_EVENTS = 500
+# Más respuestas en el buffer (p. ej. durante una caída de la base de datos) se escriben directamente
+MAX_BUFFERED_EVENTS = 10000
+# Tras estos volcados fallidos seguidos el lote se escribe fila a fila y se descartan las filas que fallen
+MAX_FLUSH_ATTEMPTS = 3
+# Filas por sentencia: 7 parámetros por fila, lejos del límite de 65535 de PostgreSQL
+MAX_STATEMENT_ROWS = 1000
+STOP_TIMEOUT_SECONDS = 10
+
+ROW_TEMPLATE = "(%s::bigint, %s::integer, %s::text, %s::text, %s::boolean, %s::integer, %s::timestamp)"
+
+# Mismo upsert que mark_exercise_completed, para muchas filas: previous lee las filas
+# anteriores en la misma instantánea y xmax = 0 indica que la fila se acaba de insertar
+UPSERT_SQL = """
+    WITH v (user_id, exercise_id, nivel, categoria, is_correct, attempts, completed_at) AS (
+        VALUES {values}
+    ),
+    previous AS (
+        SELECT ue.user_id, ue.exercise_id, ue.is_correct
+        FROM user_ejercicios ue
+        JOIN v ON v.user_id = ue.user_id AND v.exercise_id = ue.exercise_id
+    )
+    INSERT INTO user_ejercicios (user_id, exercise_id, nivel, categoria, is_correct, attempts, completed_at)
+    SELECT user_id, exercise_id, nivel, categoria, is_correct, attempts, completed_at FROM v
+    ON CONFLICT (user_id, exercise_id) DO UPDATE SET
+        is_correct = EXCLUDED.is_correct,
+        attempts = EXCLUDED.attempts,
+        nivel = EXCLUDED.nivel,
+        categoria = EXCLUDED.categoria,
+        completed_at = EXCLUDED.completed_at
+    RETURNING id, user_id, exercise_id, (xmax = 0) AS inserted,
+              (SELECT p.is_correct FROM previous p
+               WHERE p.user_id = user_ejercicios.user_id AND p.exercise_id = user_ejercicios.exercise_id)
+"""
+
+# user_id → exercise_id → última respuesta registrada
+Batch = Dict[int, Dict[int, UserExercise]]
+
+
+class AnswerLog:
+    """
+    Buffer de escritura diferida para user_ejercicios.
+
+    record guarda la respuesta en memoria y vuelve en el acto; una tarea de fondo vuelca el
+    buffer cada FLUSH_INTERVAL_SECONDS, o antes si se acumulan MAX_BATCH_EVENTS respuestas,
+    con un upsert multi-fila y la actualización de user_stats en una sola transacción (un
+    COMMIT por lote en lugar de uno por respuesta). Si el mismo usuario responde dos veces
+    al mismo ejercicio antes del volcado, solo se escribe la última respuesta.
+
+    Las lecturas ven lo que aún no se ha escrito: CompletionCache incluye las respuestas
+    pendientes y StatsService.get_stats vuelca el buffer si el usuario tiene alguna.
+    Si el buffer no se ha iniciado (scripts, tests) o está lleno, mark_exercise_completed
+    escribe directamente. Un lote que falla MAX_FLUSH_ATTEMPTS veces seguidas se escribe fila
+    a fila, de modo que una fila imposible de guardar no bloquea las del resto de usuarios.
+    """
+    _pending: Batch = {}
+    _flushing: Batch = {}
+    _count = 0
+    _failed_flushes = 0
+    _max_events = MAX_BATCH_EVENTS
+    _max_buffered = MAX_BUFFERED_EVENTS
+    _flush_interval = FLUSH_INTERVAL_SECONDS
+    _task: Optional[asyncio.Task] = None
+    _wakeup: Optional[asyncio.Event] = None
+    _flush_lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def start(cls, flush_interval: float = FLUSH_INTERVAL_SECONDS, max_events: int = MAX_BATCH_EVENTS,
+              max_buffered: int = MAX_BUFFERED_EVENTS):
+        """Inicia la tarea que vuelca el buffer"""
+        if cls._task is not None:
+            return
+        cls._pending = {}
+        cls._flushing = {}
+        cls._count = 0
+        cls._failed_flushes = 0
+        cls._flush_interval = flush_interval
+        cls._max_events = max_events
+        cls._max_buffered = max_buffered
+        cls._wakeup = asyncio.Event()
+        cls._flush_lock = asyncio.Lock()
+        cls._task = asyncio.create_task(cls._run())
+        logger.info(f"Buffer de respuestas iniciado (cada {flush_interval * 1000:.0f} ms o {max_events} respuestas)")
+
+    @classmethod
+    async def stop(cls, timeout: float = STOP_TIMEOUT_SECONDS):
+        """Detiene la tarea y escribe lo que quede en el buffer"""
+        if cls._task is None:
+            return
+        cls._task.cancel()
+        await asyncio.gather(cls._task, return_exceptions=True)
+        cls._task = None
+
+        try:
+            await asyncio.wait_for(cls.flush(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        if cls._count:
+            logger.warning(f"Buffer de respuestas detenido con {cls._count} respuestas sin escribir")
+
+    @classmethod
+    def is_running(cls) -> bool:
+        return cls._task is not None
+
+    @classmethod
+    def pending(cls) -> int:
+        """Respuestas en el buffer o en un volcado en curso"""
+        return cls._count + sum(len(records) for records in cls._flushing.values())
+
+    @classmethod
+    def has_pending(cls, user_id: int) -> bool:
+        return user_id in cls._pending or user_id in cls._flushing
+
+    @classmethod
+    def pending_exercise_ids(cls, user_id: int) -> List[int]:
+        """Ejercicios del usuario registrados que aún no están confirmados en la base de datos"""
+        return list(cls._pending.get(user_id, ())) + list(cls._flushing.get(user_id, ()))
+
+    @classmethod
+    def record(cls, user_id: int, exercise_id: int, nivel: str, categoria: str,
+               is_correct: bool, attempts: int) -> Optional[UserExercise]:
+        """
+        Registra una respuesta sin esperar a la base de datos. La fila devuelve id None hasta
+        que se escribe; completed_at es el momento de la respuesta, no el del volcado.
+        Devuelve None si el buffer está lleno: quien llama debe escribir la respuesta él mismo.
+        """
+        records = cls._pending.get(user_id, {})
+        # Sustituir una respuesta ya pendiente no hace crecer el buffer
+        if exercise_id not in records and cls._count >= cls._max_buffered:
+            logger.warning(f"Buffer de respuestas lleno ({cls._count}), escritura directa para el usuario {user_id}")
+            return None
+
+        record = UserExercise(
+            id=None,
+            user_id=user_id,
+            exercise_id=exercise_id,
+            completed_at=datetime.now(),
+            nivel=nivel,
+            categoria=categoria,
+            is_correct=is_correct,
+            attempts=attempts
+        )
+        records = cls._pending.setdefault(user_id, records)
+        if exercise_id not in records:
+            cls._count += 1
+        records[exercise_id] = record
+
+        CompletionCache.mark_completed(user_id, exercise_id)
+        ANSWER_LOG_PENDING.set(cls._count)
+        if cls._count >= cls._max_events:
+            cls._wakeup.set()
+        return record
+
+    @classmethod
+    async def flush(cls) -> int:
+        """Escribe el buffer en una transacción y devuelve cuántas respuestas se guardaron"""
+        if cls._flush_lock is None:
+            return 0
+        async with cls._flush_lock:
+            if not cls._pending:
+                return 0
+            batch, cls._pending, cls._count = cls._pending, {}, 0
+            cls._flushing = batch
+            ANSWER_LOG_PENDING.set(0)
+            try:
+                if cls._failed_flushes >= MAX_FLUSH_ATTEMPTS:
+                    written = await cls._write_row_by_row(batch)
+                else:
+                    written = await cls._write(batch)
+            except Exception as e:
+                cls._failed_flushes += 1
+                logger.error(
+                    f"Error al volcar el buffer de respuestas (intento {cls._failed_flushes}/"
+                    f"{MAX_FLUSH_ATTEMPTS}), se reintentará: {e}"
+                )
+                cls._requeue(batch)
+                return 0
+            finally:
+                cls._flushing = {}
+            cls._failed_flushes = 0
+
+        for user_id in batch:
+            StatsService.invalidate(user_id)
+        ANSWER_LOG_BATCH_SIZE.observe(written)
+        logger.debug(f"Buffer de respuestas: {written} filas de {len(batch)} usuarios escritas")
+        return written
+
+    @classmethod
+    def _requeue(cls, batch: Batch):
+        """Devuelve al buffer un lote fallido sin pisar las respuestas registradas después"""
+        for user_id, records in batch.items():
+            merged = dict(records)
+            merged.update(cls._pending.get(user_id, {}))
+            cls._pending[user_id] = merged
+        cls._count = sum(len(records) for records in cls._pending.values())
+        ANSWER_LOG_PENDING.set(cls._count)
+
+    @classmethod
+    async def _write_row_by_row(cls, batch: Batch) -> int:
+        """Último recurso tras varios fallos: cada fila en su transacción; las que fallen se descartan"""
+        written = 0
+        for user_id, records in batch.items():
+            for exercise_id, record in records.items():
+                try:
+                    written += await cls._write({user_id: {exercise_id: record}})
+                except Exception as e:
+                    logger.error(f"Respuesta descartada (usuario {user_id}, ejercicio {exercise_id}): {e}")
+        return written
+
+    @staticmethod
+    async def _write(batch: Batch) -> int:
+        rows = [record for records in batch.values() for record in records.values()]
+        completions = []
+        async with DatabaseService.get_async_cursor() as cursor:
+            # Bloquear los resúmenes antes del upsert (ver StatsService.lock_summary)
+            summaries = await StatsService.lock_summaries(cursor, batch)
+            for start in range(0, len(rows), MAX_STATEMENT_ROWS):
+                chunk = rows[start:start + MAX_STATEMENT_ROWS]
+                values, params = DatabaseService.values_clause(ROW_TEMPLATE, [
+                    (r.user_id, r.exercise_id, r.nivel, r.categoria, r.is_correct, r.attempts, r.completed_at)
+                    for r in chunk
+                ])
+                await cursor.execute(UPSERT_SQL.format(values=values), params)
+
+                for row_id, user_id, exercise_id, inserted, previous_is_correct in await cursor.fetchall():
+                    record = batch[user_id][exercise_id]
+                    record.id = row_id
+                    completions.append((
+                        user_id, record.nivel, record.categoria, record.is_correct, record.completed_at,
+                        StatsService.previous_correctness(user_id, inserted, previous_is_correct, record.is_correct)
+                    ))
+
+            # El resumen se actualiza en la misma transacción que las filas
+            await StatsService.record_completions(cursor, summaries, completions)
+        return len(rows)
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            try:
+                await asyncio.wait_for(cls._wakeup.wait(), cls._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            cls._wakeup.clear()
+            await cls.flush()
@@ -29,7 +29,7 @@ async def verify_answer_logic(
     is_correct = selected_answer == exercise_data["respuesta_correcta"]
 
     # Marcar como completado
-    success = ExerciseService.mark_exercise_completed(
+    success = await ExerciseService.mark_exercise_completed(
         user_id=user_id,
         exercise_id=exercise_id,
         nivel=exercise_data["nivel"],
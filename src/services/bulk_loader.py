@@ -0,0 +1,251 @@
+# services/bulk_loader.py
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from psycopg2.extras import execute_values
+from src.services.database import DatabaseService
+from src.utils.exercise_utils import ExerciseRecord
+from src.utils.hashing import exercise_hash
+from src.utils.options import OptionsError, normalize_options, serialize_options
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+# Clave de pg_advisory_xact_lock que serializa los cambios de versión del catálogo
+CATALOG_LOCK_KEY = 7102
+
+EXERCISE_COLUMNS = "categoria, nivel, pregunta, opciones, respuesta_correcta, explicacion, content_hash"
+INSERT_STAGING_SQL = f"INSERT INTO ejercicios_staging ({EXERCISE_COLUMNS}) VALUES %s"
+STAGING_TEMPLATE = "(%s, %s, %s, %s, %s, %s, %s)"
+
+# Copia vacía con los mismos tipos que ejercicios (opciones puede ser TEXT o TEXT[])
+CREATE_STAGING_SQL = f"""
+    CREATE TEMP TABLE ejercicios_staging ON COMMIT DROP AS
+    SELECT {EXERCISE_COLUMNS} FROM ejercicios WITH NO DATA
+"""
+
+# Fila que conserva el id de cada huella: la más antigua, para no romper user_ejercicios
+KEEPER_CONDITION = "e.id = (SELECT MIN(k.id) FROM ejercicios k WHERE k.content_hash = s.content_hash)"
+
+# Sentencias del cambio de versión; se ejecutan en la misma transacción que la carga
+SWAP_UPDATE_SQL = f"""
+    UPDATE ejercicios e
+    SET respuesta_correcta = s.respuesta_correcta, explicacion = s.explicacion, activo = TRUE
+    FROM ejercicios_staging s
+    WHERE e.content_hash = s.content_hash AND {KEEPER_CONDITION}
+      AND (e.respuesta_correcta IS DISTINCT FROM s.respuesta_correcta
+           OR e.explicacion IS DISTINCT FROM s.explicacion
+           OR e.activo IS NOT TRUE)
+"""
+SWAP_INSERT_SQL = f"""
+    INSERT INTO ejercicios ({EXERCISE_COLUMNS}, activo)
+    SELECT {EXERCISE_COLUMNS}, TRUE
+    FROM ejercicios_staging s
+    WHERE NOT EXISTS (SELECT 1 FROM ejercicios e WHERE e.content_hash = s.content_hash)
+"""
+SWAP_DEACTIVATE_SQL = f"""
+    UPDATE ejercicios e
+    SET activo = FALSE
+    WHERE e.activo AND NOT EXISTS (
+        SELECT 1 FROM ejercicios_staging s
+        WHERE s.content_hash = e.content_hash AND {KEEPER_CONDITION}
+    )
+"""
+SWAP_VERSION_SQL = """
+    INSERT INTO catalog_versions (exercises, inserted, updated, deactivated)
+    VALUES (%s, %s, %s, %s)
+    RETURNING version
+"""
+
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass
+class BulkLoadReport:
+    """Resultado de una carga masiva de ejercicios"""
+    total: int = 0
+    staged: int = 0
+    inserted: int = 0
+    updated: int = 0
+    deactivated: int = 0
+    skipped: int = 0
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+    elapsed: float = 0.0
+    version: Optional[int] = None
+
+    @property
+    def unchanged(self) -> int:
+        return self.staged - self.inserted - self.updated
+
+    def to_dict(self):
+        return {
+            "total": self.total,
+            "success": self.staged,
+            "errors": len(self.errors),
+            "skipped": self.skipped,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "deactivated": self.deactivated,
+            "unchanged": self.unchanged,
+            "version": self.version,
+            "elapsed": round(self.elapsed, 3)
+        }
+
+
+def validate_exercise(ejercicio: Dict) -> Tuple[str, List[str], int, Optional[str]]:
+    """Comprueba un ejercicio del JSON y devuelve (pregunta, opciones, respuesta, explicación)"""
+    if not isinstance(ejercicio, dict):
+        raise ValueError("el ejercicio debe ser un objeto")
+
+    pregunta = ejercicio.get("pregunta")
+    if not isinstance(pregunta, str) or not pregunta.strip():
+        raise ValueError("falta la pregunta")
+
+    opciones = normalize_options(ejercicio.get("opciones"))
+    if len(opciones) < 2:
+        raise ValueError("se necesitan al menos dos opciones")
+
+    respuesta = ejercicio.get("respuesta")
+    if not isinstance(respuesta, int) or isinstance(respuesta, bool) or not 0 <= respuesta < len(opciones):
+        raise ValueError(f"respuesta inválida: {respuesta!r} (debe estar entre 0 y {len(opciones) - 1})")
+
+    return pregunta, opciones, respuesta, ejercicio.get("explicacion")
+
+
+class ExerciseBulkLoader:
+    """
+    Carga masiva de ejercicios a partir de registros (nivel, categoría, i, ejercicio).
+
+    Las filas se validan una a una (los errores se acumulan sin detener la carga) y se
+    insertan en lotes con INSERT multi-fila de execute_values, todo en una transacción.
+    Cada ejercicio lleva su content_hash, que identifica el mismo ejercicio entre cargas,
+    así que repetir una carga no duplica nada.
+    """
+
+    @staticmethod
+    def options_column_is_array(cursor) -> bool:
+        """La columna opciones es TEXT[] en unas instalaciones y TEXT (JSON) en otras"""
+        cursor.execute("""
+            SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'ejercicios' AND column_name = 'opciones'
+        """)
+        result = cursor.fetchone()
+        return result is not None and result[0] == "ARRAY"
+
+    @staticmethod
+    def iter_rows(records: Iterable[ExerciseRecord], report: BulkLoadReport, as_array: bool) -> Iterator[tuple]:
+        """
+        Filas listas para insertar. Los ejercicios inválidos se anotan en report.errors y los
+        repetidos dentro de la misma carga se cuentan en report.skipped.
+        """
+        seen: Dict[str, str] = {}
+        for nivel, categoria, i, ejercicio in records:
+            report.total += 1
+            position = f"{nivel}/{categoria}[{i}]"
+            try:
+                pregunta, opciones, respuesta, explicacion = validate_exercise(ejercicio)
+            except (ValueError, OptionsError) as e:
+                report.errors.append((position, str(e)))
+                continue
+
+            hash_value = exercise_hash(nivel, categoria, pregunta, opciones)
+            if hash_value in seen:
+                logger.info(f"Ejercicio {position} omitido: duplicado de {seen[hash_value]}")
+                report.skipped += 1
+                continue
+            seen[hash_value] = position
+
+            opciones_value = opciones if as_array else serialize_options(opciones)
+            yield categoria, nivel, pregunta, opciones_value, respuesta, explicacion, hash_value
+
+    @classmethod
+    def _stage_rows(cls, cursor, rows: Iterator[tuple], report: BulkLoadReport, batch_size: int,
+                    progress: Optional[ProgressCallback]) -> None:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cls._stage_batch(cursor, batch, report, progress)
+                batch = []
+        if batch:
+            cls._stage_batch(cursor, batch, report, progress)
+
+    @staticmethod
+    def _stage_batch(cursor, batch: List[tuple], report: BulkLoadReport,
+                     progress: Optional[ProgressCallback]) -> None:
+        execute_values(cursor, INSERT_STAGING_SQL, batch, template=STAGING_TEMPLATE, page_size=len(batch))
+        report.staged += len(batch)
+        if progress is not None:
+            progress(report.staged, report.total)
+
+    @staticmethod
+    def backfill_hashes(cursor) -> int:
+        """Calcula content_hash de las filas antiguas que aún no lo tienen"""
+        cursor.execute("""
+            SELECT id, nivel, categoria, pregunta, opciones
+            FROM ejercicios
+            WHERE content_hash IS NULL
+        """)
+        updates = []
+        for exercise_id, nivel, categoria, pregunta, opciones in cursor.fetchall():
+            try:
+                updates.append((exercise_id, exercise_hash(nivel, categoria, pregunta, normalize_options(opciones))))
+            except OptionsError as e:
+                # Sin huella no coincidirá con ningún ejercicio nuevo y quedará desactivado
+                logger.warning(f"Ejercicio {exercise_id} sin opciones válidas: {e}")
+
+        execute_values(
+            cursor,
+            "UPDATE ejercicios SET content_hash = v.content_hash FROM (VALUES %s) AS v(id, content_hash) "
+            "WHERE ejercicios.id = v.id",
+            updates
+        )
+        return len(updates)
+
+    @classmethod
+    def swap(cls, records: Iterable[ExerciseRecord], batch_size: int = BATCH_SIZE,
+             progress: Optional[ProgressCallback] = None) -> BulkLoadReport:
+        """
+        Sustituye el catálogo activo por los ejercicios de records como una nueva versión.
+        records puede ser un generador (iter_exercises): se consume una sola vez, por lotes.
+
+        Los ejercicios se cargan en una tabla temporal y el cambio se aplica en la misma
+        transacción: los que ya existían (misma huella) conservan su id y solo se actualizan
+        la respuesta y la explicación, los nuevos se insertan y los que ya no aparecen se
+        desactivan en lugar de borrarse. Los lectores ven el catálogo anterior hasta el COMMIT.
+        """
+        report = BulkLoadReport()
+        started = time.perf_counter()
+
+        with DatabaseService.get_cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (CATALOG_LOCK_KEY,))
+            cursor.execute(CREATE_STAGING_SQL)
+            rows = cls.iter_rows(records, report, cls.options_column_is_array(cursor))
+            cls._stage_rows(cursor, rows, report, batch_size, progress)
+
+            if report.staged == 0:
+                raise ValueError("El nuevo catálogo no tiene ningún ejercicio válido; se mantiene el actual")
+
+            cls.backfill_hashes(cursor)
+            cursor.execute(SWAP_UPDATE_SQL)
+            report.updated = cursor.rowcount
+            cursor.execute(SWAP_INSERT_SQL)
+            report.inserted = cursor.rowcount
+            cursor.execute(SWAP_DEACTIVATE_SQL)
+            report.deactivated = cursor.rowcount
+
+            if report.inserted or report.updated or report.deactivated:
+                cursor.execute(SWAP_VERSION_SQL, (report.staged, report.inserted, report.updated, report.deactivated))
+            else:
+                # Mismo contenido que la versión activa: no se crea otra y nadie tiene que recargar
+                cursor.execute("SELECT COALESCE(MAX(version), 0) FROM catalog_versions")
+            report.version = cursor.fetchone()[0]
+
+        report.elapsed = time.perf_counter() - started
+        logger.info(
+            f"Catálogo v{report.version}: {report.inserted} nuevos, {report.updated} actualizados, "
+            f"{report.deactivated} desactivados, {report.unchanged} sin cambios en {report.elapsed:.2f}s "
+            f"({len(report.errors)} con errores)"
+        )
+        return report
@@ -0,0 +1,64 @@
+# services/completion_cache.py
+import logging
+from src.services.database import DatabaseService
+from src.utils.bitset import Bitset
+from src.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_USERS = 10000
+
+
+class CompletionCache:
+    """
+    Ejercicios completados por cada usuario, como bitset indexado por id de ejercicio.
+
+    Se carga de user_ejercicios la primera vez que se necesita, se actualiza en el sitio al
+    completar un ejercicio y los usuarios menos recientes se descartan (LRU).
+    """
+    _cache = LRUCache(maxsize=MAX_CACHED_USERS)
+
+    @staticmethod
+    async def _load(user_id: int) -> Bitset:
+        async with DatabaseService.get_async_cursor() as cursor:
+            await cursor.execute(
+                "SELECT exercise_id FROM user_ejercicios WHERE user_id = %s",
+                (user_id,)
+            )
+            results = await cursor.fetchall()
+        return Bitset(row[0] for row in results)
+
+    @classmethod
+    async def get(cls, user_id: int) -> Bitset:
+        """Obtiene el conjunto de ejercicios completados del usuario"""
+        completed = cls._cache.get(user_id)
+        if completed is not None:
+            return completed
+
+        loaded = await cls._load(user_id)
+        # Respuestas registradas en AnswerLog que aún no están en user_ejercicios
+        from src.services.answer_log import AnswerLog
+        for exercise_id in AnswerLog.pending_exercise_ids(user_id):
+            loaded.add(exercise_id)
+
+        # Si otra petición lo cargó (y quizá actualizó) mientras esperábamos, conservar esa copia
+        completed = cls._cache.get(user_id)
+        if completed is None:
+            completed = loaded
+            cls._cache.set(user_id, completed)
+        return completed
+
+    @classmethod
+    def mark_completed(cls, user_id: int, exercise_id: int) -> None:
+        """Añade el ejercicio al conjunto del usuario si está en caché"""
+        completed = cls._cache.get(user_id)
+        if completed is not None:
+            completed.add(exercise_id)
+
+    @classmethod
+    def invalidate(cls, user_id: int) -> None:
+        cls._cache.pop(user_id)
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._cache.clear()
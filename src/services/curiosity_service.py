@@ -1,51 +1,165 @@
-# services/curiosity_service.py - VERSIÓN CORREGIDA
+# services/curiosity_service.py
+import asyncio
 import logging
+import random
+from array import array
+from typing import Dict, Optional
 from src.models.curiosity import Curiosity
 from src.services.database import DatabaseService
+from src.utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+REFRESH_INTERVAL_SECONDS = 60
+MAX_TRACKED_USERS = 50000
+BAG_TTL_SECONDS = 24 * 3600
+
+
+class _ShuffleBag:
+    """Orden aleatorio de las curiosidades pendientes de mostrar a un usuario"""
+    __slots__ = ("generation", "ids", "last_id")
+
+    def __init__(self, generation: int, ids: array, last_id: Optional[int] = None):
+        self.generation = generation
+        self.ids = ids
+        self.last_id = last_id
+
 
 class CuriosityService:
+    """
+    Curiosidades activas en memoria, servidas con una "bolsa barajada" por usuario.
+
+    Cada usuario recorre una permutación de todas las curiosidades antes de ver una repetida;
+    al vaciarse la bolsa se vuelve a barajar evitando que la primera coincida con la última
+    mostrada. Cuando la tabla cambia se recarga el pool y las bolsas se reconstruyen.
+    """
+    _curiosities: Dict[int, Curiosity] = {}
+    _ids: array = array("i")
+    _generation: int = 0
+    _fingerprint: Optional[tuple] = None
+    _load_lock: Optional[asyncio.Lock] = None
+    _bags = LRUCache(maxsize=MAX_TRACKED_USERS, ttl=BAG_TTL_SECONDS)
 
     @staticmethod
-    def get_random_curiosity():
-        """Obtiene una curiosidad aleatoria activa - VERSIÓN CORREGIDA"""
-        try:
-            with DatabaseService.get_cursor() as cursor:
-                cursor.execute("""
-                    SELECT id, categoria, texto 
-                    FROM curiosidades 
-                    WHERE activo = TRUE 
-                    ORDER BY RANDOM() 
-                    LIMIT 1
-                """)
-
-                result = cursor.fetchone()
-                logger.info(f"Consulta BD curiosidad - Resultado: {result is not None}")
-
-                if result:
-                    # ✅ Asegurar que tenemos exactamente 3 valores
-                    curiosity_id, categoria, texto = result
-                    return Curiosity(id=curiosity_id, categoria=categoria, texto=texto)
-                else:
-                    logger.warning("No se encontraron curiosidades activas en la BD")
-                    return None
+    async def _fetch_fingerprint() -> tuple:
+        """Huella de la tabla; la tabla es pequeña, así que también detecta ediciones de texto"""
+        async with DatabaseService.get_async_cursor() as cursor:
+            await cursor.execute("""
+                SELECT COUNT(*),
+                       COALESCE(MD5(STRING_AGG(id || ':' || categoria || ':' || texto, '|' ORDER BY id)), '')
+                FROM curiosidades
+                WHERE activo = TRUE
+            """)
+            return tuple(await cursor.fetchone())
+
+    @staticmethod
+    async def _fetch_rows() -> list:
+        async with DatabaseService.get_async_cursor() as cursor:
+            await cursor.execute("""
+                SELECT id, categoria, texto
+                FROM curiosidades
+                WHERE activo = TRUE
+                ORDER BY id
+            """)
+            return await cursor.fetchall()
+
+    @classmethod
+    async def load(cls):
+        """Carga las curiosidades activas y reemplaza el pool de una sola vez"""
+        if cls._load_lock is None:
+            cls._load_lock = asyncio.Lock()
+
+        async with cls._load_lock:
+            # Huella antes que filas, como ExerciseCatalog.load: un cambio entre ambas lecturas
+            # deja la huella vieja y el siguiente refresco vuelve a cargar
+            fingerprint = await cls._fetch_fingerprint()
+            rows = await cls._fetch_rows()
+
+            curiosities = {row[0]: Curiosity(*row) for row in rows}
+            cls._curiosities, cls._ids = curiosities, array("i", curiosities)
+            cls._fingerprint = fingerprint
+            # Las bolsas de la generación anterior se reconstruyen al pedir la siguiente curiosidad
+            cls._generation += 1
+            logger.info(f"Pool de curiosidades cargado: {len(curiosities)} curiosidades activas")
+
+    @classmethod
+    async def ensure_loaded(cls):
+        """Carga el pool si todavía no se ha cargado"""
+        if cls._fingerprint is None:
+            await cls.load()
 
+    @classmethod
+    async def refresh_if_changed(cls) -> bool:
+        """Recarga el pool si la tabla de curiosidades ha cambiado"""
+        fingerprint = await cls._fetch_fingerprint()
+        if fingerprint == cls._fingerprint:
+            return False
+        await cls.load()
+        return True
+
+    @classmethod
+    async def run_refresh_loop(cls, interval: int = REFRESH_INTERVAL_SECONDS):
+        """Tarea de fondo que mantiene el pool sincronizado con la tabla"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await cls.refresh_if_changed()
+            except Exception as e:
+                logger.error(f"Error al refrescar las curiosidades: {e}")
+
+    @classmethod
+    def clear(cls):
+        """Vacía el pool y las bolsas (útil en tests)"""
+        cls._curiosities, cls._ids = {}, array("i")
+        cls._fingerprint = None
+        cls._bags.clear()
+
+    @classmethod
+    def _new_bag(cls, last_id: Optional[int]) -> _ShuffleBag:
+        ids = array("i", cls._ids)
+        random.shuffle(ids)
+        # Se sirve desde el final: evita repetir la última curiosidad justo al rellenar
+        if len(ids) > 1 and ids[-1] == last_id:
+            ids[-1], ids[0] = ids[0], ids[-1]
+        return _ShuffleBag(cls._generation, ids, last_id)
+
+    @classmethod
+    def next_curiosity(cls, user_id: Optional[int] = None) -> Optional[Curiosity]:
+        """Siguiente curiosidad de la bolsa del usuario, sin acceder a la base de datos"""
+        if not cls._ids:
+            return None
+        if user_id is None:
+            return cls._curiosities[random.choice(cls._ids)]
+
+        bag = cls._bags.get(user_id)
+        if bag is None or bag.generation != cls._generation or not bag.ids:
+            bag = cls._new_bag(bag.last_id if bag is not None else None)
+            cls._bags.set(user_id, bag)
+
+        curiosity_id = bag.ids.pop()
+        bag.last_id = curiosity_id
+        return cls._curiosities[curiosity_id]
+
+    @classmethod
+    async def get_random_curiosity(cls, user_id: Optional[int] = None) -> Optional[Curiosity]:
+        """Obtiene una curiosidad activa; con user_id no se repite hasta haber visto todas"""
+        try:
+            await cls.ensure_loaded()
         except Exception as e:
-            logger.error(f"Error al obtener curiosidad aleatoria: {e}", exc_info=True)
+            logger.error(f"Error al cargar las curiosidades: {e}", exc_info=True)
             return None
 
-    @staticmethod
-    def get_curiosity_count() -> int:
+        curiosity = cls.next_curiosity(user_id)
+        if curiosity is None:
+            logger.warning("No se encontraron curiosidades activas en la BD")
+        return curiosity
+
+    @classmethod
+    async def get_curiosity_count(cls) -> int:
         """Cuenta cuántas curiosidades activas hay disponibles"""
         try:
-            with DatabaseService.get_cursor() as cursor:
-                cursor.execute("SELECT COUNT(*) FROM curiosidades WHERE activo = TRUE")
-                result = cursor.fetchone()
-                count = result[0] if result else 0
-                logger.info(f"Conteo de curiosidades: {count}")
-                return count
+            await cls.ensure_loaded()
         except Exception as e:
             logger.error(f"Error al contar curiosidades: {e}")
-            return 0
\ No newline at end of file
+            return 0
+        return len(cls._ids)
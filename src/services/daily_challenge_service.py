@@ -0,0 +1,121 @@
+# services/daily_challenge_service.py
+import asyncio
+import logging
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Tuple
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from src.models.daily_challenge import DailyChallenge
+from src.models.exercise import Exercise
+from src.services.database import DatabaseService
+from src.services.exercise_catalog import ExerciseCatalog
+from src.services.render_cache import RenderCache
+
+logger = logging.getLogger(__name__)
+
+CHALLENGE_LEVELS = ("principiante", "intermedio", "avanzado")
+# Si el bot estaba caído a medianoche, el trabajo se ejecuta al arrancar dentro de este margen
+MISFIRE_GRACE_SECONDS = 6 * 60 * 60
+
+
+class DailyChallengeService:
+    """
+    Reto diario: un ejercicio por nivel y día, elegido a medianoche y guardado en daily_challenges.
+
+    El INSERT ... ON CONFLICT DO NOTHING hace que todas las instancias del bot (y los reinicios)
+    compartan el mismo reto del día. Los retos se guardan en memoria y su mensaje renderizado en
+    RenderCache, así que servir /reto no consulta la base de datos y una reparación del ejercicio
+    (que ExerciseCatalog invalida al recargarse) se refleja en el mismo día.
+    """
+    _day: Optional[date] = None
+    _challenges: Dict[str, DailyChallenge] = {}
+    _lock: Optional[asyncio.Lock] = None
+    _scheduler: Optional[AsyncIOScheduler] = None
+
+    @classmethod
+    async def prepare_day(cls, day: Optional[date] = None) -> Dict[str, DailyChallenge]:
+        """Elige (o recupera, si ya existe) el reto de cada nivel para el día indicado"""
+        day = day or date.today()
+        await ExerciseCatalog.ensure_loaded()
+
+        async with DatabaseService.get_async_cursor() as cursor:
+            for nivel in CHALLENGE_LEVELS:
+                exercise = ExerciseCatalog.pick_random(nivel)
+                if exercise is None:
+                    continue
+                await cursor.execute("""
+                    INSERT INTO daily_challenges (challenge_date, nivel, exercise_id)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (challenge_date, nivel) DO NOTHING
+                """, (day, nivel, exercise.id))
+            await cursor.execute(
+                "SELECT nivel, exercise_id FROM daily_challenges WHERE challenge_date = %s",
+                (day,)
+            )
+            rows = await cursor.fetchall()
+
+        challenges = {}
+        for nivel, exercise_id in rows:
+            if ExerciseCatalog.get(exercise_id) is None:
+                logger.warning(f"El reto de {nivel} del {day} (ejercicio {exercise_id}) ya no está activo")
+                continue
+            challenges[nivel] = DailyChallenge(day, nivel, exercise_id)
+
+        cls._day, cls._challenges = day, challenges
+        logger.info(f"Retos diarios del {day}: {({n: c.exercise_id for n, c in challenges.items()})}")
+        return challenges
+
+    @classmethod
+    async def get_challenge(cls, nivel: str) -> Optional[DailyChallenge]:
+        """Reto de hoy para el nivel; si el trabajo de medianoche no se ha ejecutado, lo prepara"""
+        if cls._day != date.today():
+            if cls._lock is None:
+                cls._lock = asyncio.Lock()
+            async with cls._lock:
+                if cls._day != date.today():
+                    await cls.prepare_day()
+        return cls._challenges.get(nivel)
+
+    @classmethod
+    async def get_rendered(cls, nivel: str,
+                           render: Callable[[DailyChallenge, Exercise], Any]) -> Optional[Tuple[DailyChallenge, Any]]:
+        """
+        Devuelve el reto de hoy y su mensaje renderizado. render solo se llama la primera vez
+        de cada día y nivel, o de nuevo si el ejercicio cambia al recargarse el catálogo.
+        """
+        challenge = await cls.get_challenge(nivel)
+        # El ejercicio puede haberse desactivado después de elegirlo
+        exercise = ExerciseCatalog.get(challenge.exercise_id) if challenge else None
+        if exercise is None:
+            return None
+
+        variant = ("daily_challenge", challenge.challenge_date, nivel)
+        rendered = RenderCache.get_or_render(exercise.id, variant, lambda: render(challenge, exercise))
+        return challenge, rendered
+
+    @classmethod
+    def start_scheduler(cls) -> None:
+        """Programa la elección de los retos cada día a medianoche (hora local)"""
+        if cls._scheduler is not None:
+            return
+        scheduler = AsyncIOScheduler()
+        scheduler.add_job(
+            cls.prepare_day,
+            CronTrigger(hour=0, minute=0),
+            id="daily_challenges",
+            coalesce=True,
+            misfire_grace_time=MISFIRE_GRACE_SECONDS
+        )
+        scheduler.start()
+        cls._scheduler = scheduler
+        logger.info("Programador de retos diarios iniciado")
+
+    @classmethod
+    def stop_scheduler(cls) -> None:
+        if cls._scheduler is not None:
+            cls._scheduler.shutdown(wait=False)
+            cls._scheduler = None
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._day, cls._challenges = None, {}
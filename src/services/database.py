@@ -1,31 +1,164 @@
+import asyncio
 import os
-from contextlib import contextmanager
-from typing import List, Optional
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
 import psycopg2
+import psycopg2.extensions
 from psycopg2 import pool
 from src.models.curiosity import Curiosity
 from src.models.exercise import Exercise
+from src.utils.metrics import DB_POOL_WAIT, DB_QUERY_DURATION, DB_QUERY_ERRORS
 import logging
 
+try:
+    # psycopg 3 es opcional: si no está instalado se usa psycopg2 en un pool de hilos
+    from psycopg import AsyncCursor
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:
+    AsyncCursor = None
+    AsyncConnectionPool = None
+
+POOL_MIN_CONN = 1
+POOL_MAX_CONN = 10
+# Conexiones del pool de psycopg2 que quedan libres para get_cursor síncrono (cargas en un
+# executor, scripts) cuando get_async_cursor usa el pool en hilos
+SYNC_RESERVED_CONN = 2
+
+_QUERY_TABLE_RE = re.compile(
+    r"\b(INSERT\s+INTO|UPDATE|DELETE\s+FROM|FROM)\s+([A-Za-z_][\w.]*)", re.IGNORECASE
+)
+
+
+_LOCKING_CLAUSE_RE = re.compile(r"\bFOR\s+(UPDATE|SHARE)\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def _query_label_from_text(query: str) -> str:
+    query = _LOCKING_CLAUSE_RE.sub("", query)
+    upper = query.upper()
+    verb = next((v for v in ("INSERT", "UPDATE", "DELETE") if re.search(rf"\b{v}\b", upper)), None)
+    verb = verb or (query.split(None, 1) or ["?"])[0].upper()
+    for match in _QUERY_TABLE_RE.finditer(query):
+        keyword = match.group(1).split()[0].upper()
+        if keyword == verb or (keyword == "FROM" and verb not in ("INSERT", "UPDATE", "DELETE")):
+            return f"{verb} {match.group(2)}"
+    return verb
+
+
+def query_label(query) -> str:
+    """Etiqueta corta y de baja cardinalidad para una consulta: operación y tabla principal"""
+    if isinstance(query, bytes):
+        query = query[:500].decode("utf-8", "replace")
+    if not isinstance(query, str):
+        return "OTHER"
+    return _query_label_from_text(query)
+
+
+@contextmanager
+def _timed_query(query):
+    label = query_label(query)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        DB_QUERY_ERRORS.inc(query=label)
+        raise
+    finally:
+        DB_QUERY_DURATION.observe(time.perf_counter() - started, query=label)
+
+
+class _TimedCursor(psycopg2.extensions.cursor):
+    """Cursor de psycopg2 que registra la duración de cada consulta"""
+
+    def execute(self, query, vars=None):
+        with _timed_query(query):
+            return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        with _timed_query(query):
+            return super().executemany(query, vars_list)
+
+
+if AsyncCursor is not None:
+    class _TimedAsyncCursor(AsyncCursor):
+        """Cursor asíncrono de psycopg 3 que registra la duración de cada consulta"""
+
+        async def execute(self, query, params=None, **kwargs):
+            with _timed_query(query):
+                return await super().execute(query, params, **kwargs)
+
+        async def executemany(self, query, params_seq, **kwargs):
+            with _timed_query(query):
+                return await super().executemany(query, params_seq, **kwargs)
+
+
+class _ThreadedCursor:
+    """
+    Cursor de psycopg2 con la misma interfaz awaitable que el cursor asíncrono de psycopg 3.
+    Las llamadas que van a la base de datos se ejecutan en el pool de hilos para no bloquear el event loop.
+    """
+
+    def __init__(self, cursor, executor: Optional[ThreadPoolExecutor]):
+        self._cursor = cursor
+        self._executor = executor
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def execute(self, query, params=None):
+        await self._run(self._cursor.execute, query, params)
+
+    async def executemany(self, query, params_seq):
+        await self._run(self._cursor.executemany, query, params_seq)
+
+    # Los resultados ya están en memoria tras execute, no hace falta saltar al pool de hilos
+    async def fetchone(self):
+        return self._cursor.fetchone()
+
+    async def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+
 class DatabaseService:
     _connection_pool = None
+    _async_pool = None
+    _executor = None
+    _thread_slots: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def _get_db_params() -> dict:
+        db_params = {
+            "host": os.getenv("DB_HOST"),
+            "port": int(os.getenv("DB_PORT") or 5432),
+            "dbname": os.getenv("DB_NAME"),
+            "user": os.getenv("DB_USER"),
+            "password": os.getenv("DB_PASSWORD")
+        }
+        logging.info(f"Database parameters: {db_params}")
+        if None in db_params.values():
+            raise ValueError(f"Missing database environment variables: {db_params}")
+        return db_params
 
     @classmethod
     def initialize(cls):
         try:
-            db_params = {
-                "host": os.getenv("DB_HOST"),
-                "port": int(os.getenv("DB_PORT") or 5432),
-                "dbname": os.getenv("DB_NAME"),
-                "user": os.getenv("DB_USER"),
-                "password": os.getenv("DB_PASSWORD")
-            }
-            logging.info(f"Database parameters: {db_params}")
-            if None in db_params.values():
-                raise ValueError(f"Missing database environment variables: {db_params}")
-            cls._connection_pool = pool.SimpleConnectionPool(
-                minconn=1,
-                maxconn=10,
+            db_params = cls._get_db_params()
+            # Threaded: el pool se usa desde el pool de hilos y desde los executors
+            cls._connection_pool = pool.ThreadedConnectionPool(
+                minconn=POOL_MIN_CONN,
+                maxconn=POOL_MAX_CONN,
                 **db_params
             )
             logging.info("Connection pool initialized successfully")
@@ -33,14 +166,60 @@ class DatabaseService:
             logging.error(f"Failed to initialize connection pool: {e}")
             raise
 
+    @classmethod
+    def create_connection(cls, autocommit: bool = False):
+        """Conexión dedicada fuera del pool (p. ej. para LISTEN), que debe cerrar quien la pide"""
+        conn = psycopg2.connect(**cls._get_db_params())
+        conn.autocommit = autocommit
+        return conn
+
+    @classmethod
+    async def initialize_async(cls):
+        """
+        Prepara el modo asíncrono usado por los handlers.
+
+        Con psycopg 3 instalado abre un pool asíncrono nativo; si no, las consultas de
+        get_async_cursor se ejecutan sobre el pool de psycopg2 en un pool de hilos.
+        """
+        if AsyncConnectionPool is not None:
+            cls._async_pool = AsyncConnectionPool(
+                conninfo="",
+                kwargs={**cls._get_db_params(), "cursor_factory": _TimedAsyncCursor},
+                min_size=POOL_MIN_CONN,
+                max_size=POOL_MAX_CONN,
+                open=False
+            )
+            await cls._async_pool.open()
+            logging.info("Async connection pool initialized successfully")
+            return
+
+        if cls._connection_pool is None:
+            cls.initialize()
+        cls._executor = ThreadPoolExecutor(max_workers=POOL_MAX_CONN, thread_name_prefix="db")
+        cls._thread_slots = asyncio.Semaphore(POOL_MAX_CONN - SYNC_RESERVED_CONN)
+        logging.info("psycopg 3 no disponible, usando pool de hilos sobre psycopg2")
+
+    @classmethod
+    async def close_async(cls):
+        """Cierra el pool asíncrono y el pool de hilos"""
+        if cls._async_pool is not None:
+            await cls._async_pool.close()
+            cls._async_pool = None
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=True)
+            cls._executor = None
+        cls._thread_slots = None
+
     @classmethod
     @contextmanager
     def get_cursor(cls):
         if cls._connection_pool is None:
             raise ValueError("Connection pool not initialized")
+        started = time.perf_counter()
         conn = cls._connection_pool.getconn()
+        DB_POOL_WAIT.observe(time.perf_counter() - started, mode="sync")
         try:
-            with conn.cursor() as cursor:
+            with conn.cursor(cursor_factory=_TimedCursor) as cursor:
                 yield cursor
             conn.commit()
         except Exception as e:
@@ -49,6 +228,51 @@ class DatabaseService:
         finally:
             cls._connection_pool.putconn(conn)
 
+    @classmethod
+    @asynccontextmanager
+    async def get_async_cursor(cls):
+        """
+        Versión awaitable de get_cursor con la misma semántica: todo el bloque es una
+        transacción que se confirma al salir y se revierte si hay una excepción.
+        """
+        started = time.perf_counter()
+        if cls._async_pool is not None:
+            async with cls._async_pool.connection() as conn:
+                DB_POOL_WAIT.observe(time.perf_counter() - started, mode="async")
+                async with conn.cursor() as cursor:
+                    yield cursor
+            return
+
+        # La conexión se retiene entre awaits: sin este límite el pool de psycopg2 se agota
+        # y lanza PoolError en lugar de hacer esperar al que llega de más
+        if cls._thread_slots is None:
+            cls._thread_slots = asyncio.Semaphore(POOL_MAX_CONN - SYNC_RESERVED_CONN)
+        async with cls._thread_slots:
+            loop = asyncio.get_running_loop()
+            cursor_cm = cls.get_cursor()
+            cursor = await loop.run_in_executor(cls._executor, cursor_cm.__enter__)
+            # Incluye la espera por un hueco y por un hilo libre, que es donde se forma la cola
+            DB_POOL_WAIT.observe(time.perf_counter() - started, mode="thread")
+            try:
+                yield _ThreadedCursor(cursor, cls._executor)
+            except BaseException as e:
+                suppressed = await loop.run_in_executor(
+                    cls._executor, cursor_cm.__exit__, type(e), e, e.__traceback__
+                )
+                if not suppressed:
+                    raise
+            else:
+                await loop.run_in_executor(cls._executor, cursor_cm.__exit__, None, None, None)
+
+    @staticmethod
+    def values_clause(template: str, rows: Sequence[Sequence]) -> Tuple[str, list]:
+        """
+        Lista VALUES multi-fila con marcadores %s y sus parámetros en plano.
+        A diferencia de execute_values, sirve tanto para psycopg2 como para el cursor de psycopg 3.
+        """
+        params = [value for row in rows for value in row]
+        return ", ".join([template] * len(rows)), params
+
     @classmethod
     def get_random_exercise(cls, nivel: str, excluded_ids: List[int] = None) -> Optional[Exercise]:
         if excluded_ids is None:
@@ -0,0 +1,187 @@
+# services/exercise_catalog.py
+import asyncio
+import logging
+import random
+from array import array
+from typing import Container, Dict, Iterable, Optional, Tuple
+from src.models.exercise import Exercise
+from src.services.database import DatabaseService
+from src.services.render_cache import RenderCache
+from src.utils.bitset import Bitset
+from src.utils.options import OptionsError, is_canonical, normalize_options
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL_SECONDS = 60
+RANDOM_PICK_ATTEMPTS = 8
+
+
+class ExerciseCatalog:
+    """
+    Catálogo en memoria de los ejercicios activos.
+
+    Los ids se guardan en arrays compactos por nivel y por (nivel, categoría), de modo que
+    elegir un ejercicio aleatorio no requiere ORDER BY RANDOM() en la base de datos.
+    """
+    _exercises: Dict[int, Exercise] = {}
+    _by_level: Dict[str, array] = {}
+    _by_level_category: Dict[Tuple[str, str], array] = {}
+    _level_masks: Dict[str, int] = {}
+    _fingerprint: Optional[tuple] = None
+    _load_lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    async def _fetch_fingerprint() -> tuple:
+        """
+        Huella del contenido de la tabla: detecta altas, bajas y (des)activaciones, y también
+        ediciones en el sitio (corregir_script.py, arreglos a mano de pregunta u opciones)
+        """
+        async with DatabaseService.get_async_cursor() as cursor:
+            await cursor.execute("""
+                SELECT COUNT(*),
+                       COALESCE(MD5(STRING_AGG(
+                           (id, categoria, nivel, pregunta, opciones, respuesta_correcta, explicacion)::text,
+                           '|' ORDER BY id
+                       )), '')
+                FROM ejercicios
+                WHERE activo = TRUE
+            """)
+            return tuple(await cursor.fetchone())
+
+    @staticmethod
+    async def _fetch_rows() -> list:
+        async with DatabaseService.get_async_cursor() as cursor:
+            await cursor.execute("""
+                SELECT id, categoria, nivel, pregunta, opciones, respuesta_correcta, explicacion
+                FROM ejercicios
+                WHERE activo = TRUE
+                ORDER BY id
+            """)
+            return await cursor.fetchall()
+
+    @classmethod
+    async def load(cls):
+        """Carga todos los ejercicios activos y reemplaza los índices de una sola vez"""
+        if cls._load_lock is None:
+            cls._load_lock = asyncio.Lock()
+
+        async with cls._load_lock:
+            # La huella se lee antes que las filas: si la tabla cambia entre ambas lecturas la
+            # huella guardada queda vieja y el siguiente refresco recarga, en lugar de dar por
+            # cargado un cambio que las filas no incluyen
+            fingerprint = await cls._fetch_fingerprint()
+            rows = await cls._fetch_rows()
+
+            exercises = {}
+            by_level = {}
+            by_level_category = {}
+            repaired = 0
+            for row in rows:
+                exercise = Exercise(*row)
+                # Las opciones se sirven ya como lista; las filas sin normalizar se corrigen aquí una vez
+                if not is_canonical(exercise.opciones):
+                    try:
+                        exercise.opciones = normalize_options(exercise.opciones)
+                    except OptionsError as e:
+                        logger.error(f"Ejercicio {exercise.id} descartado: {e}")
+                        continue
+                    repaired += 1
+                exercises[exercise.id] = exercise
+                by_level.setdefault(exercise.nivel, array("i")).append(exercise.id)
+                by_level_category.setdefault((exercise.nivel, exercise.categoria), array("i")).append(exercise.id)
+
+            level_masks = {nivel: Bitset(ids).bits for nivel, ids in by_level.items()}
+            changed = [exercise_id for exercise_id, exercise in cls._exercises.items()
+                       if exercises.get(exercise_id) != exercise]
+
+            # Asignación atómica: los lectores ven el catálogo anterior o el nuevo, nunca uno a medias
+            cls._exercises, cls._by_level, cls._by_level_category = exercises, by_level, by_level_category
+            cls._level_masks = level_masks
+            cls._fingerprint = fingerprint
+            RenderCache.invalidate(changed)
+            logger.info(f"Catálogo de ejercicios cargado: {len(exercises)} ejercicios activos")
+            if repaired:
+                logger.warning(f"{repaired} ejercicios tienen opciones sin normalizar; ejecuta corregir_script.py")
+
+    @classmethod
+    async def ensure_loaded(cls):
+        """Carga el catálogo si todavía no se ha cargado"""
+        if cls._fingerprint is None:
+            await cls.load()
+
+    @classmethod
+    async def refresh_if_changed(cls) -> bool:
+        """Recarga el catálogo si la tabla de ejercicios ha cambiado"""
+        fingerprint = await cls._fetch_fingerprint()
+        if fingerprint == cls._fingerprint:
+            return False
+        await cls.load()
+        return True
+
+    @classmethod
+    async def run_refresh_loop(cls, interval: int = REFRESH_INTERVAL_SECONDS):
+        """Tarea de fondo que mantiene el catálogo sincronizado con la tabla"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await cls.refresh_if_changed()
+            except Exception as e:
+                logger.error(f"Error al refrescar el catálogo de ejercicios: {e}")
+
+    @classmethod
+    def get(cls, exercise_id: int) -> Optional[Exercise]:
+        """Obtiene un ejercicio activo por id"""
+        return cls._exercises.get(exercise_id)
+
+    @classmethod
+    def count(cls, nivel: str) -> int:
+        """Número de ejercicios activos de un nivel"""
+        return len(cls._by_level.get(nivel, ()))
+
+    @classmethod
+    def count_available(cls, nivel: str, completed: Bitset) -> int:
+        """Número de ejercicios activos del nivel que el usuario no ha completado"""
+        return cls.count(nivel) - completed.count_in(cls._level_masks.get(nivel, 0))
+
+    @classmethod
+    def pick_best(cls, levels: Iterable[str],
+                  excluded: Container[int] = ()) -> Tuple[Optional[Exercise], Optional[str]]:
+        """
+        Elige en una sola pasada un ejercicio del primer nivel de levels (orden de preferencia)
+        al que le queden ejercicios fuera de excluded. Devuelve (ejercicio, nivel) o (None, None).
+
+        Con un Bitset los niveles agotados se descartan con count_available, sin recorrerlos.
+        """
+        for nivel in levels:
+            if isinstance(excluded, Bitset) and cls.count_available(nivel, excluded) <= 0:
+                continue
+            exercise = cls.pick_random(nivel, excluded=excluded)
+            if exercise is not None:
+                return exercise, nivel
+        return None, None
+
+    @classmethod
+    def pick_random(cls, nivel: str, excluded: Container[int] = (),
+                    categoria: str = None) -> Optional[Exercise]:
+        """
+        Elige un ejercicio aleatorio del nivel (y categoría, si se indica) que no esté en excluded.
+
+        Primero prueba unas pocas posiciones al azar, que es O(1) mientras queden muchos
+        ejercicios disponibles; si todas están excluidas recorre el índice una vez.
+        """
+        if categoria is None:
+            ids = cls._by_level.get(nivel)
+        else:
+            ids = cls._by_level_category.get((nivel, categoria))
+        if not ids:
+            return None
+
+        for _ in range(RANDOM_PICK_ATTEMPTS):
+            candidate = ids[random.randrange(len(ids))]
+            if candidate not in excluded:
+                return cls._exercises[candidate]
+
+        available = [exercise_id for exercise_id in ids if exercise_id not in excluded]
+        if not available:
+            return None
+        return cls._exercises[random.choice(available)]
@@ -1,8 +1,13 @@
 # services/exercise_service.py - VERSIÓN CORREGIDA
 import logging
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from src.services.answer_log import AnswerLog
 from src.services.database import DatabaseService
+from src.services.exercise_catalog import ExerciseCatalog
+from src.services.completion_cache import CompletionCache
+from src.services.stats_service import StatsService
 from src.models.exercise import Exercise
+from src.models.user_exercise import UserExercise
 import json
 
 logger = logging.getLogger(__name__)
@@ -11,117 +16,110 @@ logger = logging.getLogger(__name__)
 class ExerciseService:
 
     @staticmethod
-    def get_random_exercise(user_id: int, nivel: str) -> Optional[Exercise]:
+    async def get_random_exercise(user_id: int, nivel: str) -> Optional[Exercise]:
         """Obtiene un ejercicio aleatorio que el usuario NO haya completado"""
         try:
-            # Obtener IDs de ejercicios ya completados por el usuario
-            completed_exercise_ids = ExerciseService.get_completed_exercise_ids(user_id)
-
-            # Usar DatabaseService para obtener ejercicio aleatorio excluyendo completados
-            with DatabaseService.get_cursor() as cursor:
-                query = """
-                    SELECT id, categoria, nivel, pregunta, opciones, respuesta_correcta, explicacion
-                    FROM ejercicios 
-                    WHERE nivel = %s AND activo = TRUE
-                """
-                params = [nivel]
-
-                if completed_exercise_ids:
-                    # Crear placeholders para los IDs excluidos
-                    placeholders = ','.join(['%s'] * len(completed_exercise_ids))
-                    query += f" AND id NOT IN ({placeholders})"
-                    params.extend(completed_exercise_ids)
-
-                query += " ORDER BY RANDOM() LIMIT 1"
-
-                cursor.execute(query, params)
-                result = cursor.fetchone()
-
-                if result:
-                    # Convertir resultado a objeto Exercise
-                    return Exercise(
-                        id=result[0],
-                        categoria=result[1],
-                        nivel=result[2],
-                        pregunta=result[3],
-                        opciones=result[4],
-                        respuesta_correcta=result[5],
-                        explicacion=result[6]
-                    )
-                return None
+            await ExerciseCatalog.ensure_loaded()
+
+            # Bitset de ejercicios ya completados por el usuario (en caché tras la primera carga)
+            completed = await CompletionCache.get(user_id)
+
+            # La selección se hace en memoria sobre el catálogo, sin ORDER BY RANDOM()
+            return ExerciseCatalog.pick_random(nivel, excluded=completed)
 
         except Exception as e:
             logger.error(f"Error al obtener ejercicio aleatorio: {e}")
             return None
 
     @staticmethod
-    def get_completed_exercise_ids(user_id: int) -> List[int]:
+    async def get_best_exercise(user_id: int, levels: List[str]) -> Tuple[Optional[Exercise], Optional[str]]:
+        """
+        Ejercicio no completado del primer nivel de levels que tenga alguno disponible.
+        El catálogo y los completados del usuario se consultan una sola vez para todos los niveles.
+        """
+        try:
+            await ExerciseCatalog.ensure_loaded()
+            completed = await CompletionCache.get(user_id)
+            return ExerciseCatalog.pick_best(levels, excluded=completed)
+
+        except Exception as e:
+            logger.error(f"Error al obtener el mejor ejercicio disponible: {e}")
+            return None, None
+
+    @staticmethod
+    async def get_completed_exercise_ids(user_id: int) -> List[int]:
         """Obtiene la lista de IDs de ejercicios completados por el usuario"""
         try:
-            with DatabaseService.get_cursor() as cursor:
-                cursor.execute(
-                    "SELECT exercise_id FROM user_ejercicios WHERE user_id = %s",
-                    (user_id,)
-                )
-                results = cursor.fetchall()
-                return [row[0] for row in results] if results else []
+            return list(await CompletionCache.get(user_id))
         except Exception as e:
             logger.error(f"Error al obtener ejercicios completados: {e}")
             return []
 
     @staticmethod
-    def mark_exercise_completed(user_id: int, exercise_id: int, nivel: str,
-                                categoria: str, is_correct: bool, attempts: int) -> bool:
-        """Marca un ejercicio como completado usando UPSERT para evitar duplicados"""
+    async def mark_exercise_completed(user_id: int, exercise_id: int, nivel: str,
+                                categoria: str, is_correct: bool, attempts: int) -> Optional[UserExercise]:
+        """
+        Marca un ejercicio como completado con un único INSERT ... ON CONFLICT.
+        Devuelve la fila resultante, o None si no se pudo guardar.
+        Con AnswerLog iniciado la escritura se agrupa con otras y la fila aún no tiene id;
+        si su buffer está lleno se escribe aquí directamente.
+        """
+        if AnswerLog.is_running():
+            record = AnswerLog.record(user_id, exercise_id, nivel, categoria, is_correct, attempts)
+            if record is not None:
+                return record
+
         try:
-            with DatabaseService.get_cursor() as cursor:
-                # Verificar si ya existe el registro
-                cursor.execute(
-                    "SELECT * FROM user_ejercicios WHERE user_id = %s AND exercise_id = %s",
-                    (user_id, exercise_id)
+            async with DatabaseService.get_async_cursor() as cursor:
+                # Bloquear el resumen primero: una respuesta simultánea del mismo usuario espera
+                # aquí y su upsert ve la fila ya confirmada, de modo que previous no sale vacío
+                summary = await StatsService.lock_summary(cursor, user_id)
+
+                # previous lee la fila anterior en la misma instantánea que el upsert;
+                # xmax = 0 indica que la fila se acaba de insertar y no actualizar
+                await cursor.execute("""
+                    WITH previous AS (
+                        SELECT is_correct FROM user_ejercicios WHERE user_id = %s AND exercise_id = %s
+                    )
+                    INSERT INTO user_ejercicios (user_id, exercise_id, nivel, categoria, is_correct, attempts, completed_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (user_id, exercise_id) DO UPDATE SET
+                        is_correct = EXCLUDED.is_correct,
+                        attempts = EXCLUDED.attempts,
+                        nivel = EXCLUDED.nivel,
+                        categoria = EXCLUDED.categoria,
+                        completed_at = EXCLUDED.completed_at
+                    RETURNING id, user_id, exercise_id, completed_at, nivel, categoria, is_correct, attempts,
+                              (xmax = 0) AS inserted, (SELECT is_correct FROM previous) AS previous_is_correct
+                """, (user_id, exercise_id, user_id, exercise_id, nivel, categoria, is_correct, attempts))
+                row = await cursor.fetchone()
+                record = UserExercise(*row[:8])
+                inserted, previous_is_correct = row[8], row[9]
+
+                # Actualizar el resumen de estadísticas en la misma transacción
+                await StatsService.record_completion(
+                    cursor, summary, nivel, categoria, is_correct, record.completed_at,
+                    previous_is_correct=StatsService.previous_correctness(
+                        user_id, inserted, previous_is_correct, is_correct
+                    )
                 )
-                existing_record = cursor.fetchone()
-
-                if existing_record:
-                    # Actualizar registro existente
-                    cursor.execute("""
-                        UPDATE user_ejercicios 
-                        SET is_correct = %s, attempts = %s, nivel = %s, categoria = %s, completed_at = CURRENT_TIMESTAMP
-                        WHERE user_id = %s AND exercise_id = %s
-                    """, (is_correct, attempts, nivel, categoria, user_id, exercise_id))
-                    logger.info(f"Actualizado ejercicio {exercise_id} para usuario {user_id}")
-                else:
-                    # Crear nuevo registro
-                    cursor.execute("""
-                        INSERT INTO user_ejercicios (user_id, exercise_id, nivel, categoria, is_correct, attempts, completed_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                    """, (user_id, exercise_id, nivel, categoria, is_correct, attempts))
-                    logger.info(f"Marcado ejercicio {exercise_id} como completado para usuario {user_id}")
-
-                return True
+
+            logger.info(f"Guardado ejercicio {exercise_id} para usuario {user_id} (nuevo: {inserted})")
+            CompletionCache.mark_completed(user_id, record.exercise_id)
+            StatsService.invalidate(user_id)
+            return record
 
         except Exception as e:
             logger.error(f"Error al marcar ejercicio como completado: {e}")
-            return False
+            return None
 
     @staticmethod
-    def get_available_exercises_count(user_id: int, nivel: str) -> int:
+    async def get_available_exercises_count(user_id: int, nivel: str) -> int:
         """Cuenta cuántos ejercicios disponibles hay para un usuario en un nivel"""
         try:
-            completed_exercise_ids = ExerciseService.get_completed_exercise_ids(user_id)
-
-            with DatabaseService.get_cursor() as cursor:
-                query = "SELECT COUNT(*) FROM ejercicios WHERE nivel = %s AND activo = TRUE"
-                params = [nivel]
-
-                if completed_exercise_ids:
-                    placeholders = ','.join(['%s'] * len(completed_exercise_ids))
-                    query += f" AND id NOT IN ({placeholders})"
-                    params.extend(completed_exercise_ids)
-
-                cursor.execute(query, params)
-                result = cursor.fetchone()
-                return result[0] if result else 0
+            await ExerciseCatalog.ensure_loaded()
+            completed = await CompletionCache.get(user_id)
+            return ExerciseCatalog.count_available(nivel, completed)
 
         except Exception as e:
             logger.error(f"Error al contar ejercicios disponibles: {e}")
@@ -129,28 +127,16 @@ class ExerciseService:
 
     # exercise_service.py - Añadir método de estadísticas
     @staticmethod
-    def get_user_stats(user_id: int) -> dict:
+    async def get_user_stats(user_id: int) -> dict:
         """Obtiene estadísticas del usuario"""
         try:
-            # Implementación básica - ajusta según tu base de datos
-            with DatabaseService.get_cursor() as cursor:
-                cursor.execute("""
-                    SELECT 
-                        COUNT(*) as total,
-                        COUNT(CASE WHEN is_correct THEN 1 END) as correct,
-                        COUNT(DISTINCT categoria) as categories,
-                        COUNT(DISTINCT nivel) as levels
-                    FROM user_ejercicios 
-                    WHERE user_id = %s
-                """, (user_id,))
-                result = cursor.fetchone()
-
-                return {
-                    'total_exercises': result[0] if result else 0,
-                    'correct_exercises': result[1] if result else 0,
-                    'categories_count': result[2] if result else 0,
-                    'levels_count': result[3] if result else 0
-                }
+            stats = await StatsService.get_stats(user_id)
+            return {
+                'total_exercises': stats['total_exercises'],
+                'correct_exercises': stats['correct_exercises'],
+                'categories_count': stats['categories_count'],
+                'levels_count': stats['levels_count']
+            }
         except Exception as e:
             logger.error(f"Error al obtener estadísticas: {e}")
-            return {}
\ No newline at end of file
+            return {}
@@ -0,0 +1,157 @@
+# services/fsm_storage.py
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Mapping, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = "fsm_state.sqlite3"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+# Cada cuántas escrituras se borran las entradas caducadas
+PURGE_EVERY_WRITES = 500
+
+
+def _build_key(key: StorageKey) -> str:
+    # business_connection_id no existe en versiones antiguas de aiogram
+    business_connection_id = getattr(key, "business_connection_id", None)
+    return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id}:{business_connection_id}:{key.destiny}"
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Almacenamiento FSM persistente en un fichero SQLite local.
+
+    El estado y los datos van en columnas separadas, de modo que leer el estado (lo que hace
+    aiogram en cada update) no deserializa los datos. Las entradas caducan tras ttl segundos
+    sin escrituras. Todas las operaciones se ejecutan en un único hilo dedicado para no
+    bloquear el event loop; el modo WAL permite compartir el fichero entre varios procesos.
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, ttl: Optional[int] = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm")
+        self._connection: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS fsm (
+                    key TEXT PRIMARY KEY,
+                    state TEXT,
+                    data TEXT,
+                    expires_at REAL
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS fsm_state_idx ON fsm (state)")
+            connection.execute("CREATE INDEX IF NOT EXISTS fsm_expires_at_idx ON fsm (expires_at)")
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl else None
+
+    def _read_column(self, column: str, key: str) -> Optional[str]:
+        row = self._connect().execute(
+            f"SELECT {column} FROM fsm WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _write_column(self, column: str, key: str, value: Optional[str]) -> None:
+        connection = self._connect()
+        other = "data" if column == "state" else "state"
+        # Si la fila había caducado, la otra columna es de una conversación vencida y no
+        # debe revivir al renovar expires_at
+        connection.execute(
+            f"""
+            INSERT INTO fsm (key, {column}, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                {column} = excluded.{column},
+                {other} = CASE WHEN fsm.expires_at <= ? THEN NULL ELSE fsm.{other} END,
+                expires_at = excluded.expires_at
+            """,
+            (key, value, self._expires_at(), time.time())
+        )
+        # Sin estado ni datos la fila no aporta nada
+        connection.execute("DELETE FROM fsm WHERE key = ? AND state IS NULL AND data IS NULL", (key,))
+
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            self._purge_expired()
+
+    def _purge_expired(self) -> int:
+        cursor = self._connect().execute("DELETE FROM fsm WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def _count_state(self, state: str) -> int:
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM fsm WHERE state = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (state, time.time())
+        ).fetchone()
+        return row[0]
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._run(self._write_column, "state", _build_key(key), _state_name(state))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._run(self._read_column, "state", _build_key(key))
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        value = json.dumps(dict(data), ensure_ascii=False) if data else None
+        await self._run(self._write_column, "data", _build_key(key), value)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        value = await self._run(self._read_column, "data", _build_key(key))
+        return json.loads(value) if value else {}
+
+    async def purge_expired(self) -> int:
+        """Borra las entradas caducadas y devuelve cuántas se eliminaron"""
+        return await self._run(self._purge_expired)
+
+    async def count_in_state(self, state: StateType) -> int:
+        """Número de conversaciones activas en un estado (usa el índice sobre state)"""
+        return await self._run(self._count_state, _state_name(state))
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=True)
+
+
+def create_fsm_storage() -> BaseStorage:
+    """
+    Crea el almacenamiento FSM configurado en FSM_STORAGE ("memory" o "sqlite").
+    Para SQLite se usan FSM_SQLITE_PATH y FSM_TTL_SECONDS.
+    """
+    backend = os.getenv("FSM_STORAGE", "sqlite").lower()
+    if backend == "memory":
+        logger.info("Usando almacenamiento FSM en memoria")
+        return MemoryStorage()
+    if backend == "sqlite":
+        path = os.getenv("FSM_SQLITE_PATH", DEFAULT_SQLITE_PATH)
+        ttl = int(os.getenv("FSM_TTL_SECONDS") or DEFAULT_TTL_SECONDS)
+        logger.info(f"Usando almacenamiento FSM en SQLite: {path} (TTL {ttl}s)")
+        return SQLiteStorage(path=path, ttl=ttl)
+    raise ValueError(f"FSM_STORAGE no soportado: {backend}")
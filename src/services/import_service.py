@@ -1,8 +1,11 @@
-import json
-import ast
 import logging
-from typing import Dict, List, Any
+from typing import Any, Dict, Tuple
+from psycopg2.extras import execute_values
+from src.services.bulk_loader import ExerciseBulkLoader
 from src.services.database import DatabaseService
+from src.utils.exercise_utils import iter_json_data
+from src.utils.hashing import curiosity_hash
+from src.utils.options import normalize_options, serialize_options
 
 logger = logging.getLogger(__name__)
 
@@ -11,118 +14,131 @@ class ImportService:
     @staticmethod
     def normalize_json_data(data: Any) -> str:
         """
-        Normaliza datos para asegurar que sean JSON válido
+        Normaliza las opciones de un ejercicio a su forma canónica (array JSON de cadenas).
+        Lanza OptionsError si no se puede obtener ninguna opción.
         """
-        if data is None:
-            return json.dumps([])
-
-        # Si ya es una cadena JSON válida, devolverla
-        if isinstance(data, str):
-            try:
-                json.loads(data)
-                return data
-            except json.JSONDecodeError:
-                pass
-
-        # Intentar con ast.literal_eval para literales de Python
-        if isinstance(data, str):
-            try:
-                parsed = ast.literal_eval(data)
-                return json.dumps(parsed, ensure_ascii=False)
-            except (ValueError, SyntaxError):
-                pass
-
-        # Si es una cadena simple, convertirla a array
-        if isinstance(data, str):
-            return json.dumps([data], ensure_ascii=False)
-
-        # Si es una lista o diccionario, convertirlo a JSON
-        if isinstance(data, (list, dict)):
-            return json.dumps(data, ensure_ascii=False)
-
-        # Para cualquier otro tipo, convertirlo a string y luego a array
-        return json.dumps([str(data)], ensure_ascii=False)
+        return serialize_options(normalize_options(data))
 
     @staticmethod
     def import_exercises_from_json(json_data: Dict) -> Dict[str, int]:
         """
-        Importa ejercicios desde un objeto JSON
-        Retorna un diccionario con estadísticas de la importación
+        Importa ejercicios desde un objeto JSON como una versión del catálogo: inserta los
+        nuevos, actualiza los modificados y desactiva los que ya no aparecen. Repetir la
+        misma importación no cambia nada.
+        Retorna un diccionario con estadísticas y el diff de la importación
         """
-        stats = {
-            "total": 0,
-            "success": 0,
-            "errors": 0,
-            "skipped": 0
-        }
-
         try:
-            for nivel, categorias in json_data.items():
-                for categoria, ejercicios in categorias.items():
-                    for ejercicio in ejercicios:
-                        stats["total"] += 1
-
-                        try:
-                            # Normalizar las opciones
-                            opciones_normalizadas = ImportService.normalize_json_data(
-                                ejercicio.get("opciones", [])
-                            )
-
-                            # Insertar en la base de datos
-                            DatabaseService.add_exercise(
-                                categoria=categoria,
-                                nivel=nivel,
-                                pregunta=ejercicio["pregunta"],
-                                opciones=opciones_normalizadas,
-                                respuesta_correcta=ejercicio["respuesta"],
-                                explicacion=ejercicio.get("explicacion")
-                            )
-
-                            stats["success"] += 1
-                            logger.info(f"Ejercicio importado: {ejercicio['pregunta'][:50]}...")
-
-                        except Exception as e:
-                            stats["errors"] += 1
-                            logger.error(f"Error importando ejercicio: {e}")
-
+            report = ExerciseBulkLoader.swap(iter_json_data(json_data))
         except Exception as e:
             logger.error(f"Error procesando JSON: {e}")
-            stats["errors"] += 1
+            return {"total": 0, "success": 0, "errors": 1, "skipped": 0}
 
-        return stats
+        for position, error in report.errors:
+            logger.error(f"Error importando ejercicio {position}: {error}")
+        return report.to_dict()
+
+    @staticmethod
+    def _curiosity_rows(json_data: Dict, stats: Dict[str, int]) -> Dict[str, Tuple[str, str]]:
+        """Curiosidades válidas del JSON por huella; las repetidas se omiten"""
+        rows = {}
+        curiosidades = json_data.get("curiosidades", [])
+        stats["total"] = len(curiosidades)
+
+        for i, curiosidad in enumerate(curiosidades):
+            try:
+                categoria, texto = curiosidad["categoria"].strip(), curiosidad["texto"].strip()
+                if not categoria or not texto:
+                    raise ValueError("categoría o texto vacíos")
+            except Exception as e:
+                stats["errors"] += 1
+                logger.error(f"Error importando curiosidad {i}: {e}")
+                continue
+
+            hash_value = curiosity_hash(categoria, texto)
+            if hash_value in rows:
+                stats["skipped"] += 1
+                continue
+            rows[hash_value] = (categoria, texto)
+        return rows
 
     @staticmethod
     def import_curiosities_from_json(json_data: Dict) -> Dict[str, int]:
         """
-        Importa curiosidades desde un objeto JSON
-        Retorna un diccionario con estadísticas de la importación
+        Importa curiosidades desde un objeto JSON comparando huellas con las existentes:
+        inserta las nuevas, reactiva las que vuelven y desactiva las que ya no aparecen.
+        Retorna un diccionario con estadísticas y el diff de la importación
         """
         stats = {
             "total": 0,
             "success": 0,
             "errors": 0,
-            "skipped": 0
+            "skipped": 0,
+            "inserted": 0,
+            "updated": 0,
+            "deactivated": 0,
+            "unchanged": 0
         }
 
         try:
-            curiosidades = json_data.get("curiosidades", [])
-            stats["total"] = len(curiosidades)
-
-            for curiosidad in curiosidades:
-                try:
-                    DatabaseService.add_curiosity(
-                        categoria=curiosidad["categoria"],
-                        texto=curiosidad["texto"]
-                    )
-                    stats["success"] += 1
-                    logger.info(f"Curiosidad importada: {curiosidad['texto'][:50]}...")
-
-                except Exception as e:
-                    stats["errors"] += 1
-                    logger.error(f"Error importando curiosidad: {e}")
+            rows = ImportService._curiosity_rows(json_data, stats)
+            stats["success"] = len(rows)
+            if not rows:
+                # Un JSON vacío o inválido desactivaría todas las curiosidades
+                logger.warning("El JSON no contiene curiosidades válidas; no se modifica nada")
+                return stats
+
+            with DatabaseService.get_cursor() as cursor:
+                cursor.execute("SELECT id, categoria, texto, content_hash, activo FROM curiosidades ORDER BY id")
+                existing = cursor.fetchall()
+
+                # La fila más antigua de cada huella es la que se conserva; las copias se desactivan
+                keepers = {}
+                backfill = []
+                to_deactivate = []
+                for curiosity_id, categoria, texto, hash_value, activo in existing:
+                    if hash_value is None:
+                        hash_value = curiosity_hash(categoria, texto)
+                        backfill.append((curiosity_id, hash_value))
+                    if hash_value in keepers:
+                        if activo:
+                            to_deactivate.append(curiosity_id)
+                        continue
+                    keepers[hash_value] = (curiosity_id, activo)
+                    if hash_value not in rows and activo:
+                        to_deactivate.append(curiosity_id)
+
+                to_insert = [(categoria, texto, hash_value) for hash_value, (categoria, texto) in rows.items()
+                             if hash_value not in keepers]
+                to_reactivate = [curiosity_id for hash_value, (curiosity_id, activo) in keepers.items()
+                                 if hash_value in rows and not activo]
+
+                execute_values(
+                    cursor,
+                    "UPDATE curiosidades SET content_hash = v.content_hash "
+                    "FROM (VALUES %s) AS v(id, content_hash) WHERE curiosidades.id = v.id",
+                    backfill
+                )
+                execute_values(
+                    cursor,
+                    "INSERT INTO curiosidades (categoria, texto, content_hash) VALUES %s",
+                    to_insert
+                )
+                if to_reactivate:
+                    cursor.execute("UPDATE curiosidades SET activo = TRUE WHERE id = ANY(%s)", (to_reactivate,))
+                if to_deactivate:
+                    cursor.execute("UPDATE curiosidades SET activo = FALSE WHERE id = ANY(%s)", (to_deactivate,))
+
+            stats["inserted"] = len(to_insert)
+            stats["updated"] = len(to_reactivate)
+            stats["deactivated"] = len(to_deactivate)
+            stats["unchanged"] = stats["success"] - stats["inserted"] - stats["updated"]
+            logger.info(
+                f"Curiosidades importadas: {stats['inserted']} nuevas, {stats['updated']} reactivadas, "
+                f"{stats['deactivated']} desactivadas, {stats['unchanged']} sin cambios"
+            )
 
         except Exception as e:
             logger.error(f"Error procesando JSON de curiosidades: {e}")
             stats["errors"] += 1
 
-        return stats
\ No newline at end of file
+        return stats
@@ -0,0 +1,95 @@
+# services/profile_cache.py
+import asyncio
+import logging
+import uuid
+from typing import Optional
+import psycopg2
+from src.models.user_profile import UserProfile
+from src.services.database import DatabaseService
+from src.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_PROFILES = 50000
+PROFILE_TTL_SECONDS = 600
+INVALIDATION_CHANNEL = "user_profile_invalidation"
+LISTENER_RETRY_SECONDS = 5
+
+# Identifica a este proceso para ignorar sus propias notificaciones
+_PROCESS_TOKEN = uuid.uuid4().hex
+
+
+class UserProfileCache:
+    """
+    Perfil básico de cada usuario (nivel, username y si está registrado) en memoria.
+
+    UserService escribe en la caché al registrar al usuario o cambiarle el nivel. Con varios
+    procesos, cada escritura publica además un NOTIFY en la misma transacción y
+    run_invalidation_listener descarta la entrada en el resto de procesos; el TTL acota lo
+    que puede durar un dato obsoleto si una notificación se pierde.
+    """
+    _cache = LRUCache(maxsize=MAX_CACHED_PROFILES, ttl=PROFILE_TTL_SECONDS)
+
+    @classmethod
+    def get(cls, user_id: int) -> Optional[UserProfile]:
+        return cls._cache.get(user_id)
+
+    @classmethod
+    def set(cls, profile: UserProfile) -> None:
+        cls._cache.set(profile.user_id, profile)
+
+    @classmethod
+    def invalidate(cls, user_id: int) -> None:
+        cls._cache.pop(user_id)
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._cache.clear()
+
+    @staticmethod
+    async def publish_invalidation(cursor, user_id: int) -> None:
+        """Avisa al resto de procesos; se entrega al confirmar la transacción del cursor"""
+        await cursor.execute(
+            "SELECT pg_notify(%s, %s)",
+            (INVALIDATION_CHANNEL, f"{_PROCESS_TOKEN}:{user_id}")
+        )
+
+    @classmethod
+    def _handle_notification(cls, payload: str) -> None:
+        token, _, user_id = payload.partition(":")
+        if token != _PROCESS_TOKEN and user_id.isdigit():
+            cls.invalidate(int(user_id))
+
+    @classmethod
+    async def _listen_once(cls) -> None:
+        loop = asyncio.get_running_loop()
+        conn = await loop.run_in_executor(None, lambda: DatabaseService.create_connection(autocommit=True))
+        readable = asyncio.Event()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+            loop.add_reader(conn.fileno(), readable.set)
+            logger.info(f"Escuchando invalidaciones de perfiles en {INVALIDATION_CHANNEL}")
+            while True:
+                await readable.wait()
+                readable.clear()
+                conn.poll()
+                while conn.notifies:
+                    cls._handle_notification(conn.notifies.pop(0).payload)
+        finally:
+            loop.remove_reader(conn.fileno())
+            conn.close()
+
+    @classmethod
+    async def run_invalidation_listener(cls) -> None:
+        """Tarea de fondo que aplica las invalidaciones publicadas por otros procesos"""
+        while True:
+            try:
+                await cls._listen_once()
+            except asyncio.CancelledError:
+                raise
+            except (psycopg2.Error, OSError) as e:
+                logger.error(f"Error en el listener de invalidaciones: {e}")
+                # Mientras no hay listener pueden haberse perdido avisos
+                cls.clear()
+                await asyncio.sleep(LISTENER_RETRY_SECONDS)
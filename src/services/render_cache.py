@@ -0,0 +1,39 @@
+# services/render_cache.py
+from typing import Any, Callable, Hashable, Iterable
+from src.utils.cache import LRUCache
+
+MAX_CACHED_EXERCISES = 5000
+
+
+class RenderCache:
+    """
+    Mensajes de ejercicio ya renderizados (texto MarkdownV2 y teclado), por ejercicio y variante.
+
+    El contenido es el mismo para todos los usuarios que reciben un ejercicio, así que se
+    renderiza una sola vez. ExerciseCatalog invalida las entradas de los ejercicios que
+    cambian o desaparecen al recargarse.
+    """
+    _cache = LRUCache(maxsize=MAX_CACHED_EXERCISES)
+
+    @classmethod
+    def get_or_render(cls, exercise_id: int, variant: Hashable, render: Callable[[], Any]) -> Any:
+        """Devuelve la variante en caché o la renderiza con render() y la guarda"""
+        variants = cls._cache.get(exercise_id)
+        if variants is None:
+            variants = {}
+            cls._cache.set(exercise_id, variants)
+
+        rendered = variants.get(variant)
+        if rendered is None:
+            rendered = variants[variant] = render()
+        return rendered
+
+    @classmethod
+    def invalidate(cls, exercise_ids: Iterable[int]) -> None:
+        """Descarta todas las variantes de los ejercicios indicados"""
+        for exercise_id in exercise_ids:
+            cls._cache.pop(exercise_id)
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._cache.clear()
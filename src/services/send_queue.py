@@ -0,0 +1,255 @@
+# services/send_queue.py
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message
+from src.utils.cache import LRUCache
+from src.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Prioridades: cuanto menor, antes se envía
+PRIORITY_ANSWER = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_BROADCAST = 2
+
+# Límites orientativos de Telegram: ~30 mensajes/s en total y ~1 mensaje/s por chat
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+CHAT_RATE = 1
+CHAT_BURST = 3
+MAX_IN_FLIGHT = 20
+MAX_RETRIES = 3
+MAX_TRACKED_CHATS = 10000
+STOP_TIMEOUT_SECONDS = 10
+
+
+@dataclass(order=True)
+class _SendJob:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    factory: Callable[[], Awaitable[Any]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    retries: int = field(default=0, compare=False)
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # El error ya se registra en el log; evita el aviso de "exception was never retrieved"
+    if not future.cancelled():
+        future.exception()
+
+
+class SendQueue:
+    """
+    Planificador de envíos salientes a la API de Telegram.
+
+    Los envíos se encolan por prioridad y se despachan respetando un cubo de tokens global
+    y otro por chat; dentro de un chat se mantiene el orden. Si Telegram responde con
+    RetryAfter, la cola se pausa ese tiempo y el envío se reintenta.
+
+    submit devuelve un Future con el resultado en cuanto el envío queda encolado, sin esperar
+    a la red. Si la cola no se ha iniciado (scripts, tests) el envío se hace directamente.
+    """
+    _heap: List[_SendJob] = []
+    _seq = itertools.count()
+    _task: Optional[asyncio.Task] = None
+    _wakeup: Optional[asyncio.Event] = None
+    _in_flight: Optional[asyncio.Semaphore] = None
+    _global_bucket: Optional[TokenBucket] = None
+    _chat_buckets = LRUCache(maxsize=MAX_TRACKED_CHATS)
+    _busy_chats: Set[int] = set()
+    _blocked_until: Dict[int, float] = {}
+    _parked: Dict[int, Deque[_SendJob]] = {}
+    _paused_until: float = 0.0
+    _hooks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def start(cls, global_rate: float = GLOBAL_RATE, global_burst: float = GLOBAL_BURST,
+              max_in_flight: int = MAX_IN_FLIGHT):
+        """Inicia la tarea que despacha los envíos"""
+        if cls._task is not None:
+            return
+        cls._heap = []
+        cls._busy_chats = set()
+        cls._blocked_until = {}
+        cls._parked = {}
+        cls._paused_until = 0.0
+        cls._chat_buckets.clear()
+        cls._wakeup = asyncio.Event()
+        cls._in_flight = asyncio.Semaphore(max_in_flight)
+        cls._global_bucket = TokenBucket(global_rate, global_burst)
+        cls._task = asyncio.create_task(cls._run())
+        logger.info(f"Cola de envíos iniciada ({global_rate} msg/s global, {CHAT_RATE} msg/s por chat)")
+
+    @classmethod
+    async def stop(cls, timeout: float = STOP_TIMEOUT_SECONDS):
+        """Espera a que se vacíe la cola (como mucho timeout segundos) y la detiene"""
+        if cls._task is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while cls.pending() and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+
+        cls._task.cancel()
+        await asyncio.gather(cls._task, return_exceptions=True)
+        cls._task = None
+
+        remaining = cls._heap + [job for jobs in cls._parked.values() for job in jobs]
+        for job in remaining:
+            job.future.cancel()
+        if remaining:
+            logger.warning(f"Cola de envíos detenida con {len(remaining)} mensajes sin enviar")
+        cls._heap = []
+        cls._parked = {}
+
+    @classmethod
+    def pending(cls) -> int:
+        """Envíos encolados o en curso"""
+        return len(cls._heap) + sum(len(jobs) for jobs in cls._parked.values()) + len(cls._busy_chats)
+
+    @classmethod
+    async def submit(cls, chat_id: int, factory: Callable[[], Awaitable[Any]],
+                     priority: int = PRIORITY_DEFAULT) -> asyncio.Future:
+        """
+        Encola un envío. factory debe crear la corrutina de la llamada a la API cada vez que
+        se invoca, para poder reintentarla.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if cls._task is None:
+            future.set_result(await factory())
+            return future
+
+        future.add_done_callback(_consume_exception)
+        cls._push(_SendJob(priority, next(cls._seq), chat_id, factory, future))
+        return future
+
+    @classmethod
+    async def answer(cls, message: Message, text: str, priority: int = PRIORITY_ANSWER,
+                     **kwargs) -> asyncio.Future:
+        """Equivalente encolado de message.answer"""
+        return await cls.submit(message.chat.id, lambda: message.answer(text, **kwargs), priority)
+
+    @classmethod
+    async def send_message(cls, bot: Bot, chat_id: int, text: str, priority: int = PRIORITY_DEFAULT,
+                           **kwargs) -> asyncio.Future:
+        """Equivalente encolado de bot.send_message"""
+        return await cls.submit(chat_id, lambda: bot.send_message(chat_id, text, **kwargs), priority)
+
+    @classmethod
+    def on_failure(cls, future: asyncio.Future, callback: Callable[[BaseException], Awaitable[Any]]):
+        """
+        Ejecuta callback(error) si el envío encolado falla (el error ya se registra en el log).
+        Un envío cancelado al detener la cola no cuenta como fallo.
+        """
+        def done(f: asyncio.Future):
+            if f.cancelled() or f.exception() is None:
+                return
+            task = asyncio.ensure_future(callback(f.exception()))
+            cls._hooks.add(task)
+            task.add_done_callback(cls._hooks.discard)
+
+        future.add_done_callback(done)
+
+    @classmethod
+    def _push(cls, job: _SendJob):
+        heapq.heappush(cls._heap, job)
+        cls._wakeup.set()
+
+    @classmethod
+    def _chat_available(cls, chat_id: int) -> bool:
+        return chat_id not in cls._busy_chats and chat_id not in cls._blocked_until and chat_id not in cls._parked
+
+    @classmethod
+    def _park(cls, job: _SendJob):
+        cls._parked.setdefault(job.chat_id, deque()).append(job)
+
+    @classmethod
+    def _release(cls, chat_id: int):
+        """Devuelve al heap los envíos aparcados de un chat cuando vuelve a estar libre"""
+        if chat_id in cls._busy_chats or chat_id in cls._blocked_until:
+            return
+        for job in cls._parked.pop(chat_id, ()):
+            cls._push(job)
+
+    @classmethod
+    def _unblock(cls, chat_id: int):
+        cls._blocked_until.pop(chat_id, None)
+        cls._release(chat_id)
+
+    @classmethod
+    def _chat_bucket(cls, chat_id: int) -> TokenBucket:
+        bucket = cls._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(CHAT_RATE, CHAT_BURST)
+            cls._chat_buckets.set(chat_id, bucket)
+        return bucket
+
+    @classmethod
+    async def _run(cls):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not cls._heap:
+                cls._wakeup.clear()
+                await cls._wakeup.wait()
+                continue
+
+            pause = cls._paused_until - loop.time()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            job = heapq.heappop(cls._heap)
+            if job.future.cancelled():
+                continue
+            if not cls._chat_available(job.chat_id):
+                cls._park(job)
+                continue
+
+            chat_wait = cls._chat_bucket(job.chat_id).try_acquire()
+            if chat_wait > 0:
+                cls._blocked_until[job.chat_id] = loop.time() + chat_wait
+                cls._park(job)
+                loop.call_later(chat_wait, cls._unblock, job.chat_id)
+                continue
+
+            while (global_wait := cls._global_bucket.try_acquire()) > 0:
+                await asyncio.sleep(global_wait)
+
+            await cls._in_flight.acquire()
+            cls._busy_chats.add(job.chat_id)
+            asyncio.create_task(cls._send(job))
+
+    @classmethod
+    async def _send(cls, job: _SendJob):
+        loop = asyncio.get_running_loop()
+        try:
+            result = await job.factory()
+        except TelegramRetryAfter as e:
+            if job.retries < MAX_RETRIES:
+                job.retries += 1
+                cls._paused_until = max(cls._paused_until, loop.time() + e.retry_after)
+                logger.warning(f"Límite de Telegram alcanzado, reintento en {e.retry_after}s (chat {job.chat_id})")
+                cls._push(job)
+            else:
+                logger.error(f"Envío al chat {job.chat_id} descartado tras {job.retries} reintentos")
+                if not job.future.done():
+                    job.future.set_exception(e)
+        except Exception as e:
+            logger.error(f"Error enviando mensaje al chat {job.chat_id}: {e}")
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            cls._in_flight.release()
+            cls._busy_chats.discard(job.chat_id)
+            cls._release(job.chat_id)
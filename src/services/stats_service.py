@@ -0,0 +1,267 @@
+# services/stats_service.py
+import json
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.models.user_stats import UserStats
+from src.services.database import DatabaseService
+from src.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_STATS = 10000
+# La racha depende de la fecha actual, así que las entradas caducan aunque nadie las invalide
+STATS_TTL_SECONDS = 300
+
+# (user_id, nivel, categoria, is_correct, completed_at, previous_is_correct)
+Completion = Tuple[int, str, str, bool, Any, Optional[bool]]
+
+STATS_ROW_TEMPLATE = "(%s::bigint, %s::integer, %s::integer, %s::jsonb, %s::jsonb, %s::timestamp, %s::date[])"
+
+# Recalcula toda la tabla user_stats a partir de user_ejercicios (usado por /rebuild_stats y migrate_to_db.py)
+REBUILD_USER_STATS_SQL = (
+    "DELETE FROM user_stats",
+    """
+    INSERT INTO user_stats (user_id, total, correct, level_counts, category_counts, last_practice, recent_days, updated_at)
+    SELECT
+        totals.user_id,
+        totals.total,
+        totals.correct,
+        COALESCE(per_level.counts, '{}'::jsonb),
+        COALESCE(per_category.counts, '{}'::jsonb),
+        totals.last_practice,
+        COALESCE(recent.days, '{}'::date[]),
+        CURRENT_TIMESTAMP
+    FROM (
+        SELECT user_id, COUNT(*) AS total, COUNT(*) FILTER (WHERE is_correct) AS correct,
+               MAX(completed_at) AS last_practice
+        FROM user_ejercicios
+        GROUP BY user_id
+    ) AS totals
+    LEFT JOIN (
+        SELECT user_id, jsonb_object_agg(nivel, jsonb_build_array(total, correct)) AS counts
+        FROM (
+            SELECT user_id, nivel, COUNT(*) AS total, COUNT(*) FILTER (WHERE is_correct) AS correct
+            FROM user_ejercicios
+            GROUP BY user_id, nivel
+        ) AS t
+        GROUP BY user_id
+    ) AS per_level ON per_level.user_id = totals.user_id
+    LEFT JOIN (
+        SELECT user_id, jsonb_object_agg(categoria, jsonb_build_array(total, correct)) AS counts
+        FROM (
+            SELECT user_id, categoria, COUNT(*) AS total, COUNT(*) FILTER (WHERE is_correct) AS correct
+            FROM user_ejercicios
+            GROUP BY user_id, categoria
+        ) AS t
+        GROUP BY user_id
+    ) AS per_category ON per_category.user_id = totals.user_id
+    LEFT JOIN (
+        SELECT user_id, array_agg(day ORDER BY day DESC) AS days
+        FROM (
+            SELECT DISTINCT user_id, DATE(completed_at) AS day
+            FROM user_ejercicios
+            WHERE is_correct AND completed_at >= CURRENT_DATE - INTERVAL '7 days'
+        ) AS d
+        GROUP BY user_id
+    ) AS recent ON recent.user_id = totals.user_id
+    """
+)
+
+
+def _load_counts(value) -> dict:
+    # psycopg devuelve jsonb ya decodificado; se acepta texto por si la columna fuera TEXT
+    if isinstance(value, str):
+        return json.loads(value)
+    return dict(value or {})
+
+
+class StatsService:
+    """
+    Estadísticas de progreso del usuario leídas de la tabla resumen user_stats.
+
+    El resumen se actualiza en la misma transacción que escribe en user_ejercicios, así que
+    leerlo cuesta una fila sin importar el historial del usuario. Los resultados se guardan
+    además en caché y se invalidan cuando el usuario completa un ejercicio o cambia de nivel.
+    """
+    _cache = LRUCache(maxsize=MAX_CACHED_STATS, ttl=STATS_TTL_SECONDS)
+
+    @staticmethod
+    def _summary_from_row(user_id: int, row) -> UserStats:
+        total, correct, level_counts, category_counts, last_practice, recent_days = row
+        if total is None:
+            return UserStats(user_id=user_id)
+        return UserStats(
+            user_id=user_id,
+            total=total,
+            correct=correct,
+            level_counts=_load_counts(level_counts),
+            category_counts=_load_counts(category_counts),
+            last_practice=last_practice,
+            recent_days=list(recent_days or [])
+        )
+
+    @staticmethod
+    def _to_stats_dict(summary: UserStats, level: Optional[str], today: date) -> Dict[str, Any]:
+        return {
+            "level": level,
+            "exercises": summary.correct,
+            "streak_days": summary.streak_days(today),
+            "referrals": 0,  # Placeholder
+            "challenge_score": 0,  # Placeholder
+            "last_practice": summary.last_practice,
+            "exercises_by_level": {k: c for k, (t, c) in summary.level_counts.items() if c},
+            "exercises_by_category": {k: c for k, (t, c) in summary.category_counts.items() if c},
+            "total_exercises": summary.total,
+            "correct_exercises": summary.correct,
+            "categories_count": sum(1 for t, c in summary.category_counts.values() if t),
+            "levels_count": sum(1 for t, c in summary.level_counts.values() if t)
+        }
+
+    @classmethod
+    async def _compute(cls, user_id: int) -> Dict[str, Any]:
+        async with DatabaseService.get_async_cursor() as cursor:
+            await cursor.execute("""
+                SELECT
+                    CURRENT_DATE,
+                    (SELECT level FROM users WHERE user_id = %s),
+                    s.total, s.correct, s.level_counts, s.category_counts, s.last_practice, s.recent_days
+                FROM (SELECT 1) AS uno
+                LEFT JOIN user_stats s ON s.user_id = %s
+            """, (user_id, user_id))
+            row = await cursor.fetchone()
+
+        today, level = row[0], row[1]
+        return cls._to_stats_dict(cls._summary_from_row(user_id, row[2:]), level, today)
+
+    @classmethod
+    async def get_stats(cls, user_id: int) -> Dict[str, Any]:
+        """Obtiene las estadísticas del usuario, desde la caché si están disponibles"""
+        # Lee sus propias escrituras: las respuestas aún en el buffer se vuelcan antes de leer
+        from src.services.answer_log import AnswerLog
+        if AnswerLog.has_pending(user_id):
+            await AnswerLog.flush()
+
+        stats = cls._cache.get(user_id)
+        if stats is None:
+            stats = await cls._compute(user_id)
+            cls._cache.set(user_id, stats)
+        return stats
+
+    @staticmethod
+    def previous_correctness(user_id: int, inserted: bool, previous_is_correct: Optional[bool],
+                             is_correct: bool) -> Optional[bool]:
+        """
+        previous_is_correct para apply_completion a partir del RETURNING del upsert.
+        Una fila actualizada cuya versión anterior no se pudo leer no se cuenta dos veces.
+        """
+        if inserted:
+            return None
+        if previous_is_correct is None:
+            logger.warning(f"Fila de user_ejercicios actualizada sin estado anterior (usuario {user_id})")
+            return is_correct
+        return bool(previous_is_correct)
+
+    @classmethod
+    async def lock_summary(cls, cursor, user_id: int) -> UserStats:
+        """
+        Bloquea (creándola si hace falta) la fila de user_stats del usuario.
+        Debe llamarse antes de escribir en user_ejercicios: así dos respuestas simultáneas del
+        mismo usuario se serializan y el upsert de la segunda ve ya confirmada la primera.
+        """
+        return (await cls.lock_summaries(cursor, [user_id]))[user_id]
+
+    @classmethod
+    async def lock_summaries(cls, cursor, user_ids: Iterable[int]) -> Dict[int, UserStats]:
+        """Versión por lotes de lock_summary; bloquea en orden de user_id para no interbloquearse"""
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return {}
+
+        await cursor.execute(
+            "INSERT INTO user_stats (user_id) SELECT unnest(%s::bigint[]) ON CONFLICT (user_id) DO NOTHING",
+            (user_ids,)
+        )
+        await cursor.execute("""
+            SELECT user_id, total, correct, level_counts, category_counts, last_practice, recent_days
+            FROM user_stats
+            WHERE user_id = ANY(%s::bigint[])
+            ORDER BY user_id
+            FOR UPDATE
+        """, (user_ids,))
+        return {row[0]: cls._summary_from_row(row[0], row[1:]) for row in await cursor.fetchall()}
+
+    @classmethod
+    async def record_completion(cls, cursor, summary: UserStats, nivel: str, categoria: str, is_correct: bool,
+                                completed_at, previous_is_correct: Optional[bool] = None) -> UserStats:
+        """
+        Aplica una fila escrita en user_ejercicios al resumen bloqueado con lock_summary.
+        Recibe el cursor de la transacción que hizo la escritura para que ambas se confirmen juntas.
+        """
+        summary.apply_completion(nivel, categoria, is_correct, completed_at, previous_is_correct)
+
+        await cursor.execute("""
+            UPDATE user_stats
+            SET total = %s, correct = %s, level_counts = %s::jsonb, category_counts = %s::jsonb,
+                last_practice = %s, recent_days = %s::date[], updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = %s
+        """, (
+            summary.total, summary.correct,
+            json.dumps(summary.level_counts, ensure_ascii=False),
+            json.dumps(summary.category_counts, ensure_ascii=False),
+            summary.last_practice, summary.recent_days, summary.user_id
+        ))
+        return summary
+
+    @classmethod
+    async def record_completions(cls, cursor, summaries: Dict[int, UserStats],
+                                 completions: List[Completion]) -> Dict[int, UserStats]:
+        """
+        Versión por lotes de record_completion: aplica muchas filas, de muchos usuarios, a los
+        resúmenes bloqueados con lock_summaries y los guarda con un único UPDATE.
+        """
+        if not completions:
+            return summaries
+
+        for user_id, nivel, categoria, is_correct, completed_at, previous_is_correct in completions:
+            summaries[user_id].apply_completion(nivel, categoria, is_correct, completed_at, previous_is_correct)
+
+        values, params = DatabaseService.values_clause(STATS_ROW_TEMPLATE, [
+            (
+                summary.user_id, summary.total, summary.correct,
+                json.dumps(summary.level_counts, ensure_ascii=False),
+                json.dumps(summary.category_counts, ensure_ascii=False),
+                summary.last_practice, summary.recent_days
+            )
+            for summary in summaries.values()
+        ])
+        await cursor.execute(f"""
+            UPDATE user_stats AS s
+            SET total = v.total, correct = v.correct, level_counts = v.level_counts,
+                category_counts = v.category_counts, last_practice = v.last_practice,
+                recent_days = v.recent_days, updated_at = CURRENT_TIMESTAMP
+            FROM (VALUES {values}) AS v(user_id, total, correct, level_counts, category_counts,
+                                        last_practice, recent_days)
+            WHERE s.user_id = v.user_id
+        """, params)
+        return summaries
+
+    @classmethod
+    async def rebuild_summaries(cls) -> int:
+        """Reconstruye user_stats desde user_ejercicios y devuelve el número de usuarios resumidos"""
+        async with DatabaseService.get_async_cursor() as cursor:
+            for statement in REBUILD_USER_STATS_SQL:
+                await cursor.execute(statement)
+            await cursor.execute("SELECT COUNT(*) FROM user_stats")
+            rebuilt = (await cursor.fetchone())[0]
+        cls.clear()
+        logger.info(f"Resumen de estadísticas reconstruido para {rebuilt} usuarios")
+        return rebuilt
+
+    @classmethod
+    def invalidate(cls, user_id: int) -> None:
+        cls._cache.pop(user_id)
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._cache.clear()
@@ -24,7 +24,7 @@ def init_test_db():
 
         with conn.cursor() as cursor:
             # Drop existing tables to ensure clean state
-            cursor.execute("DROP TABLE IF EXISTS feedback, users, ejercicios, curiosidades CASCADE;")
+            cursor.execute("DROP TABLE IF EXISTS feedback, users, ejercicios, curiosidades, user_ejercicios, user_stats, daily_challenges, catalog_versions CASCADE;")
 
             # Create tables
             cursor.execute("""
@@ -48,14 +48,58 @@ def init_test_db():
                     opciones TEXT NOT NULL,
                     respuesta_correcta INTEGER NOT NULL,
                     explicacion TEXT,
-                    activo BOOLEAN DEFAULT TRUE
+                    activo BOOLEAN DEFAULT TRUE,
+                    content_hash VARCHAR(64)
+                );
+
+                CREATE INDEX idx_ejercicios_content_hash ON ejercicios (content_hash);
+
+                CREATE TABLE catalog_versions (
+                    version SERIAL PRIMARY KEY,
+                    exercises INTEGER NOT NULL,
+                    inserted INTEGER NOT NULL,
+                    updated INTEGER NOT NULL,
+                    deactivated INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
 
                 CREATE TABLE curiosidades (
                     id SERIAL PRIMARY KEY,
                     categoria VARCHAR(255) NOT NULL,
                     texto TEXT NOT NULL,
-                    activo BOOLEAN DEFAULT TRUE
+                    activo BOOLEAN DEFAULT TRUE,
+                    content_hash VARCHAR(64)
+                );
+
+                CREATE TABLE user_ejercicios (
+                    id SERIAL PRIMARY KEY,
+                    user_id BIGINT NOT NULL,
+                    exercise_id INTEGER NOT NULL,
+                    nivel VARCHAR(50),
+                    categoria VARCHAR(255),
+                    is_correct BOOLEAN DEFAULT FALSE,
+                    attempts INTEGER DEFAULT 0,
+                    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (user_id, exercise_id)
+                );
+
+                CREATE TABLE user_stats (
+                    user_id BIGINT PRIMARY KEY,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    correct INTEGER NOT NULL DEFAULT 0,
+                    level_counts JSONB NOT NULL DEFAULT '{}',
+                    category_counts JSONB NOT NULL DEFAULT '{}',
+                    last_practice TIMESTAMP,
+                    recent_days DATE[] NOT NULL DEFAULT '{}',
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+
+                CREATE TABLE daily_challenges (
+                    challenge_date DATE NOT NULL,
+                    nivel VARCHAR(50) NOT NULL,
+                    exercise_id INTEGER NOT NULL REFERENCES ejercicios(id),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (challenge_date, nivel)
                 );
 
                 CREATE TABLE feedback (
@@ -0,0 +1,376 @@
+# tests/load_harness.py
+"""
+Prueba de carga de extremo a extremo: usuarios sintéticos recorren el ciclo
+/ejercicio → respuesta → next_exercise a través del Dispatcher real, con todos los
+routers y middlewares de main.py.
+
+Uso:
+    python -m src.tests.load_harness --users 500 --rounds 5
+    python -m src.tests.load_harness --users 200 --postgres   # usa la base de datos de .env
+
+Las llamadas a la API de Telegram las recibe una sesión falsa que las registra. Sin
+--postgres, la base de datos se sustituye por un almacén en memoria (InMemoryBackend)
+con una latencia simulada por consulta (--db-latency-ms).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from unittest.mock import patch
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message, Update
+from src.models.exercise import Exercise
+from src.models.user_exercise import UserExercise
+from src.utils.bitset import Bitset
+
+BOT_TOKEN = "42:LOAD-TEST"
+DEFAULT_EXERCISES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "ejercicios.json")
+# Consultas que hace mark_exercise_completed: upsert, alta del resumen, SELECT FOR UPDATE y UPDATE
+MARK_COMPLETED_ROUND_TRIPS = 4
+
+
+class RecordingSession(BaseSession):
+    """Sesión de Bot que no sale a la red: registra cada llamada y devuelve una respuesta plausible"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls = Counter()
+        self.error_replies = 0
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot: Bot, method, timeout: Optional[int] = None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls[type(method).__name__] += 1
+
+        if isinstance(method, SendMessage):
+            if "Error" in method.text:
+                self.error_replies += 1
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text
+            )
+        return True
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True):
+        raise NotImplementedError("La sesión de carga no descarga ficheros")
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def load_exercises(path: str = DEFAULT_EXERCISES_PATH) -> List[Exercise]:
+    """Lee ejercicios.json (nivel → categoría → lista) y les asigna ids consecutivos"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    exercises = []
+    for nivel, categorias in data.items():
+        for categoria, items in categorias.items():
+            for item in items:
+                exercises.append(Exercise(
+                    id=len(exercises) + 1,
+                    categoria=categoria,
+                    nivel=nivel,
+                    pregunta=item["pregunta"],
+                    opciones=item["opciones"],
+                    respuesta_correcta=item["respuesta"],
+                    explicacion=item.get("explicacion")
+                ))
+    return exercises
+
+
+class InMemoryBackend:
+    """
+    Sustituto de PostgreSQL para la prueba de carga.
+
+    Reemplaza las funciones de los servicios que van a la base de datos en el ciclo de
+    ejercicios; cada una espera `latency` segundos por consulta para simular la red.
+    """
+
+    def __init__(self, exercises: List[Exercise], latency: float = 0.0):
+        self.exercises = exercises
+        self.latency = latency
+        self.queries = 0
+        self.levels: Dict[int, str] = {}
+        self.completed: Dict[int, Dict[int, UserExercise]] = defaultdict(dict)
+        self._row_ids = itertools.count(1)
+
+    async def _round_trip(self, count: int = 1):
+        self.queries += count
+        if self.latency:
+            await asyncio.sleep(self.latency * count)
+
+    async def fetch_rows(self) -> list:
+        await self._round_trip()
+        return [
+            (e.id, e.categoria, e.nivel, e.pregunta, e.opciones, e.respuesta_correcta, e.explicacion)
+            for e in self.exercises
+        ]
+
+    async def fetch_fingerprint(self) -> tuple:
+        await self._round_trip()
+        return len(self.exercises), hash(repr([e.to_dict() for e in self.exercises]))
+
+    async def get_user_level(self, user_id: int) -> str:
+        await self._round_trip()
+        return self.levels.get(user_id, "principiante")
+
+    async def load_completed(self, user_id: int) -> Bitset:
+        await self._round_trip()
+        return Bitset(self.completed[user_id])
+
+    async def mark_exercise_completed(self, user_id: int, exercise_id: int, nivel: str,
+                                      categoria: str, is_correct: bool, attempts: int) -> UserExercise:
+        from src.services.completion_cache import CompletionCache
+        from src.services.stats_service import StatsService
+
+        await self._round_trip(MARK_COMPLETED_ROUND_TRIPS)
+        previous = self.completed[user_id].get(exercise_id)
+        record = UserExercise(
+            id=previous.id if previous else next(self._row_ids),
+            user_id=user_id,
+            exercise_id=exercise_id,
+            completed_at=datetime.now(),
+            nivel=nivel,
+            categoria=categoria,
+            is_correct=is_correct,
+            attempts=attempts
+        )
+        self.completed[user_id][exercise_id] = record
+        CompletionCache.mark_completed(user_id, exercise_id)
+        StatsService.invalidate(user_id)
+        return record
+
+    @contextmanager
+    def installed(self):
+        from src.services.completion_cache import CompletionCache
+        from src.services.exercise_catalog import ExerciseCatalog
+        from src.services.exercise_service import ExerciseService
+        from src.services.user_service import UserService
+
+        with ExitStack() as stack:
+            stack.enter_context(patch.object(ExerciseCatalog, "_fetch_rows", self.fetch_rows))
+            stack.enter_context(patch.object(ExerciseCatalog, "_fetch_fingerprint", self.fetch_fingerprint))
+            stack.enter_context(patch.object(UserService, "get_user_level", self.get_user_level))
+            stack.enter_context(patch.object(CompletionCache, "_load", self.load_completed))
+            stack.enter_context(patch.object(ExerciseService, "mark_exercise_completed",
+                                             self.mark_exercise_completed))
+            yield self
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class LoadTest:
+    """Genera los updates de cada usuario sintético y mide cuánto tarda el Dispatcher en cada uno"""
+
+    def __init__(self, dp: Dispatcher, bot: Bot, correct_ratio: float = 0.7):
+        self.dp = dp
+        self.bot = bot
+        self.correct_ratio = correct_ratio
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self._update_ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"Carga {user_id}"}
+
+    def _message(self, user_id: int, text: str) -> dict:
+        update_id = next(self._update_ids)
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self._user(user_id),
+                "text": text
+            }
+        }
+
+    def _callback(self, user_id: int, data: str) -> dict:
+        update_id = next(self._update_ids)
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self._user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    # Como en Telegram, el mensaje con los botones lo envió el bot
+                    "from": {"id": self.bot.id, "is_bot": True, "first_name": "Bot"},
+                    "text": "Resultado"
+                }
+            }
+        }
+
+    async def feed(self, kind: str, raw_update: dict):
+        update = Update.model_validate(raw_update, context={"bot": self.bot})
+        started = time.perf_counter()
+        await self.dp.feed_update(self.bot, update)
+        self.latencies[kind].append(time.perf_counter() - started)
+
+    async def _state_data(self, user_id: int) -> dict:
+        key = StorageKey(bot_id=self.bot.id, chat_id=user_id, user_id=user_id)
+        return await self.dp.storage.get_data(key)
+
+    def _choose_answer(self, exercise_data: dict) -> str:
+        from src.handlers.exercises import parse_exercise_options
+
+        options = parse_exercise_options(exercise_data)
+        correct = exercise_data["respuesta_correcta"]
+        wrong = [option for index, option in enumerate(options) if index != correct]
+        if wrong and random.random() >= self.correct_ratio:
+            return random.choice(wrong)
+        return options[correct]
+
+    async def run_user(self, user_id: int, rounds: int):
+        from src.handlers.exercises import get_exercise_data
+
+        await self.feed("ejercicio", self._message(user_id, "/ejercicio"))
+        for _ in range(rounds):
+            # Responder hasta acertar o agotar los intentos (el estado se limpia al terminar)
+            while True:
+                data = await self._state_data(user_id)
+                exercise_data = get_exercise_data(data["exercise_id"]) if data.get("exercise_id") else None
+                if exercise_data is None:
+                    break
+                await self.feed("answer", self._message(user_id, self._choose_answer(exercise_data)))
+            await self.feed("next_exercise", self._callback(user_id, "next_exercise"))
+
+
+async def run_load_test(users: int, rounds: int, concurrency: Optional[int] = None,
+                        db_latency: float = 0.002, api_latency: float = 0.0, correct_ratio: float = 0.7,
+                        use_postgres: bool = False, user_id_base: int = 900_000_000,
+                        exercises_path: str = DEFAULT_EXERCISES_PATH) -> Dict[str, Any]:
+    """Ejecuta la prueba y devuelve latencias por tipo de update, throughput y llamadas a la API"""
+    from src.main import build_dispatcher
+    from src.services.database import DatabaseService
+    from src.services.exercise_catalog import ExerciseCatalog
+    from src.services.user_service import UserService
+
+    session = RecordingSession(latency=api_latency)
+    bot = Bot(token=BOT_TOKEN, session=session)
+    # Los usuarios sintéticos responden a ritmo de máquina: sin throttling se mide el pipeline completo
+    dp = build_dispatcher(storage=MemoryStorage(), throttling=False)
+    load_test = LoadTest(dp, bot, correct_ratio=correct_ratio)
+    user_ids = [user_id_base + i for i in range(users)]
+    semaphore = asyncio.Semaphore(concurrency or users)
+
+    async def run_user(user_id: int):
+        async with semaphore:
+            await load_test.run_user(user_id, rounds)
+
+    with ExitStack() as stack:
+        backend = None
+        if use_postgres:
+            await DatabaseService.initialize_async()
+            for user_id in user_ids:
+                await UserService.register_user(user_id, f"carga_{user_id}")
+        else:
+            backend = stack.enter_context(InMemoryBackend(load_exercises(exercises_path), db_latency).installed())
+        await ExerciseCatalog.load()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_user(user_id) for user_id in user_ids))
+        elapsed = time.perf_counter() - started
+
+        if use_postgres:
+            await DatabaseService.close_async()
+
+    total_updates = sum(len(values) for values in load_test.latencies.values())
+    report = {
+        "users": users,
+        "rounds": rounds,
+        "updates": total_updates,
+        "elapsed": elapsed,
+        "updates_per_second": total_updates / elapsed if elapsed else 0.0,
+        "latency": {},
+        "api_calls": dict(session.calls),
+        "error_replies": session.error_replies,
+        "db_queries": backend.queries if backend else None
+    }
+    for kind, values in load_test.latencies.items():
+        values.sort()
+        report["latency"][kind] = {
+            "count": len(values),
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99)
+        }
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"Usuarios: {report['users']}, rondas: {report['rounds']}")
+    print(f"Updates: {report['updates']} en {report['elapsed']:.2f}s → {report['updates_per_second']:.1f} updates/s")
+    for kind, stats in report["latency"].items():
+        print(
+            f"  {kind:<14} n={stats['count']:<7} p50={stats['p50'] * 1000:7.2f} ms  "
+            f"p95={stats['p95'] * 1000:7.2f} ms  p99={stats['p99'] * 1000:7.2f} ms"
+        )
+    print(f"Llamadas a la API: {report['api_calls']}")
+    print(f"Respuestas de error: {report['error_replies']}")
+    if report["db_queries"] is not None:
+        print(f"Consultas simuladas: {report['db_queries']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del ciclo de ejercicios")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5, help="Ejercicios por usuario")
+    parser.add_argument("--concurrency", type=int, default=None, help="Usuarios simultáneos (por defecto todos)")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="Latencia simulada por consulta")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="Latencia simulada de la API de Telegram")
+    parser.add_argument("--correct-ratio", type=float, default=0.7)
+    parser.add_argument("--postgres", action="store_true", help="Usar la base de datos configurada en .env")
+    parser.add_argument("--json", action="store_true", help="Imprimir el informe como JSON")
+    args = parser.parse_args()
+
+    # Los logs por update de aiogram y de los handlers distorsionan la medida
+    logging.disable(logging.INFO)
+    if args.postgres:
+        from dotenv import load_dotenv
+        load_dotenv()
+
+    report = asyncio.run(run_load_test(
+        users=args.users,
+        rounds=args.rounds,
+        concurrency=args.concurrency,
+        db_latency=args.db_latency_ms / 1000,
+        api_latency=args.api_latency_ms / 1000,
+        correct_ratio=args.correct_ratio,
+        use_postgres=args.postgres
+    ))
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
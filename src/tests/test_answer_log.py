@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.services.answer_log import MAX_FLUSH_ATTEMPTS, AnswerLog
+from src.services.completion_cache import CompletionCache
+
+
+@pytest.mark.asyncio
+async def test_answers_are_coalesced_and_written_in_one_batch():
+    AnswerLog.start(flush_interval=60)
+    AnswerLog.record(1, 10, "principiante", "gramática", False, 3)
+    AnswerLog.record(1, 10, "principiante", "gramática", True, 1)
+    AnswerLog.record(2, 11, "intermedio", "vocabulario", True, 1)
+    assert AnswerLog.pending() == 2
+    assert AnswerLog.pending_exercise_ids(1) == [10]
+
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.side_effect = [
+        [(1, 0, 0, {}, {}, None, []), (2, 1, 0, {"intermedio": [1, 0]}, {"vocabulario": [1, 0]}, None, [])],
+        [(100, 1, 10, True, None), (101, 2, 11, False, False)],
+    ]
+    with patch("src.services.database.DatabaseService.get_cursor") as mock_get_cursor:
+        mock_get_cursor.return_value.__enter__.return_value = mock_cursor
+        assert await AnswerLog.flush() == 2
+    await AnswerLog.stop()
+
+    calls = mock_cursor.execute.call_args_list
+    # user_stats se bloquea antes del upsert; 4 sentencias para todo el lote
+    assert len(calls) == 4 and "FOR UPDATE" in calls[1].args[0]
+    assert calls[2].args[1][:5] == [1, 10, "principiante", "gramática", True]
+    # user 1: fila nueva y correcta; user 2: la fila ya existía y pasa de fallo a acierto
+    assert calls[3].args[1][:3] == [1, 1, 1] and calls[3].args[1][7:10] == [2, 1, 1]
+    assert AnswerLog.pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_pending_answers_overlay_reads_and_survive_failed_flush():
+    CompletionCache.clear()
+    AnswerLog.start(flush_interval=60)
+    AnswerLog.record(3, 20, "avanzado", "gramática", True, 1)
+
+    failing = MagicMock()
+    failing.execute.side_effect = RuntimeError("sin conexión")
+    loaded = MagicMock()
+    loaded.fetchall.return_value = [(5,)]
+    with patch("src.services.database.DatabaseService.get_cursor") as mock_get_cursor:
+        mock_get_cursor.return_value.__enter__.return_value = failing
+        assert await AnswerLog.flush() == 0
+        mock_get_cursor.return_value.__enter__.return_value = loaded
+        completed = await CompletionCache.get(3)
+
+        assert AnswerLog.has_pending(3)
+        assert list(completed) == [5, 20]
+
+        # El siguiente volcado reintenta el lote
+        loaded.fetchall.side_effect = [[(3, 0, 0, {}, {}, None, [])], [(102, 3, 20, True, None)]]
+        await AnswerLog.stop()
+
+    assert not AnswerLog.has_pending(3)
+
+
+@pytest.mark.asyncio
+async def test_repeated_failures_drop_only_unwritable_rows():
+    AnswerLog.start(flush_interval=60)
+    AnswerLog.record(4, 30, "principiante", "gramática", True, 1)
+    AnswerLog.record(5, 31, "principiante", "gramática", True, 1)
+
+    async def write(batch):
+        if 4 in batch:
+            raise RuntimeError("fila inválida")
+        return 1
+
+    with patch.object(AnswerLog, "_write", side_effect=write) as mock_write:
+        for _ in range(MAX_FLUSH_ATTEMPTS):
+            assert await AnswerLog.flush() == 0
+        assert AnswerLog.pending() == 2
+        # Agotados los intentos el lote se escribe fila a fila y se descarta la que falla
+        assert await AnswerLog.flush() == 1
+        assert mock_write.call_count == MAX_FLUSH_ATTEMPTS + 2
+    assert AnswerLog.pending() == 0
+    await AnswerLog.stop()
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_falls_back_to_direct_write():
+    AnswerLog.start(flush_interval=60, max_buffered=1)
+    assert AnswerLog.record(6, 40, "principiante", "gramática", False, 1) is not None
+    # Sustituir una respuesta pendiente sigue permitido; una nueva no
+    assert AnswerLog.record(6, 40, "principiante", "gramática", True, 2) is not None
+    assert AnswerLog.record(6, 41, "principiante", "gramática", True, 1) is None
+
+    with patch.object(AnswerLog, "_write", return_value=1):
+        await AnswerLog.stop()
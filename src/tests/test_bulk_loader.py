@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.services.bulk_loader import ExerciseBulkLoader
+from src.utils.exercise_utils import iter_json_data
+
+EXERCISES = {
+    "principiante": {
+        "gramática": [
+            {"pregunta": "¿Ser para 'él'?", "opciones": ["Soy", "Es"], "respuesta": 1},
+            {"pregunta": "Sin opciones", "opciones": [], "respuesta": 0},
+            {"pregunta": "¿Artículo de 'mesa'?", "opciones": '["El", "La"]', "respuesta": 1},
+        ],
+        "vocabulario": [
+            {"pregunta": "Respuesta fuera de rango", "opciones": ["a", "b"], "respuesta": 5},
+            {"pregunta": "¿Plural de 'libro'?", "opciones": ["Libros", "Libres"], "respuesta": 0},
+            {"pregunta": "¿Plural de 'libro'?", "opciones": ["Libros", "Libres"], "respuesta": 0},
+        ],
+    }
+}
+
+
+@patch("src.services.bulk_loader.execute_values")
+@patch("src.services.database.DatabaseService.get_cursor")
+def test_rows_are_staged_in_batches_and_errors_reported(mock_get_cursor, mock_execute_values):
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = [("text",), (1,)]
+    cursor.fetchall.return_value = []
+    mock_get_cursor.return_value.__enter__.return_value = cursor
+    progress = []
+
+    report = ExerciseBulkLoader.swap(iter_json_data(EXERCISES), batch_size=2,
+                                     progress=lambda staged, total: progress.append(staged))
+
+    assert report.total == 6
+    assert report.staged == 3
+    assert report.skipped == 1
+    assert [position for position, _ in report.errors] == ["principiante/gramática[1]", "principiante/vocabulario[0]"]
+    assert progress == [2, 3]
+
+    batches = [call.args[2] for call in mock_execute_values.call_args_list[:2]]
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[0][1][:6] == ("gramática", "principiante", "¿Artículo de 'mesa'?", '["El", "La"]', 1, None)
+
+
+@patch("src.services.bulk_loader.execute_values")
+@patch("src.services.database.DatabaseService.get_cursor")
+def test_swap_stages_rows_and_switches_without_deleting(mock_get_cursor, mock_execute_values):
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = [("text",), (4,)]
+    cursor.fetchall.return_value = []
+    cursor.rowcount = 1
+    mock_get_cursor.return_value.__enter__.return_value = cursor
+
+    report = ExerciseBulkLoader.swap(iter_json_data(EXERCISES))
+
+    executed = [call.args[0] for call in cursor.execute.call_args_list]
+    assert not any("DELETE" in sql for sql in executed)
+    assert "ejercicios_staging" in mock_execute_values.call_args_list[0].args[1]
+    assert any("catalog_versions (exercises" in sql for sql in executed)
+    assert report.version == 4
+    assert (report.inserted, report.updated, report.deactivated, report.unchanged) == (1, 1, 1, 1)
+
+
+@patch("src.services.bulk_loader.execute_values")
+@patch("src.services.database.DatabaseService.get_cursor")
+def test_swap_with_identical_content_keeps_the_current_version(mock_get_cursor, mock_execute_values):
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = [("text",), (4,)]
+    cursor.fetchall.return_value = []
+    cursor.rowcount = 0
+    mock_get_cursor.return_value.__enter__.return_value = cursor
+
+    report = ExerciseBulkLoader.swap(iter_json_data(EXERCISES))
+
+    executed = [call.args[0] for call in cursor.execute.call_args_list]
+    assert not any("catalog_versions (exercises" in sql for sql in executed)
+    assert report.version == 4
+    assert report.unchanged == report.staged == 3
+
+
+@patch("src.services.bulk_loader.execute_values")
+@patch("src.services.database.DatabaseService.get_cursor")
+def test_swap_refuses_an_empty_catalog(mock_get_cursor, mock_execute_values):
+    cursor = MagicMock()
+    cursor.fetchone.return_value = ("text",)
+    mock_get_cursor.return_value.__enter__.return_value = cursor
+
+    with pytest.raises(ValueError):
+        ExerciseBulkLoader.swap(iter_json_data({"principiante": {"gramática": [{"pregunta": "", "opciones": []}]}}))
+    mock_execute_values.assert_not_called()
@@ -0,0 +1,46 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.services.completion_cache import CompletionCache
+from src.utils.bitset import Bitset
+from src.utils.cache import LRUCache
+
+
+def test_bitset_membership_and_count():
+    bitset = Bitset([3, 70, 1000])
+    assert 70 in bitset
+    assert 4 not in bitset
+    assert len(bitset) == 3
+    assert list(bitset) == [3, 70, 1000]
+
+    bitset.add(4)
+    assert bitset.count_in(Bitset([3, 4, 5]).bits) == 2
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+@pytest.mark.asyncio
+async def test_completion_cache_loads_once_and_updates_in_place():
+    CompletionCache.clear()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = [(1,), (5,)]
+
+    with patch("src.services.database.DatabaseService.get_cursor") as mock_get_cursor:
+        mock_get_cursor.return_value.__enter__.return_value = mock_cursor
+        completed = await CompletionCache.get(42)
+        CompletionCache.mark_completed(42, 9)
+        again = await CompletionCache.get(42)
+
+    assert again is completed
+    assert list(again) == [1, 5, 9]
+    mock_cursor.execute.assert_called_once()
@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.services.curiosity_service import CuriosityService
+
+
+def _rows(ids):
+    return [(i, "Gramática", f"Curiosidad {i}") for i in ids]
+
+
+@pytest.fixture
+def pool():
+    CuriosityService.clear()
+    rows = _rows(range(1, 6))
+    fingerprint = [(5, "a")]
+    with patch.object(CuriosityService, "_fetch_rows", AsyncMock(side_effect=lambda: rows)), \
+         patch.object(CuriosityService, "_fetch_fingerprint", AsyncMock(side_effect=lambda: fingerprint[0])):
+        yield rows, fingerprint
+    CuriosityService.clear()
+
+
+@pytest.mark.asyncio
+async def test_each_user_sees_every_curiosity_before_repeating(pool):
+    seen = [(await CuriosityService.get_random_curiosity(1)).id for _ in range(5)]
+    assert sorted(seen) == [1, 2, 3, 4, 5]
+
+    # Al rellenar la bolsa no se repite la última mostrada
+    assert (await CuriosityService.get_random_curiosity(1)).id != seen[-1]
+    assert CuriosityService._fetch_rows.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_reloads_when_table_changes(pool):
+    rows, fingerprint = pool
+    await CuriosityService.get_random_curiosity(1)
+
+    rows[:] = _rows([10, 11])
+    fingerprint[0] = (2, "b")
+    assert await CuriosityService.refresh_if_changed()
+    assert not await CuriosityService.refresh_if_changed()
+
+    seen = {(await CuriosityService.get_random_curiosity(1)).id for _ in range(2)}
+    assert seen == {10, 11}
+    assert await CuriosityService.get_curiosity_count() == 2
+
+
+@pytest.mark.asyncio
+async def test_change_between_fingerprint_and_rows_is_reloaded(pool):
+    rows, fingerprint = pool
+
+    def fetch_rows():
+        # Una importación se confirma justo después de leer la huella
+        rows[:] = _rows([20])
+        fingerprint[0] = (1, "c")
+        return list(rows)
+
+    with patch.object(CuriosityService, "_fetch_rows", AsyncMock(side_effect=fetch_rows)):
+        await CuriosityService.load()
+    assert await CuriosityService.refresh_if_changed()
@@ -0,0 +1,71 @@
+import pytest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from src.services.daily_challenge_service import DailyChallengeService
+from src.services.exercise_catalog import ExerciseCatalog
+from src.services.render_cache import RenderCache
+
+ROWS = [
+    (1, "gramática", "principiante", "¿Pregunta 1?", '["a", "b"]', 0, None),
+    (2, "gramática", "intermedio", "¿Pregunta 2?", '["a", "b"]', 1, None),
+]
+
+
+@pytest.fixture
+def mock_cursor():
+    RenderCache.clear()
+    cursor = MagicMock()
+    cursor.fetchall.return_value = ROWS
+    cursor.fetchone.return_value = (2, 2, 3)
+    with patch("src.services.database.DatabaseService.get_cursor") as mock_get_cursor:
+        mock_get_cursor.return_value.__enter__.return_value = cursor
+        yield cursor
+    DailyChallengeService.clear()
+    RenderCache.clear()
+
+
+@pytest.mark.asyncio
+async def test_prepare_day_keeps_the_persisted_challenge(mock_cursor):
+    await ExerciseCatalog.load()
+    # Otra instancia ya eligió el reto de hoy: prevalece la fila guardada
+    mock_cursor.fetchall.return_value = [("principiante", 1), ("intermedio", 2)]
+
+    challenges = await DailyChallengeService.prepare_day(date(2024, 5, 1))
+
+    assert {nivel: c.exercise_id for nivel, c in challenges.items()} == {"principiante": 1, "intermedio": 2}
+    insert_params = [call.args[1] for call in mock_cursor.execute.call_args_list if "INSERT" in call.args[0]]
+    assert [params[1] for params in insert_params] == ["principiante", "intermedio"]
+
+
+@pytest.mark.asyncio
+async def test_rendered_challenge_is_served_from_memory(mock_cursor):
+    await ExerciseCatalog.load()
+    mock_cursor.fetchall.return_value = [("intermedio", 2)]
+    render = MagicMock(return_value=("texto", "teclado"))
+
+    first = await DailyChallengeService.get_rendered("intermedio", render)
+    queries = mock_cursor.execute.call_count
+    second = await DailyChallengeService.get_rendered("intermedio", render)
+
+    assert first == second
+    assert first[1] == ("texto", "teclado")
+    assert render.call_count == 1
+    assert mock_cursor.execute.call_count == queries
+    assert await DailyChallengeService.get_rendered("avanzado", render) is None
+
+
+@pytest.mark.asyncio
+async def test_rendered_challenge_is_dropped_when_the_exercise_changes(mock_cursor):
+    await ExerciseCatalog.load()
+    mock_cursor.fetchall.return_value = [("intermedio", 2)]
+    render = MagicMock(side_effect=lambda challenge, exercise: (exercise.pregunta, exercise.opciones))
+    await DailyChallengeService.get_rendered("intermedio", render)
+
+    # Reparación en el sitio de las opciones del ejercicio del reto
+    mock_cursor.fetchall.return_value = [ROWS[0], ROWS[1][:4] + ('["a", "c"]',) + ROWS[1][5:]]
+    await ExerciseCatalog.load()
+    _, rendered = await DailyChallengeService.get_rendered("intermedio", render)
+
+    assert render.call_count == 2
+    assert rendered[1] == ["a", "c"]
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from psycopg2 import pool
+
+from src.services import database
+from src.services.database import POOL_MAX_CONN, DatabaseService
+
+
+class _BoundedPool:
+    """Pool falso que, como el de psycopg2, falla en vez de esperar cuando se agota"""
+
+    def __init__(self, maxconn: int):
+        self.maxconn = maxconn
+        self.in_use = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def getconn(self):
+        with self._lock:
+            if self.in_use >= self.maxconn:
+                raise pool.PoolError("connection pool exhausted")
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+        return MagicMock()
+
+    def putconn(self, conn):
+        with self._lock:
+            self.in_use -= 1
+
+
+@pytest.mark.asyncio
+async def test_threaded_fallback_waits_instead_of_exhausting_the_pool():
+    fake_pool = _BoundedPool(POOL_MAX_CONN)
+
+    async def query():
+        async with DatabaseService.get_async_cursor() as cursor:
+            await asyncio.sleep(0.01)  # la conexión se retiene entre awaits
+            await cursor.execute("SELECT 1")
+
+    with patch.object(DatabaseService, "_connection_pool", fake_pool), \
+            patch.object(DatabaseService, "_thread_slots", None):
+        await asyncio.gather(*(query() for _ in range(15)))
+
+    assert fake_pool.in_use == 0
+    assert fake_pool.peak < POOL_MAX_CONN  # quedan conexiones para get_cursor síncrono
+
+
+@pytest.mark.asyncio
+async def test_async_pool_path_yields_a_cursor_inside_one_connection():
+    cursor = AsyncMock()
+
+    @asynccontextmanager
+    async def cursor_cm():
+        yield cursor
+
+    conn = MagicMock()
+    conn.cursor = cursor_cm
+
+    @asynccontextmanager
+    async def connection():
+        yield conn
+
+    async_pool = MagicMock()
+    async_pool.connection = connection
+
+    with patch.object(DatabaseService, "_async_pool", async_pool):
+        async with DatabaseService.get_async_cursor() as yielded:
+            await yielded.execute("SELECT 1")
+
+    cursor.execute.assert_awaited_once_with("SELECT 1")
+
+
+@pytest.mark.asyncio
+async def test_initialize_async_uses_psycopg3_pool_with_timed_cursor(monkeypatch):
+    pytest.importorskip("psycopg_pool")
+    for name, value in {"DB_HOST": "localhost", "DB_PORT": "5432", "DB_NAME": "test",
+                        "DB_USER": "test", "DB_PASSWORD": "test"}.items():
+        monkeypatch.setenv(name, value)
+
+    created = MagicMock()
+    created.open = AsyncMock()
+    created.close = AsyncMock()
+    with patch.object(database, "AsyncConnectionPool", return_value=created) as pool_class:
+        await DatabaseService.initialize_async()
+        try:
+            kwargs = pool_class.call_args.kwargs
+            assert kwargs["kwargs"]["cursor_factory"] is database._TimedAsyncCursor
+            assert kwargs["max_size"] == POOL_MAX_CONN
+            assert issubclass(database._TimedAsyncCursor, database.AsyncCursor)
+            created.open.assert_awaited_once()
+        finally:
+            await DatabaseService.close_async()
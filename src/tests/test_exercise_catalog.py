@@ -0,0 +1,85 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.services.exercise_catalog import ExerciseCatalog
+
+ROWS = [
+    (1, "gramática", "principiante", "¿Pregunta 1?", '["a", "b"]', 0, None),
+    (2, "vocabulario", "principiante", "¿Pregunta 2?", '["a", "b"]', 1, None),
+    (3, "gramática", "intermedio", "¿Pregunta 3?", '["a", "b"]', 0, None),
+]
+
+
+@pytest.fixture
+def loaded_catalog():
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = ROWS
+    mock_cursor.fetchone.return_value = (3, "a1")
+    with patch("src.services.database.DatabaseService.get_cursor") as mock_get_cursor:
+        mock_get_cursor.return_value.__enter__.return_value = mock_cursor
+        yield mock_cursor
+
+
+@pytest.mark.asyncio
+async def test_load_indexes_by_level(loaded_catalog):
+    await ExerciseCatalog.load()
+
+    assert ExerciseCatalog.count("principiante") == 2
+    assert ExerciseCatalog.count("intermedio") == 1
+    assert ExerciseCatalog.count("avanzado") == 0
+    assert ExerciseCatalog.get(3).pregunta == "¿Pregunta 3?"
+
+
+@pytest.mark.asyncio
+async def test_pick_random_skips_excluded(loaded_catalog):
+    await ExerciseCatalog.load()
+
+    for _ in range(20):
+        assert ExerciseCatalog.pick_random("principiante", excluded={1}).id == 2
+    assert ExerciseCatalog.pick_random("principiante", excluded={1, 2}) is None
+    assert ExerciseCatalog.pick_random("principiante", categoria="gramática").id == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_if_changed_only_reloads_on_new_fingerprint(loaded_catalog):
+    await ExerciseCatalog.load()
+
+    assert await ExerciseCatalog.refresh_if_changed() is False
+    # Misma cantidad de filas, contenido editado
+    loaded_catalog.fetchone.return_value = (3, "b2")
+    assert await ExerciseCatalog.refresh_if_changed() is True
+
+
+@pytest.mark.asyncio
+async def test_reload_invalidates_rendered_exercises_that_changed(loaded_catalog):
+    from src.handlers.exercises import get_answer_keyboard
+    from src.services.render_cache import RenderCache
+
+    RenderCache.clear()
+    await ExerciseCatalog.load()
+    keyboard_1 = get_answer_keyboard(ExerciseCatalog.get(1).to_dict())
+    keyboard_2 = get_answer_keyboard(ExerciseCatalog.get(2).to_dict())
+    assert get_answer_keyboard(ExerciseCatalog.get(1).to_dict()) is keyboard_1
+
+    changed = (2, "vocabulario", "principiante", "¿Pregunta 2?", '["c", "d"]', 1, None)
+    loaded_catalog.fetchall.return_value = [ROWS[0], changed]
+    await ExerciseCatalog.load()
+
+    assert get_answer_keyboard(ExerciseCatalog.get(1).to_dict()) is keyboard_1
+    new_keyboard_2 = get_answer_keyboard(ExerciseCatalog.get(2).to_dict())
+    assert new_keyboard_2 is not keyboard_2
+    assert new_keyboard_2.keyboard[0][0].text == "c"
+    RenderCache.clear()
+
+
+@pytest.mark.asyncio
+async def test_pick_best_follows_level_preference(loaded_catalog):
+    from src.utils.bitset import Bitset
+
+    await ExerciseCatalog.load()
+
+    levels = ["principiante", "intermedio", "avanzado"]
+    assert ExerciseCatalog.pick_best(levels, excluded=Bitset([1]))[1] == "principiante"
+    exercise, nivel = ExerciseCatalog.pick_best(levels, excluded=Bitset([1, 2]))
+    assert (exercise.id, nivel) == (3, "intermedio")
+    assert ExerciseCatalog.pick_best(levels, excluded={1, 2, 3}) == (None, None)
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Chat, Message, User
+
+from src.handlers.exercises import (
+    LOAD_ERROR_TEXT, ExerciseStates, handle_exercise_answer, reset_on_failure, router, setup_exercise_state
+)
+from src.models.exercise import Exercise
+from src.services.exercise_catalog import ExerciseCatalog
+
+EXERCISE = {"id": 7, "opciones": ["a", "b"], "respuesta_correcta": 0}
+
+
+def _answer_handler():
+    return next(h for h in router.message.handlers if h.callback is handle_exercise_answer)
+
+
+def _message(text: str) -> Message:
+    return Message(message_id=1, date=datetime.now(), chat=Chat(id=1, type="private"),
+                   from_user=User(id=1, is_bot=False, first_name="Ana"), text=text)
+
+
+@pytest.mark.asyncio
+async def test_exercise_state_is_a_real_fsm_state():
+    state = FSMContext(MemoryStorage(), StorageKey(bot_id=42, chat_id=1, user_id=1))
+    await setup_exercise_state(state, dict(EXERCISE))
+
+    assert await state.get_state() == ExerciseStates.waiting_answer.state
+    assert await state.get_data() == {"exercise_id": 7, "attempts": 0}
+
+
+@pytest.mark.asyncio
+async def test_other_messages_are_rejected_before_loading_state_data():
+    state = AsyncMock(spec=FSMContext)
+    handler = _answer_handler()
+
+    matched, _ = await handler.check(_message("hola"), raw_state=None, state=state)
+    assert not matched
+    state.get_data.assert_not_awaited()
+
+    matched, _ = await handler.check(_message("a"), raw_state=ExerciseStates.waiting_answer.state, state=state)
+    assert matched
+
+
+@pytest.mark.asyncio
+async def test_failed_send_resets_state_and_warns_user():
+    state = FSMContext(MemoryStorage(), StorageKey(bot_id=42, chat_id=1, user_id=1))
+    await setup_exercise_state(state, dict(EXERCISE))
+    message = MagicMock()
+    message.answer = AsyncMock()
+
+    future = asyncio.get_running_loop().create_future()
+    reset_on_failure(future, message, LOAD_ERROR_TEXT, state, EXERCISE["id"])
+    future.set_exception(RuntimeError("Bad Request"))
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    assert await state.get_state() is None
+    assert message.answer.await_args.args[0] == LOAD_ERROR_TEXT
+
+
+def _mock_message(text: str) -> MagicMock:
+    message = MagicMock()
+    message.text = text
+    message.answer = AsyncMock()
+    return message
+
+
+@pytest.mark.asyncio
+async def test_invalid_option_keeps_the_exercise_and_lists_options():
+    state = FSMContext(MemoryStorage(), StorageKey(bot_id=42, chat_id=1, user_id=1))
+    await setup_exercise_state(state, dict(EXERCISE))
+    message = _mock_message("c")
+
+    exercise = Exercise(7, "gramática", "principiante", "¿Pregunta?", ["a", "b"], 0, None)
+    with patch.object(ExerciseCatalog, "get", return_value=exercise):
+        await handle_exercise_answer(message, state)
+
+    assert await state.get_state() == ExerciseStates.waiting_answer.state
+    assert message.answer.await_args.args[0].startswith("❌ Opción no válida")
+
+
+@pytest.mark.asyncio
+async def test_missing_exercise_ends_the_exercise():
+    state = FSMContext(MemoryStorage(), StorageKey(bot_id=42, chat_id=1, user_id=1))
+    await setup_exercise_state(state, dict(EXERCISE))
+    message = _mock_message("a")
+
+    with patch.object(ExerciseCatalog, "get", return_value=None):
+        await handle_exercise_answer(message, state)
+
+    assert await state.get_state() is None
+    assert message.answer.await_args.args[0].startswith("❌ Este ejercicio ya no está disponible")
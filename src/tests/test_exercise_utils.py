@@ -0,0 +1,48 @@
+import io
+import json
+
+import pytest
+
+from src.utils.exercise_utils import (
+    ExerciseJSONError, _iter_stream, iter_exercises, load_exercises_from_json, validate_exercises_json
+)
+from src.utils.json_stream import JSONStream
+
+EXERCISES = {
+    "principiante": {
+        "gramática": [
+            {"pregunta": "¿Ser para 'él'?", "opciones": ["Soy", "Es"], "respuesta": 1},
+            {"pregunta": "Sin respuesta válida", "opciones": ["a"], "respuesta": 3},
+        ],
+        "vocabulario": [
+            {"pregunta": "¿Plural de 'libro'?", "opciones": ["Libros", "Libres"], "respuesta": 12345},
+            {"pregunta": "¿Plural de 'mesa'?", "opciones": ["Mesas", "Meses"], "respuesta": 0},
+        ],
+    }
+}
+
+
+def test_stream_yields_valid_exercises_across_chunk_boundaries():
+    errors = []
+    text = json.dumps(EXERCISES, ensure_ascii=False, indent=2)
+
+    records = list(_iter_stream(JSONStream(io.StringIO(text), chunk_size=5), errors))
+
+    assert [(categoria, i) for _, categoria, i, _ in records] == [("gramática", 0), ("vocabulario", 1)]
+    assert len(errors) == 2
+    assert errors[0].startswith("Respuesta inválida en principiante/gramática[1] (línea 12)")
+    assert errors[1].startswith("Respuesta inválida en principiante/vocabulario[0] (línea 21)")
+
+
+def test_file_helpers_parse_once_and_report_positions(tmp_path):
+    path = tmp_path / "ejercicios.json"
+    path.write_text(json.dumps({"principiante": {"gramática": EXERCISES["principiante"]["gramática"][:1]}}),
+                    encoding="utf-8")
+    assert validate_exercises_json(str(path)) == []
+    assert load_exercises_from_json(str(path))["principiante"]["gramática"][0]["respuesta"] == 1
+
+    path.write_text('{"principiante": {"gramática": [\n{"pregunta": "a",\n]}}', encoding="utf-8")
+    with pytest.raises(ExerciseJSONError) as error:
+        list(iter_exercises(str(path)))
+    assert "(línea 3)" in error.value.errors[-1]
+    assert validate_exercises_json(str(tmp_path / "no_existe.json"))[0].startswith("Archivo no encontrado")
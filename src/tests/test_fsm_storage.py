@@ -0,0 +1,59 @@
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+
+from src.services.fsm_storage import SQLiteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=3)
+
+
+class DemoStates(StatesGroup):
+    waiting = State()
+
+
+@pytest.mark.asyncio
+async def test_state_and_data_survive_restart(tmp_path):
+    path = str(tmp_path / "fsm.sqlite3")
+    storage = SQLiteStorage(path=path)
+    await storage.set_state(KEY, DemoStates.waiting)
+    await storage.set_data(KEY, {"exercise_id": 5, "attempts": 1})
+    await storage.close()
+
+    reopened = SQLiteStorage(path=path)
+    assert await reopened.get_state(KEY) == DemoStates.waiting.state
+    assert await reopened.get_data(KEY) == {"exercise_id": 5, "attempts": 1}
+    assert await reopened.count_in_state(DemoStates.waiting) == 1
+
+    await reopened.set_state(KEY, None)
+    await reopened.set_data(KEY, {})
+    assert await reopened.get_state(KEY) is None
+    assert await reopened.get_data(KEY) == {}
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_ignored_and_purged(tmp_path):
+    storage = SQLiteStorage(path=str(tmp_path / "fsm.sqlite3"), ttl=-1)
+    await storage.set_data(KEY, {"exercise_id": 5})
+
+    assert await storage.get_data(KEY) == {}
+    assert await storage.purge_expired() == 1
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_writing_one_column_does_not_revive_expired_other_column(tmp_path):
+    storage = SQLiteStorage(path=str(tmp_path / "fsm.sqlite3"), ttl=-1)
+    await storage.set_state(KEY, DemoStates.waiting)
+    await storage.set_data(KEY, {"exercise_id": 5})
+
+    storage.ttl = 60
+    await storage.set_data(KEY, {"exercise_id": 6})
+    assert await storage.get_state(KEY) is None
+    assert await storage.get_data(KEY) == {"exercise_id": 6}
+
+    # Con la fila vigente la otra columna se conserva
+    await storage.set_state(KEY, DemoStates.waiting)
+    await storage.set_data(KEY, {"exercise_id": 7})
+    assert await storage.get_state(KEY) == DemoStates.waiting.state
+    await storage.close()
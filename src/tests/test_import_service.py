@@ -0,0 +1,36 @@
+from unittest.mock import MagicMock, patch
+
+from src.services.import_service import ImportService
+from src.utils.hashing import curiosity_hash
+
+CURIOSIDADES = {
+    "curiosidades": [
+        {"categoria": "Historia", "texto": "El español tiene más de 90.000 palabras."},
+        {"categoria": "Historia", "texto": "El español tiene más de 90.000 palabras."},
+        {"categoria": "Gramática", "texto": "La ñ es exclusiva del español."},
+        {"categoria": "Léxico", "texto": "Hay palabras con todas las vocales, como 'murciélago'."},
+    ]
+}
+
+
+@patch("src.services.import_service.execute_values")
+@patch("src.services.database.DatabaseService.get_cursor")
+def test_curiosity_import_applies_only_the_diff(mock_get_cursor, mock_execute_values):
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [
+        (1, "Historia", "El español tiene más de 90.000 palabras.", None, True),
+        (2, "Gramática", "La ñ es exclusiva del español.", curiosity_hash("Gramática", "La ñ es exclusiva del español."), False),
+        (3, "Otra", "Ya no está en el JSON.", curiosity_hash("Otra", "Ya no está en el JSON."), True),
+    ]
+    mock_get_cursor.return_value.__enter__.return_value = cursor
+
+    stats = ImportService.import_curiosities_from_json(CURIOSIDADES)
+
+    assert (stats["inserted"], stats["updated"], stats["deactivated"], stats["unchanged"]) == (1, 1, 1, 1)
+    assert stats["skipped"] == 1
+
+    backfill, inserted = (call.args[2] for call in mock_execute_values.call_args_list)
+    assert backfill == [(1, curiosity_hash("Historia", "El español tiene más de 90.000 palabras."))]
+    assert [row[0] for row in inserted] == ["Léxico"]
+    cursor.execute.assert_any_call("UPDATE curiosidades SET activo = TRUE WHERE id = ANY(%s)", ([2],))
+    cursor.execute.assert_any_call("UPDATE curiosidades SET activo = FALSE WHERE id = ANY(%s)", ([3],))
@@ -0,0 +1,23 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_load_harness_runs_the_exercise_loop():
+    # Se ejecuta en otro proceso porque los routers solo pueden incluirse en un Dispatcher
+    result = subprocess.run(
+        [sys.executable, "-m", "src.tests.load_harness", "--users", "3", "--rounds", "2",
+         "--db-latency-ms", "0", "--json"],
+        cwd=ROOT, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report["error_replies"] == 0
+    assert report["latency"]["ejercicio"]["count"] == 3
+    assert report["latency"]["next_exercise"]["count"] == 6
+    assert report["latency"]["answer"]["count"] >= 6
+    assert report["api_calls"]["SendMessage"] == report["updates"]
@@ -0,0 +1,39 @@
+import pytest
+from unittest.mock import MagicMock
+
+from src.middlewares.metrics import HandlerMetricsMiddleware
+from src.utils.metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo", ["handler"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, handler="a")
+    histogram.observe(0.5, handler="a")
+    histogram.observe(5, handler="a")
+
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{handler="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{handler="a",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{handler="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{handler="a"} 3' in text
+    assert histogram.quantile(0.5, handler="a") == 1.0
+
+
+@pytest.mark.asyncio
+async def test_handler_middleware_counts_errors():
+    from src.utils.metrics import HANDLER_DURATION, HANDLER_ERRORS
+
+    async def broken_handler(event, data):
+        raise RuntimeError("boom")
+
+    handler_object = MagicMock()
+    handler_object.callback = broken_handler
+    name = f"{__name__}.broken_handler"
+
+    with pytest.raises(RuntimeError):
+        await HandlerMetricsMiddleware()(broken_handler, MagicMock(), {"handler": handler_object})
+
+    assert HANDLER_ERRORS.value(handler=name) == 1
+    assert HANDLER_DURATION.snapshot()[(name,)][0] == 1
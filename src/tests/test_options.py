@@ -0,0 +1,23 @@
+import pytest
+
+from src.utils.options import OptionsError, is_canonical, normalize_options, serialize_options
+
+
+@pytest.mark.parametrize("raw, expected", [
+    (["Soy", "Eres"], ["Soy", "Eres"]),
+    ('["[Soy", "Eres", "Es", "Somos]"]', ["Soy", "Eres", "Es", "Somos"]),
+    (["[Soy", " Eres ", "Somos]"], ["Soy", "Eres", "Somos"]),
+    ('{Perro,"Pájaro azul",Gato}', ["Perro", "Pájaro azul", "Gato"]),
+    ("('el', 'la')", ["el", "la"]),
+    ("el, la", ["el", "la"]),
+])
+def test_normalize_options_accepts_every_stored_format(raw, expected):
+    assert normalize_options(raw) == expected
+    assert is_canonical(expected)
+
+
+def test_invalid_options_are_rejected():
+    with pytest.raises(OptionsError):
+        normalize_options("{}")
+    assert not is_canonical('["a", "b"]')
+    assert serialize_options(["Pájaro"]) == '["Pájaro"]'
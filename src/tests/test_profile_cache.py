@@ -0,0 +1,45 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.models.user_profile import UserProfile
+from src.services.profile_cache import UserProfileCache, _PROCESS_TOKEN
+from src.services.user_service import UserService
+
+
+@pytest.fixture
+def mock_cursor():
+    UserProfileCache.clear()
+    cursor = MagicMock()
+    with patch("src.services.database.DatabaseService.get_cursor") as mock_get_cursor:
+        mock_get_cursor.return_value.__enter__.return_value = cursor
+        yield cursor
+    UserProfileCache.clear()
+
+
+@pytest.mark.asyncio
+async def test_user_level_is_read_once_and_written_through(mock_cursor):
+    mock_cursor.fetchone.return_value = ("principiante", "ana")
+
+    assert await UserService.get_user_level(1) == "principiante"
+    assert await UserService.get_user_level(1) == "principiante"
+    assert mock_cursor.execute.call_count == 1
+
+    mock_cursor.rowcount = 1
+    await UserService.set_user_level(1, "avanzado")
+    executed = mock_cursor.execute.call_count
+
+    assert await UserService.get_user_level(1) == "avanzado"
+    assert mock_cursor.execute.call_count == executed
+    assert "pg_notify" in mock_cursor.execute.call_args[0][0]
+
+
+def test_notifications_from_other_processes_invalidate():
+    UserProfileCache.clear()
+    UserProfileCache.set(UserProfile(1, "intermedio", registered=True))
+    UserProfileCache.set(UserProfile(2, "intermedio", registered=True))
+
+    UserProfileCache._handle_notification(f"{_PROCESS_TOKEN}:1")
+    UserProfileCache._handle_notification("otro-proceso:2")
+
+    assert UserProfileCache.get(1) is not None
+    assert UserProfileCache.get(2) is None
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.filters import Command
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.types import Chat, Message, Update, User
+
+from src.middlewares.routing import DuplicateRouteError, RoutingTable, setup_routing_middleware
+
+
+class WaitingStates(StatesGroup):
+    waiting = State()
+
+
+def _update(text: str) -> Update:
+    return Update(update_id=1, message=Message(
+        message_id=1, date=datetime.now(), chat=Chat(id=1, type="private"),
+        from_user=User(id=1, is_bot=False, first_name="Ana"), text=text
+    ))
+
+
+def test_duplicate_keys_are_rejected_at_startup():
+    first, second = Router(), Router()
+
+    @first.callback_query(F.data == "next_exercise")
+    async def first_handler(callback):
+        pass
+
+    @second.callback_query(F.data == "next_exercise")
+    async def second_handler(callback):
+        pass
+
+    dp = Dispatcher()
+    dp.include_routers(first, second)
+    with pytest.raises(DuplicateRouteError):
+        RoutingTable(dp)
+
+
+@pytest.mark.asyncio
+async def test_table_dispatch_respects_state_handlers_registered_before():
+    calls = []
+    states, menu = Router(), Router()
+
+    @states.message(WaitingStates.waiting)
+    async def waiting(message):
+        calls.append("waiting")
+
+    @menu.message(F.text == "📝 Ejercicio")
+    @menu.message(Command("ejercicio"))
+    async def exercise(message):
+        calls.append("exercise")
+
+    dp = Dispatcher()
+    dp.include_routers(states, menu)
+    table = setup_routing_middleware(dp)
+    bot = Bot("42:TEST")
+
+    assert table.lookup("message", _update("/ejercicio extra").message).handler.callback is exercise
+    await dp.feed_update(bot, _update("📝 Ejercicio"))
+    await dp.feed_update(bot, _update("/ejercicio"))
+
+    await dp.storage.set_state(StorageKey(bot_id=42, chat_id=1, user_id=1), WaitingStates.waiting)
+    await dp.feed_update(bot, _update("📝 Ejercicio"))
+
+    assert calls == ["exercise", "exercise", "waiting"]
@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from aiogram.exceptions import TelegramRetryAfter
+
+from src.services.send_queue import SendQueue, PRIORITY_ANSWER, PRIORITY_BROADCAST
+from src.utils.rate_limit import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_allows_burst_then_reports_wait():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+    clock.now = 0.5
+    assert bucket.try_acquire() == 0
+
+
+@pytest.mark.asyncio
+async def test_answers_go_before_broadcasts_and_chat_order_is_kept():
+    sent = []
+
+    async def send(label):
+        sent.append(label)
+        return label
+
+    SendQueue.start()
+    try:
+        # Se encolan todos antes de que el despachador llegue a ejecutarse
+        futures = [await SendQueue.submit(100 + i, lambda i=i: send(f"broadcast-{i}"), PRIORITY_BROADCAST)
+                   for i in range(3)]
+        futures += [await SendQueue.submit(1, lambda i=i: send(f"answer-{i}"), PRIORITY_ANSWER)
+                    for i in range(3)]
+        results = await asyncio.wait_for(asyncio.gather(*futures), timeout=2)
+    finally:
+        await SendQueue.stop()
+
+    assert results == [f"broadcast-{i}" for i in range(3)] + [f"answer-{i}" for i in range(3)]
+    assert sent[0] == "answer-0"
+    assert [label for label in sent if label.startswith("answer")] == ["answer-0", "answer-1", "answer-2"]
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_retried():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise TelegramRetryAfter(method=MagicMock(), message="Flood control", retry_after=0)
+        return "ok"
+
+    SendQueue.start()
+    try:
+        future = await SendQueue.submit(1, flaky)
+        assert await asyncio.wait_for(future, timeout=2) == "ok"
+    finally:
+        await SendQueue.stop()
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_sends_directly_when_not_started():
+    message = MagicMock()
+
+    async def answer(text, **kwargs):
+        return text
+
+    message.answer = answer
+    future = await SendQueue.answer(message, "hola")
+    assert future.done() and future.result() == "hola"
+
+
+@pytest.mark.asyncio
+async def test_failure_hook_runs_only_on_error():
+    errors = []
+
+    async def hook(error):
+        errors.append(str(error))
+
+    async def fail():
+        raise RuntimeError("chat no encontrado")
+
+    async def ok():
+        return "ok"
+
+    SendQueue.start()
+    try:
+        failed = await SendQueue.submit(1, fail)
+        sent = await SendQueue.submit(2, ok)
+        SendQueue.on_failure(failed, hook)
+        SendQueue.on_failure(sent, hook)
+        await asyncio.wait([failed, sent], timeout=2)
+        await asyncio.sleep(0)
+    finally:
+        await SendQueue.stop()
+
+    assert errors == ["chat no encontrado"]
@@ -1,35 +1,59 @@
 import unittest
 import asyncio
+from datetime import datetime
 from unittest.mock import MagicMock, patch
 from src.services.database import DatabaseService
 from src.services.user_service import UserService
+from src.services.exercise_service import ExerciseService
+from src.services.profile_cache import UserProfileCache
+from src.models.user_exercise import UserExercise
 from src.models.exercise import Exercise
 from src.models.curiosity import Curiosity
 
 class TestServices(unittest.TestCase):
     def setUp(self):
-        self.loop = asyncio.get_event_loop()
+        self.loop = asyncio.new_event_loop()
         DatabaseService._connection_pool = MagicMock()
+        UserProfileCache.clear()
+
+    def tearDown(self):
+        self.loop.close()
 
     @patch("src.services.database.DatabaseService.get_cursor")
     def test_user_service_register_user(self, mock_get_cursor):
         mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = None  # el usuario aún no existe
         mock_get_cursor.return_value.__enter__.return_value = mock_cursor
-        UserService.register_user(2006572428, "test_user")
-        mock_cursor.execute.assert_called_once()
-        self.assertIn("INSERT INTO users", mock_cursor.execute.call_args[0][0])
+        self.loop.run_until_complete(UserService.register_user(2006572428, "test_user"))
+        statements = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        self.assertTrue(any("INSERT INTO users" in statement for statement in statements))
+        self.assertTrue(UserProfileCache.get(2006572428).registered)
 
     @patch("src.services.database.DatabaseService.get_cursor")
     def test_user_service_get_user_level(self, mock_get_cursor):
         mock_cursor = MagicMock()
-        mock_cursor.fetchone.return_value = ["intermedio"]
+        mock_cursor.fetchone.return_value = ["intermedio", "test_user"]
         mock_get_cursor.return_value.__enter__.return_value = mock_cursor
-        level = UserService.get_user_level(2006572428)
+        level = self.loop.run_until_complete(UserService.get_user_level(2006572428))
         self.assertEqual(level, "intermedio")
+        self.assertEqual(UserProfileCache.get(2006572428).username, "test_user")
         mock_cursor.execute.assert_called_once_with(
-            "SELECT level FROM users WHERE user_id = %s", (2006572428,)
+            "SELECT level, username FROM users WHERE user_id = %s", (2006572428,)
         )
 
+    @patch("src.services.database.DatabaseService.get_cursor")
+    def test_user_service_register_existing_user_caches_profile(self, mock_get_cursor):
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = ("avanzado", "test_user")
+        mock_get_cursor.return_value.__enter__.return_value = mock_cursor
+        self.loop.run_until_complete(UserService.register_user(2006572428, "test_user"))
+        self.loop.run_until_complete(UserService.register_user(2006572428, "test_user"))
+
+        # El segundo registro se resuelve desde la caché
+        mock_cursor.execute.assert_called_once()
+        profile = UserProfileCache.get(2006572428)
+        self.assertEqual((profile.level, profile.username, profile.registered), ("avanzado", "test_user", True))
+
     @patch("src.services.database.DatabaseService.get_cursor")
     def test_database_service_get_random_exercise(self, mock_get_cursor):
         mock_cursor = MagicMock()
@@ -52,8 +76,45 @@ class TestServices(unittest.TestCase):
         self.assertEqual(curiosity.id, 1)
         self.assertEqual(curiosity.categoria, "Cultura")
 
+    @patch("src.services.database.DatabaseService.get_cursor")
+    def test_exercise_service_mark_exercise_completed_upsert(self, mock_get_cursor):
+        completed_at = datetime(2025, 9, 10, 15, 0)
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [(2006572428, 0, 0, {}, {}, None, [])]
+        mock_cursor.fetchone.return_value = (
+            10, 2006572428, 1, completed_at, "principiante", "gramática", True, 1, True, None
+        )
+        mock_get_cursor.return_value.__enter__.return_value = mock_cursor
+
+        record = self.loop.run_until_complete(ExerciseService.mark_exercise_completed(
+            2006572428, 1, "principiante", "gramática", is_correct=True, attempts=1
+        ))
+
+        self.assertIsInstance(record, UserExercise)
+        self.assertEqual(record.exercise_id, 1)
+        self.assertTrue(record.is_correct)
+        # user_stats se bloquea antes del upsert
+        queries = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        self.assertIn("FOR UPDATE", queries[1])
+        self.assertIn("ON CONFLICT (user_id, exercise_id) DO UPDATE", queries[2])
+
+    def test_database_service_async_cursor_rollback(self):
+        conn = DatabaseService._connection_pool.getconn.return_value
+
+        async def failing_query():
+            async with DatabaseService.get_async_cursor() as cursor:
+                await cursor.execute("SELECT 1")
+                raise RuntimeError("fallo")
+
+        with self.assertRaises(RuntimeError):
+            self.loop.run_until_complete(failing_query())
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+        DatabaseService._connection_pool.putconn.assert_called_once_with(conn)
+
     def test_all(self):
         self.test_user_service_register_user()
+        UserProfileCache.clear()  # el registro deja el perfil en caché
         self.test_user_service_get_user_level()
         self.test_database_service_get_random_exercise()
         self.test_database_service_get_random_curiosity()
@@ -0,0 +1,70 @@
+import pytest
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+from src.models.user_stats import UserStats
+from src.services.stats_service import StatsService
+
+TODAY = date(2025, 9, 12)
+LAST_PRACTICE = datetime(2025, 9, 10, 15, 0)
+
+
+def test_apply_completion_counts_new_and_updated_rows():
+    summary = UserStats(user_id=7)
+    summary.apply_completion("principiante", "gramática", False, datetime(2025, 9, 1, 10, 0))
+    summary.apply_completion("principiante", "vocabulario", True, datetime(2025, 9, 10, 9, 0))
+    # El mismo ejercicio respondido de nuevo, ahora correctamente
+    summary.apply_completion("principiante", "gramática", True, LAST_PRACTICE, previous_is_correct=False)
+
+    assert summary.total == 2
+    assert summary.correct == 2
+    assert summary.level_counts == {"principiante": [2, 2]}
+    assert summary.category_counts == {"gramática": [1, 1], "vocabulario": [1, 1]}
+    assert summary.last_practice == LAST_PRACTICE
+    assert summary.recent_days == [date(2025, 9, 10)]
+    assert summary.streak_days(TODAY) == 1
+    assert summary.streak_days(date(2025, 9, 30)) == 0
+
+
+@pytest.mark.asyncio
+async def test_get_stats_reads_summary_row_once():
+    StatsService.clear()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchone.return_value = (
+        TODAY, "intermedio", 4, 2,
+        {"principiante": [3, 2], "intermedio": [1, 0]},
+        {"gramática": [2, 1], "vocabulario": [2, 1]},
+        LAST_PRACTICE, [date(2025, 9, 10), date(2025, 9, 9)]
+    )
+
+    with patch("src.services.database.DatabaseService.get_cursor") as mock_get_cursor:
+        mock_get_cursor.return_value.__enter__.return_value = mock_cursor
+        stats = await StatsService.get_stats(7)
+        cached = await StatsService.get_stats(7)
+
+    assert cached is stats
+    mock_cursor.execute.assert_called_once()
+    assert stats["level"] == "intermedio"
+    assert stats["exercises"] == 2
+    assert stats["total_exercises"] == 4
+    assert stats["streak_days"] == 2
+    assert stats["last_practice"] == LAST_PRACTICE
+    assert stats["exercises_by_level"] == {"principiante": 2}
+    assert stats["exercises_by_category"] == {"gramática": 1, "vocabulario": 1}
+    assert stats["levels_count"] == 2
+    assert stats["categories_count"] == 2
+
+    StatsService.invalidate(7)
+    assert 7 not in StatsService._cache
+
+
+def test_updated_row_without_previous_state_is_not_counted_twice():
+    # Fila nueva, fila actualizada y actualización cuyo estado anterior no se pudo leer
+    assert StatsService.previous_correctness(1, True, None, True) is None
+    assert StatsService.previous_correctness(1, False, False, True) is False
+    assert StatsService.previous_correctness(1, False, None, True) is True
+
+    summary = UserStats(user_id=1, total=1, correct=1)
+    summary.apply_completion("principiante", "gramática", True, LAST_PRACTICE,
+                             StatsService.previous_correctness(1, False, None, True))
+    assert (summary.total, summary.correct) == (1, 1)
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram.types import CallbackQuery, User
+
+from src.middlewares.throttling import ThrottlingMiddleware
+
+USER = User(id=1, is_bot=False, first_name="Ana")
+
+
+def _callback(data: str) -> CallbackQuery:
+    callback = MagicMock(spec=CallbackQuery)
+    callback.data = data
+    callback.answer = AsyncMock()
+    return callback
+
+
+@pytest.mark.asyncio
+async def test_duplicate_taps_are_answered_without_reaching_the_handler():
+    now = [0.0]
+    middleware = ThrottlingMiddleware(rate=100, burst=100, duplicate_window=1.0, clock=lambda: now[0])
+    handler = AsyncMock(return_value="ok")
+
+    first, second = _callback("next_exercise"), _callback("next_exercise")
+    assert await middleware(handler, first, {"event_from_user": USER}) == "ok"
+    assert await middleware(handler, second, {"event_from_user": USER}) is None
+    second.answer.assert_awaited_once()
+
+    now[0] = 1.5
+    await middleware(handler, _callback("next_exercise"), {"event_from_user": USER})
+    assert handler.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_updates_of_a_user_are_serialized_and_rate_limited():
+    now = [0.0]
+    middleware = ThrottlingMiddleware(rate=1, burst=2, duplicate_window=0, clock=lambda: now[0])
+    running = []
+    overlaps = []
+
+    async def handler(event, data):
+        overlaps.append(bool(running))
+        running.append(event)
+        await asyncio.sleep(0.01)
+        running.remove(event)
+
+    events = [_callback("a"), _callback("b"), _callback("c")]
+    await asyncio.gather(*(middleware(handler, event, {"event_from_user": USER}) for event in events))
+
+    assert overlaps == [False, False]
+    events[2].answer.assert_awaited_once()
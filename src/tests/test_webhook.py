@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from aiohttp.test_utils import TestServer
+from aiogram import Bot
+
+from src.web_handlers.replay import replay_updates
+from src.web_handlers.webhook import UPDATE_POOL_KEY, create_webhook_app
+
+
+class FakeDispatcher:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.processed = []
+
+    async def feed_update(self, bot, update):
+        await asyncio.sleep(self.delay)
+        self.processed.append(update.update_id)
+
+
+def make_update(update_id):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1234567890,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+            "text": "📚 Curiosidad"
+        }
+    }
+
+
+@pytest.mark.asyncio
+async def test_replayed_updates_are_processed_by_the_pool():
+    dispatcher = FakeDispatcher(delay=0.01)
+    app = create_webhook_app(dispatcher, Bot(token="42:fake"), secret_token="s3cret", workers=4)
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/webhook"))
+        result = await replay_updates([make_update(i) for i in range(20)], url, concurrency=5,
+                                      secret_token="s3cret")
+        rejected = await replay_updates([make_update(99)], url)
+        await app[UPDATE_POOL_KEY].stop()
+
+    assert result["statuses"] == {200: 20}
+    assert rejected["statuses"] == {401: 1}
+    assert sorted(dispatcher.processed) == list(range(20))
+
+
+@pytest.mark.asyncio
+async def test_full_queue_answers_503():
+    dispatcher = FakeDispatcher(delay=0.3)
+    app = create_webhook_app(dispatcher, Bot(token="42:fake"), workers=1, queue_size=1)
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/webhook"))
+        result = await replay_updates([make_update(i) for i in range(5)], url, concurrency=1)
+
+    assert result["statuses"][200] >= 1
+    assert result["statuses"][503] >= 1
@@ -0,0 +1,51 @@
+# src/utils/bitset.py
+from typing import Iterable, Iterator
+
+
+class Bitset:
+    """
+    Conjunto de enteros no negativos guardado como un único entero de Python (un bit por id).
+    Ocupa ~1 bit por id posible y permite intersecciones y conteos con operaciones de bits.
+    """
+    __slots__ = ("bits",)
+
+    def __init__(self, values: Iterable[int] = ()):
+        values = list(values)
+        if not values:
+            self.bits = 0
+            return
+
+        # Construir en un bytearray y convertir una sola vez: O(n) en lugar de O(n²)
+        buffer = bytearray(max(values) // 8 + 1)
+        for value in values:
+            buffer[value >> 3] |= 1 << (value & 7)
+        self.bits = int.from_bytes(buffer, "little")
+
+    @classmethod
+    def from_int(cls, bits: int) -> "Bitset":
+        bitset = cls()
+        bitset.bits = bits
+        return bitset
+
+    def add(self, value: int) -> None:
+        self.bits |= 1 << value
+
+    def discard(self, value: int) -> None:
+        self.bits &= ~(1 << value)
+
+    def count_in(self, mask: int) -> int:
+        """Número de elementos del conjunto que también están en la máscara"""
+        return (self.bits & mask).bit_count()
+
+    def __contains__(self, value: int) -> bool:
+        return value >= 0 and (self.bits >> value) & 1 == 1
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __iter__(self) -> Iterator[int]:
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
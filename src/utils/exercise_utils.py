@@ -1,86 +1,184 @@
 # src/utils/exercise_utils.py
-import json
-from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from src.utils.json_stream import JSONStream, JSONStreamError
 
+VALID_LEVELS = ["principiante", "intermedio", "avanzado"]
 
-def validate_exercises_json(json_path: str) -> List[str]:
-    """
-    Valida la estructura y contenido de un archivo JSON de ejercicios.
+# (nivel, categoría, posición en la categoría, ejercicio)
+ExerciseRecord = Tuple[str, str, int, Dict[str, Any]]
 
-    Args:
-        json_path (str): Ruta al archivo JSON
 
-    Returns:
-        List[str]: Lista de errores encontrados, vacía si no hay errores
-    """
+class ExerciseJSONError(ValueError):
+    """El JSON de ejercicios no es válido; errors contiene todos los errores encontrados"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("Errores en el JSON:\n" + "\n".join(errors))
+        self.errors = errors
+
+
+def _exercise_errors(ejercicio: Any, position: str) -> List[str]:
+    """Errores de un ejercicio concreto; position es nivel/categoría[i] (línea N)"""
+    if not isinstance(ejercicio, dict):
+        return [f"El ejercicio debe ser un objeto en {position}"]
+
     errors = []
+    # Verificar campos obligatorios
+    if "pregunta" not in ejercicio:
+        errors.append(f"Ejercicio sin pregunta en {position}")
 
-    try:
-        with open(json_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-    except json.JSONDecodeError as e:
-        return [f"Error de formato JSON: {str(e)}"]
-    except FileNotFoundError:
-        return [f"Archivo no encontrado: {json_path}"]
-    except Exception as e:
-        return [f"Error al leer el archivo: {str(e)}"]
+    if "opciones" not in ejercicio:
+        errors.append(f"Ejercicio sin opciones en {position}")
 
-    # Verificar estructura básica
-    if not isinstance(data, dict):
-        errors.append("El JSON debe ser un objeto con niveles (principiante, intermedio, avanzado)")
-        return errors
+    if "respuesta" not in ejercicio:
+        errors.append(f"Ejercicio sin respuesta en {position}")
 
-    # Verificar niveles
-    valid_levels = ["principiante", "intermedio", "avanzado"]
-    for nivel in data.keys():
-        if nivel not in valid_levels:
-            errors.append(f"Nivel inválido: {nivel}. Debe ser uno de: {', '.join(valid_levels)}")
+    # Verificar tipos de datos
+    if "pregunta" in ejercicio and not isinstance(ejercicio["pregunta"], str):
+        errors.append(f"Pregunta debe ser texto en {position}")
 
-    for nivel, categorias in data.items():
-        if not isinstance(categorias, dict):
-            errors.append(f"El nivel '{nivel}' debe contener categorías")
-            continue
+    opciones_ok = isinstance(ejercicio.get("opciones"), list) and all(
+        isinstance(op, str) for op in ejercicio["opciones"]
+    )
+    if "opciones" in ejercicio and not opciones_ok:
+        errors.append(f"Opciones debe ser una lista de textos en {position}")
 
-        for categoria, ejercicios in categorias.items():
-            if not isinstance(ejercicios, list):
-                errors.append(f"La categoría '{categoria}' en nivel '{nivel}' debe ser una lista de ejercicios")
-                continue
+    respuesta_ok = isinstance(ejercicio.get("respuesta"), int)
+    if "respuesta" in ejercicio and not respuesta_ok:
+        errors.append(f"Respuesta debe ser un número entero en {position}")
+
+    # Verificar que la respuesta sea válida
+    if opciones_ok and respuesta_ok:
+        if ejercicio["respuesta"] < 0 or ejercicio["respuesta"] >= len(ejercicio["opciones"]):
+            errors.append(
+                f"Respuesta inválida en {position}: {ejercicio['respuesta']} "
+                f"(debe estar entre 0 y {len(ejercicio['opciones']) - 1})")
+
+    return errors
 
-            for i, ejercicio in enumerate(ejercicios):
-                # Verificar campos obligatorios
-                if "pregunta" not in ejercicio:
-                    errors.append(f"Ejercicio sin pregunta en {nivel}/{categoria}[{i}]")
 
-                if "opciones" not in ejercicio:
-                    errors.append(f"Ejercicio sin opciones en {nivel}/{categoria}[{i}]")
+def _iter_stream(stream: JSONStream, errors: List[str]) -> Iterator[ExerciseRecord]:
+    # Verificar estructura básica
+    if stream.peek() != "{":
+        errors.append("El JSON debe ser un objeto con niveles (principiante, intermedio, avanzado)")
+        return
+    stream.expect("{")
+    if stream.peek() == "}":
+        stream.expect("}")
+        return
+
+    while True:
+        nivel = stream.read_key()
+        if nivel not in VALID_LEVELS:
+            errors.append(f"Nivel inválido: {nivel}. Debe ser uno de: {', '.join(VALID_LEVELS)}")
+
+        if stream.peek() != "{":
+            errors.append(f"El nivel '{nivel}' debe contener categorías")
+            stream.read_value()
+        else:
+            yield from _iter_level(stream, nivel, errors)
+
+        if stream.expect(",", "}") == "}":
+            break
+
+    if not stream.at_end():
+        raise stream.error("Contenido adicional tras el objeto principal")
+
+
+def _iter_level(stream: JSONStream, nivel: str, errors: List[str]) -> Iterator[ExerciseRecord]:
+    stream.expect("{")
+    if stream.peek() == "}":
+        stream.expect("}")
+        return
+
+    while True:
+        categoria = stream.read_key()
+        if stream.peek() != "[":
+            errors.append(f"La categoría '{categoria}' en nivel '{nivel}' debe ser una lista de ejercicios")
+            stream.read_value()
+        else:
+            yield from _iter_category(stream, nivel, categoria, errors)
+        if stream.expect(",", "}") == "}":
+            return
+
+
+def _iter_category(stream: JSONStream, nivel: str, categoria: str,
+                   errors: List[str]) -> Iterator[ExerciseRecord]:
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.expect("]")
+        return
+
+    i = 0
+    while True:
+        stream.peek()  # salta los espacios para que la línea sea la del ejercicio
+        line = stream.line
+        ejercicio = stream.read_value()
+        exercise_errors = _exercise_errors(ejercicio, f"{nivel}/{categoria}[{i}] (línea {line})")
+        if exercise_errors:
+            errors.extend(exercise_errors)
+        elif nivel in VALID_LEVELS:
+            yield nivel, categoria, i, ejercicio
+        i += 1
+        if stream.expect(",", "]") == "]":
+            return
+
+
+def iter_exercises(json_path: str, errors: Optional[List[str]] = None) -> Iterator[ExerciseRecord]:
+    """
+    Recorre un archivo JSON de ejercicios en una sola pasada y sin cargarlo entero en memoria.
 
-                if "respuesta" not in ejercicio:
-                    errors.append(f"Ejercicio sin respuesta en {nivel}/{categoria}[{i}]")
+    Genera (nivel, categoría, i, ejercicio) para cada ejercicio válido. Los errores de
+    contenido, con su posición y línea, se añaden a errors; si no se pasa una lista, se
+    lanza ExerciseJSONError al terminar si hubo alguno. Un JSON mal formado, o un archivo
+    que no existe, lanza siempre ExerciseJSONError.
+    """
+    collected = [] if errors is None else errors
+    try:
+        with open(json_path, 'r', encoding='utf-8') as file:
+            yield from _iter_stream(JSONStream(file), collected)
+    except JSONStreamError as e:
+        raise ExerciseJSONError(collected + [f"Error de formato JSON: {e}"]) from None
+    except FileNotFoundError:
+        raise ExerciseJSONError([f"Archivo no encontrado: {json_path}"]) from None
+    except UnicodeDecodeError as e:
+        raise ExerciseJSONError([f"Error al leer el archivo: {e}"]) from None
 
-                # Verificar tipos de datos
-                if "pregunta" in ejercicio and not isinstance(ejercicio["pregunta"], str):
-                    errors.append(f"Pregunta debe ser texto en {nivel}/{categoria}[{i}]")
+    if errors is None and collected:
+        raise ExerciseJSONError(collected)
 
-                if "opciones" in ejercicio and (not isinstance(ejercicio["opciones"], list) or
-                                                not all(isinstance(op, str) for op in ejercicio["opciones"])):
-                    errors.append(f"Opciones debe ser una lista de textos en {nivel}/{categoria}[{i}]")
 
-                if "respuesta" in ejercicio and not isinstance(ejercicio["respuesta"], int):
-                    errors.append(f"Respuesta debe ser un número entero en {nivel}/{categoria}[{i}]")
+def iter_json_data(json_data: Dict[str, Any]) -> Iterator[ExerciseRecord]:
+    """Mismos registros que iter_exercises a partir de un JSON ya cargado en memoria"""
+    for nivel, categorias in json_data.items():
+        for categoria, ejercicios in categorias.items():
+            for i, ejercicio in enumerate(ejercicios):
+                yield nivel, categoria, i, ejercicio
 
-                # Verificar que la respuesta sea válida
-                if "opciones" in ejercicio and "respuesta" in ejercicio:
-                    if ejercicio["respuesta"] < 0 or ejercicio["respuesta"] >= len(ejercicio["opciones"]):
-                        errors.append(
-                            f"Respuesta inválida en {nivel}/{categoria}[{i}]: {ejercicio['respuesta']} (debe estar entre 0 y {len(ejercicio['opciones']) - 1})")
 
+def validate_exercises_json(json_path: str) -> List[str]:
+    """
+    Valida la estructura y contenido de un archivo JSON de ejercicios.
+
+    Args:
+        json_path (str): Ruta al archivo JSON
+
+    Returns:
+        List[str]: Lista de errores encontrados, vacía si no hay errores
+    """
+    errors = []
+    try:
+        for _ in iter_exercises(json_path, errors):
+            pass
+    except ExerciseJSONError as e:
+        return e.errors
+    except Exception as e:
+        return [f"Error al leer el archivo: {str(e)}"]
     return errors
 
 
 def load_exercises_from_json(json_path: str) -> Dict[str, Any]:
     """
-    Carga ejercicios desde un archivo JSON validado.
+    Carga ejercicios desde un archivo JSON validado, leyéndolo una sola vez.
 
     Args:
         json_path (str): Ruta al archivo JSON
@@ -91,9 +189,7 @@ def load_exercises_from_json(json_path: str) -> Dict[str, Any]:
     Raises:
         ValueError: Si el JSON no pasa la validación
     """
-    errors = validate_exercises_json(json_path)
-    if errors:
-        raise ValueError(f"Errores en el JSON:\n" + "\n".join(errors))
-
-    with open(json_path, 'r', encoding='utf-8') as file:
-        return json.load(file)
\ No newline at end of file
+    data: Dict[str, Dict[str, list]] = {}
+    for nivel, categoria, _, ejercicio in iter_exercises(json_path):
+        data.setdefault(nivel, {}).setdefault(categoria, []).append(ejercicio)
+    return data
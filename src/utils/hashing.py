@@ -0,0 +1,23 @@
+# src/utils/hashing.py
+import hashlib
+import json
+from typing import Any, List
+
+
+def content_hash(*parts: Any) -> str:
+    """Huella SHA-256 estable de una secuencia de valores serializables en JSON"""
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def exercise_hash(nivel: str, categoria: str, pregunta: str, opciones: List[str]) -> str:
+    """
+    Identidad de un ejercicio: dos ejercicios con el mismo nivel, categoría, pregunta y
+    opciones (ya normalizadas) son el mismo, aunque cambien la respuesta o la explicación.
+    """
+    return content_hash(nivel.strip(), categoria.strip(), pregunta.strip(), list(opciones))
+
+
+def curiosity_hash(categoria: str, texto: str) -> str:
+    """Identidad de una curiosidad: su categoría y su texto"""
+    return content_hash(categoria.strip(), texto.strip())
@@ -0,0 +1,108 @@
+# src/utils/json_stream.py
+import json
+from typing import Any, TextIO
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+
+
+class JSONStreamError(ValueError):
+    """JSON mal formado; line indica la línea (desde 1) donde se detectó"""
+
+    def __init__(self, message: str, line: int):
+        super().__init__(f"{message} (línea {line})")
+        self.line = line
+
+
+class JSONStream:
+    """
+    Lector incremental de JSON sobre un fichero de texto.
+
+    Permite recorrer a mano los contenedores exteriores ({, [, claves, comas) y decodificar
+    de golpe los valores interiores con raw_decode, de modo que en memoria solo hay un
+    bloque del fichero y el valor que se está leyendo.
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int = CHUNK_SIZE):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._line = 1
+        self._line_pos = 0
+
+    @property
+    def line(self) -> int:
+        """Línea de la posición actual; se cuenta de forma incremental"""
+        if self._line_pos < self._pos:
+            self._line += self._buffer.count("\n", self._line_pos, self._pos)
+            self._line_pos = self._pos
+        return self._line
+
+    def error(self, message: str) -> JSONStreamError:
+        return JSONStreamError(message, self.line)
+
+    def _fill(self) -> bool:
+        """Añade otro bloque al buffer descartando lo ya consumido; False al final del fichero"""
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self.line  # actualiza el contador antes de descartar el prefijo
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = self._line_pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Siguiente carácter significativo sin consumirlo ('' al final del fichero)"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, *chars: str) -> str:
+        """Consume uno de los caracteres indicados o lanza JSONStreamError"""
+        char = self.peek()
+        if char not in chars or not char:
+            found = repr(char) if char else "fin del fichero"
+            raise self.error(f"Se esperaba {' o '.join(repr(c) for c in chars)} y se encontró {found}")
+        self._pos += 1
+        return char
+
+    def read_value(self) -> Any:
+        """Decodifica el siguiente valor completo (objeto, lista, cadena, número...)"""
+        if not self.peek():
+            raise self.error("Fin de fichero inesperado")
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                # Puede que el valor siga en el próximo bloque; si no hay más, es un error real
+                if self._fill():
+                    continue
+                self._pos = max(self._pos, min(e.pos, len(self._buffer)))
+                raise self.error(e.msg) from None
+
+            # Un número al final del buffer puede continuar en el siguiente bloque
+            if end == len(self._buffer) and not isinstance(value, (dict, list, str)) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def read_key(self) -> str:
+        """Lee una clave de objeto y el ':' que la sigue"""
+        if self.peek() != '"':
+            raise self.error("Se esperaba una clave entre comillas")
+        key = self.read_value()
+        self.expect(":")
+        return key
+
+    def at_end(self) -> bool:
+        return self.peek() == ""
@@ -0,0 +1,89 @@
+# src/utils/options.py
+import ast
+import csv
+import json
+from typing import Any, List
+
+
+class OptionsError(ValueError):
+    """Las opciones de un ejercicio no se pueden convertir a una lista válida"""
+
+
+def _clean_items(items: List[Any]) -> List[str]:
+    options = [str(item).strip() for item in items]
+    options = [option for option in options if option]
+
+    # Arrays exportados de TEXT[] como texto: ["[Soy", "Eres", "Es", "Somos]"]
+    if (len(options) > 1 and options[0].startswith("[") and options[-1].endswith("]")
+            and not options[0].endswith("]") and not options[-1].startswith("[")):
+        options[0] = options[0][1:].strip()
+        options[-1] = options[-1][:-1].strip()
+        options = [option for option in options if option]
+    return options
+
+
+def _parse_string(value: str) -> List[Any]:
+    text = value.strip()
+    if not text:
+        return []
+
+    if text[0] in "[(":
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError:
+            try:
+                parsed = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                parsed = None
+        if isinstance(parsed, (list, tuple)):
+            return list(parsed)
+        if isinstance(parsed, dict):
+            return list(parsed.values())
+
+    # Literal de array de PostgreSQL: {op1,"op 2",op3}
+    if text.startswith("{") and text.endswith("}"):
+        return next(csv.reader([text[1:-1]], quotechar='"', escapechar="\\", skipinitialspace=True), [])
+
+    if "," in text:
+        return text.split(",")
+    return [text]
+
+
+def normalize_options(value: Any) -> List[str]:
+    """
+    Convierte las opciones de un ejercicio a su forma canónica: una lista de cadenas sin
+    espacios sobrantes ni elementos vacíos.
+
+    Acepta listas (TEXT[]), cadenas JSON o literales de Python, literales de array de
+    PostgreSQL y texto separado por comas. Lanza OptionsError si no queda ninguna opción.
+    """
+    if isinstance(value, (list, tuple)):
+        items = list(value)
+    elif isinstance(value, dict):
+        items = list(value.values())
+    elif isinstance(value, str):
+        items = _parse_string(value)
+    elif value is None:
+        items = []
+    else:
+        items = [value]
+
+    options = _clean_items(items)
+    if not options:
+        raise OptionsError(f"Opciones vacías o no válidas: {value!r}")
+    return options
+
+
+def is_canonical(value: Any) -> bool:
+    """True si value ya es una lista de opciones normalizada"""
+    if not isinstance(value, list) or not all(isinstance(option, str) for option in value):
+        return False
+    try:
+        return normalize_options(value) == value
+    except OptionsError:
+        return False
+
+
+def serialize_options(options: List[str]) -> str:
+    """Representación canónica para columnas TEXT: array JSON sin escapar caracteres no ASCII"""
+    return json.dumps(options, ensure_ascii=False)
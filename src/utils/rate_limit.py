@@ -0,0 +1,38 @@
+# src/utils/rate_limit.py
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Cubo de tokens: admite ráfagas de hasta `capacity` operaciones y después
+    `rate` operaciones por segundo.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """
+        Consume `tokens` si hay suficientes y devuelve 0; si no, no consume nada
+        y devuelve los segundos que faltan para que los haya.
+        """
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
@@ -0,0 +1,32 @@
+# web_handlers/metrics.py
+import logging
+from aiohttp import web
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_HOST = "0.0.0.0"
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """Devuelve todas las métricas en formato de texto de Prometheus"""
+    return web.Response(
+        text=REGISTRY.render(),
+        content_type="text/plain",
+        headers={"X-Content-Type-Options": "nosniff"}
+    )
+
+
+def create_metrics_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    return app
+
+
+async def start_metrics_server(port: int, host: str = DEFAULT_METRICS_HOST) -> web.AppRunner:
+    """Arranca un servidor HTTP propio para /metrics y devuelve el runner para poder cerrarlo"""
+    runner = web.AppRunner(create_metrics_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"📈 Métricas disponibles en http://{host}:{port}/metrics")
+    return runner
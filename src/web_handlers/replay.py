@@ -0,0 +1,84 @@
+# web_handlers/replay.py
+"""
+Reenvía updates grabados contra un endpoint de webhook, como haría Telegram.
+
+Uso:
+    python -m src.web_handlers.replay updates.jsonl --url http://localhost:8080/webhook --concurrency 20
+
+El fichero tiene un update JSON por línea (o es una lista JSON de updates).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+from aiohttp import ClientSession
+from src.web_handlers.webhook import SECRET_HEADER
+
+logger = logging.getLogger(__name__)
+
+
+def load_updates(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read().strip()
+    if content.startswith("["):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+async def replay_updates(updates: Iterable[Dict[str, Any]], url: str, concurrency: int = 10,
+                         secret_token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Envía los updates al webhook con como mucho `concurrency` peticiones en vuelo.
+    Devuelve el número de respuestas por código HTTP y la latencia de las peticiones.
+    """
+    headers = {SECRET_HEADER: secret_token} if secret_token else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = Counter()
+    latencies = []
+
+    async def send(session: ClientSession, update: Dict[str, Any]):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async with session.post(url, json=update, headers=headers) as response:
+                    statuses[response.status] += 1
+            except Exception as e:
+                logger.error(f"Error enviando el update {update.get('update_id')}: {e}")
+                statuses["error"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*(send(session, update) for update in updates))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "sent": len(latencies),
+        "statuses": dict(statuses),
+        "elapsed": elapsed,
+        "p50": latencies[len(latencies) // 2] if latencies else 0.0,
+        "max": latencies[-1] if latencies else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reenvía updates grabados a un webhook")
+    parser.add_argument("file", help="Fichero JSON/JSONL con los updates")
+    parser.add_argument("--url", default="http://localhost:8080/webhook")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--secret", default=None, help="Valor de WEBHOOK_SECRET, si está configurado")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(replay_updates(load_updates(args.file), args.url, args.concurrency, args.secret))
+    print(f"Enviados: {result['sent']} en {result['elapsed']:.2f}s")
+    print(f"Respuestas: {result['statuses']}")
+    print(f"Latencia p50: {result['p50'] * 1000:.1f} ms, máx: {result['max'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# web_handlers/webhook.py
+import asyncio
+import logging
+import os
+import secrets
+from typing import List, Optional
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEBHOOK_PATH = "/webhook"
+DEFAULT_WEBHOOK_HOST = "0.0.0.0"
+DEFAULT_WEBHOOK_PORT = 8080
+DEFAULT_WORKERS = 16
+DEFAULT_QUEUE_SIZE = 1000
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+
+class UpdateWorkerPool:
+    """
+    Procesa updates en segundo plano con un número fijo de workers.
+
+    La cola está acotada: si se llena, submit devuelve False y el endpoint responde 503
+    para que Telegram reintente más tarde en lugar de acumular tareas sin límite.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot,
+                 workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Pool de updates iniciado: {self.workers} workers, cola de {self.queue_size}")
+
+    async def stop(self):
+        """Espera a que se procesen los updates pendientes y detiene los workers"""
+        if self._queue is not None:
+            await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, update: Update) -> bool:
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self):
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"Error procesando el update {update.update_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+UPDATE_POOL_KEY = web.AppKey("update_pool", UpdateWorkerPool)
+
+
+def create_webhook_app(dispatcher: Dispatcher, bot: Bot, path: str = DEFAULT_WEBHOOK_PATH,
+                       secret_token: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+                       queue_size: int = DEFAULT_QUEUE_SIZE) -> web.Application:
+    """
+    Crea la aplicación aiohttp que recibe los updates de Telegram.
+
+    El endpoint solo valida y encola el update, y responde 200 de inmediato; el procesamiento
+    ocurre en el UpdateWorkerPool.
+    """
+    pool = UpdateWorkerPool(dispatcher, bot, workers=workers, queue_size=queue_size)
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret_token and not secrets.compare_digest(request.headers.get(SECRET_HEADER, ""), secret_token):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except Exception as e:
+            logger.warning(f"Update inválido recibido por webhook: {e}")
+            return web.Response(status=400)
+
+        if not pool.submit(update):
+            logger.warning(f"Cola de updates llena, se rechaza el update {update.update_id}")
+            return web.Response(status=503)
+        return web.Response(status=200)
+
+    async def on_startup(app: web.Application):
+        await pool.start()
+
+    async def on_cleanup(app: web.Application):
+        await pool.stop()
+
+    app = web.Application()
+    app[UPDATE_POOL_KEY] = pool
+    app.router.add_post(path, handle_update)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot):
+    """
+    Sirve el bot en modo webhook con la configuración del entorno:
+    WEBHOOK_URL (URL pública base; si falta no se registra el webhook en Telegram),
+    WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_WORKERS y WEBHOOK_QUEUE_SIZE.
+    """
+    path = os.getenv("WEBHOOK_PATH", DEFAULT_WEBHOOK_PATH)
+    secret_token = os.getenv("WEBHOOK_SECRET") or None
+    host = os.getenv("WEBHOOK_HOST", DEFAULT_WEBHOOK_HOST)
+    port = int(os.getenv("WEBHOOK_PORT") or DEFAULT_WEBHOOK_PORT)
+    workers = int(os.getenv("WEBHOOK_WORKERS") or DEFAULT_WORKERS)
+    queue_size = int(os.getenv("WEBHOOK_QUEUE_SIZE") or DEFAULT_QUEUE_SIZE)
+
+    app = create_webhook_app(dispatcher, bot, path=path, secret_token=secret_token,
+                             workers=workers, queue_size=queue_size)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"🌐 Webhook escuchando en http://{host}:{port}{path}")
+
+    public_url = os.getenv("WEBHOOK_URL")
+    if public_url:
+        await bot.set_webhook(
+            public_url.rstrip("/") + path,
+            secret_token=secret_token,
+            allowed_updates=ALLOWED_UPDATES,
+            max_connections=workers
+        )
+        logger.info(f"Webhook registrado en Telegram: {public_url.rstrip('/')}{path}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()